@@ -1,13 +1,36 @@
 import os
+import re
 import json
 import yaml
 import toml
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
+
+from agents_trove.trove_memory import ShortTermMemory
+from agents_trove.trove_persistence import StateStore
+from agents_trove.trove_binary import read_binary, write_binary
+from agents_trove.trove_tool_runtime import ToolResult, ToolRuntime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Runtime-only attributes that are never written to saved state
+_TRANSIENT_FIELDS = ("vector_store", "tools", "tool_runtime", "group_chat")
+
+_TOOL_CALL_PATTERN = re.compile(r"use_tool\s+([\w.-]+)")
+
+
+def _jsonable(value: Any) -> bool:
+    """Returns True if a value can be written to JSON state (no callables, clients or other objects)."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_jsonable(item) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _jsonable(item) for key, item in value.items())
+    return False
+
+
 class TroveAgent:
     """
     TroveAgent: A customizable AI agent capable of executing tasks, managing memory, interacting with tools, and saving/loading states.
@@ -28,7 +51,14 @@ class TroveAgent:
                  retry_attempts: int = 1,
                  context_length: int = 200000,
                  return_step_meta: bool = False,
-                 output_type: str = "string"):
+                 output_type: str = "string",
+                 vector_store: Any = None,
+                 retrieval_k: int = 3,
+                 short_term_memory_size: int = 1000,
+                 short_term_memory_bytes: Optional[int] = None,
+                 spill_to_long_term: bool = False,
+                 journal_compact_every: int = 1000,
+                 tool_runtime: Optional[ToolRuntime] = None):
         """
         Initializes the TroveAgent with customizable parameters.
         
@@ -46,6 +76,15 @@ class TroveAgent:
         :param context_length: Maximum length of input context.
         :param return_step_meta: Enables metadata return for steps.
         :param output_type: Format of the agent output (e.g., string, json).
+        :param vector_store: Optional VectorStore for retrieval-augmented runs over ingested documents.
+        :param retrieval_k: Number of documents retrieved per task when a vector store is set.
+        :param short_term_memory_size: Maximum entries kept in short-term memory.
+        :param short_term_memory_bytes: Maximum UTF-8 bytes kept in short-term memory (None = no byte cap).
+        :param spill_to_long_term: Moves evicted short-term entries into long-term memory
+                                   (the vector store if one is set) instead of dropping them.
+        :param journal_compact_every: Journal records appended by save_state before they are
+                                      compacted into a new snapshot.
+        :param tool_runtime: ToolRuntime that executes this agent's tools (a private one is created if omitted).
         """
         self.agent_name = agent_name
         self.system_prompt = system_prompt
@@ -61,9 +100,20 @@ class TroveAgent:
         self.context_length = context_length
         self.return_step_meta = return_step_meta
         self.output_type = output_type
-        self.short_term_memory: List[str] = []
+        self.vector_store = vector_store
+        self.retrieval_k = retrieval_k
+        self.short_term_memory = ShortTermMemory(
+            max_entries=short_term_memory_size,
+            max_bytes=short_term_memory_bytes,
+            on_evict=self._spill_short_term if spill_to_long_term else None,
+        )
         self.long_term_memory: Dict[str, Any] = {}
         self.tools: Dict[str, Any] = {}
+        self.tool_runtime = tool_runtime or ToolRuntime()
+        self.journal_compact_every = journal_compact_every
+        self.group_chat = None  # set by TroveGroupChat while the agent takes part in a chat
+        self._state_store: Optional[StateStore] = None
+        self._persisted: Optional[Dict[str, Any]] = None
 
         logging.info(f"Agent {self.agent_name} initialized with LLM: {self.llm}")
     
@@ -76,44 +126,279 @@ class TroveAgent:
         """
         logging.info(f"{self.agent_name} executing task: {task}")
         self.short_term_memory.append(task)
-        result = self._process_task(task)
+        result = self._process_task(self._augment_task(task))
+        if self.autosave:
+            self.save_state()
         return result
 
+    def stream(self, task: str) -> Iterator[str]:
+        """
+        Executes a task in streaming mode, yielding output as it is produced.
+        Agents backed by a streaming model (e.g. AIModel) yield tokens as they arrive;
+        otherwise the full result is yielded as a single chunk.
+        
+        :param task: The task description.
+        :return: Iterator of output chunks.
+        """
+        if "use_tool" in task or not hasattr(self.llm, "stream_chat"):
+            yield self.run(task)
+            return
+
+        logging.info(f"{self.agent_name} streaming task: {task}")
+        self.short_term_memory.append(task)
+        yield from self.llm.stream_chat(self._messages(self._augment_task(task)))
+        if self.autosave:
+            self.save_state()
+
+    def reply(self, prompt: str) -> str:
+        """
+        Sends a prompt to the model exactly as given: no short-term memory, no retrieved context
+        and no tool calls, so text quoted in the prompt (e.g. other agents' group chat messages)
+        cannot trigger tools and the prompt's size is what the caller measured.
+
+        :param prompt: The complete user prompt.
+        :return: The model's answer.
+        """
+        if hasattr(self.llm, "chat"):
+            return self.llm.chat(self._messages(prompt))
+        return f"Task '{prompt}' completed by {self.agent_name}"
+
     def _process_task(self, task: str) -> str:
         """Internal method for processing a given task."""
-        if "use_tool" in task:
-            tool_name = task.split(" ")[1]
-            return self.execute_tool(tool_name, {})
+        calls = self._parse_tool_calls(task) if "use_tool" in task else []
+        if len(calls) == 1:
+            return self.execute_tool(*calls[0])
+        if calls:
+            return "\n".join(f"{result.name}: {result.result if result.error is None else result.error}"
+                             for result in self.execute_tools(calls))
+        if hasattr(self.llm, "chat"):
+            return self.llm.chat(self._messages(task))
         return f"Task '{task}' completed by {self.agent_name}"
 
-    def add_tool(self, tool_name: str, function: Any):
-        """Registers a tool for the agent."""
+    @staticmethod
+    def _parse_tool_calls(task: str) -> List[tuple]:
+        """
+        Extracts tool invocations of the form `use_tool <name>` optionally followed by a JSON
+        object of params, e.g. `use_tool calculate_efficiency {"consumption": 500, "production": 600}`.
+        """
+        decoder = json.JSONDecoder()
+        calls = []
+        for match in _TOOL_CALL_PATTERN.finditer(task):
+            params = {}
+            position = match.end()
+            while position < len(task) and task[position] in " \t":
+                position += 1
+            if task.startswith("{", position):
+                try:
+                    params, _ = decoder.raw_decode(task, position)
+                except ValueError:
+                    logging.warning(f"Ignoring malformed params for tool {match.group(1)}")
+            calls.append((match.group(1), params if isinstance(params, dict) else {}))
+        return calls
+
+    def _augment_task(self, task: str) -> str:
+        """Prepends the documents most relevant to the task when a vector store is attached."""
+        if self.vector_store is None or len(self.vector_store) == 0 or "use_tool" in task:
+            return task
+        hits = [hit for hit in self.vector_store.search(task, k=self.retrieval_k) if hit.score > 0]
+        if not hits:
+            return task
+        context = "\n".join(f"- {hit.document}" for hit in hits)
+        return f"Relevant context:\n{context}\n\nTask: {task}"
+
+    def _messages(self, task: str) -> List[Dict[str, str]]:
+        """Builds the chat messages sent to a model-backed agent's LLM."""
+        return [{"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": task}]
+
+    def _spill_short_term(self, entries: List[str]):
+        """Moves entries evicted from short-term memory into long-term memory."""
+        if self.vector_store is not None:
+            self.vector_store.add(entries)
+            self.long_term_memory["documents_indexed"] = len(self.vector_store)
+        else:
+            self._archive_short_term(entries)
+
+    def _archive_short_term(self, entries: List[str]):
+        """Keeps entries evicted from short-term memory in this agent's own long-term memory."""
+        self.long_term_memory.setdefault("short_term_archive", []).extend(entries)
+
+    def add_tool(self, tool_name: str, function: Any, pure: bool = False,
+                 timeout: Optional[float] = None, backend: str = "thread"):
+        """
+        Registers a tool for the agent.
+        
+        :param tool_name: Name used to invoke the tool.
+        :param function: Callable taking the invocation params as keyword arguments.
+        :param pure: Results depend only on the params, so they can be memoized.
+        :param timeout: Seconds before a call is reported as timed out (None = no limit).
+        :param backend: "thread", or "process" for CPU-bound tools.
+        """
         self.tools[tool_name] = function
+        self.tool_runtime.register(tool_name, function, pure=pure, timeout=timeout, backend=backend)
         logging.info(f"Tool {tool_name} added to {self.agent_name}")
     
     def execute_tool(self, tool_name: str, params: Dict[str, Any]) -> str:
-        """Executes a tool if it exists."""
-        if tool_name in self.tools:
-            return self.tools[tool_name](**params)
-        return f"Tool {tool_name} not found"
-
-    def save_state(self):
-        """Saves the agent's state to a JSON file."""
-        state = self.to_dict()
-        with open(self.saved_state_path, "w") as file:
-            json.dump(state, file)
-        logging.info(f"State saved to {self.saved_state_path}")
-    
+        """Executes a tool if it exists. Errors and timeouts are raised."""
+        if tool_name not in self.tools:
+            return f"Tool {tool_name} not found"
+        self._sync_tool(tool_name)
+        result = self.tool_runtime.call(tool_name, params)
+        if result.exception is not None:
+            raise result.exception
+        return result.result
+
+    def execute_tools(self, calls: List[Any]) -> List[ToolResult]:
+        """
+        Executes several tool invocations in parallel.
+        
+        :param calls: (tool_name, params) tuples or {"name": ..., "params": ...} dicts.
+        :return: One ToolResult per call, in order; failures are reported in the result's error.
+        """
+        for call in calls:
+            self._sync_tool(call["name"] if isinstance(call, dict) else call[0])
+        return self.tool_runtime.execute(calls)
+
+    def _sync_tool(self, tool_name: str):
+        """Registers tools that were put into self.tools directly rather than through add_tool."""
+        function = self.tools.get(tool_name)
+        if function is not None:
+            spec = self.tool_runtime.spec(tool_name)
+            if spec is None or spec.function is not function:
+                self.tool_runtime.register(tool_name, function)
+
+    def save_state(self, full: bool = False):
+        """
+        Saves the agent's state to a JSON file.
+        The first save (or a full one) atomically writes a snapshot; later saves append only what
+        changed since the previous save to a fsynced journal next to it, which is compacted into
+        the snapshot in the background. Appends to long-term memory lists are journaled as just the
+        new items; any other change to a list (replaced, reordered or removed items) rewrites it.
+
+        :param full: Write a complete snapshot instead of a journal delta.
+        """
+        store = self._state_store
+        if store is None or store.path != self.saved_state_path:
+            store = self._state_store = StateStore(self.saved_state_path, compact_every=self.journal_compact_every)
+            full = True
+
+        if full or self._persisted is None:
+            store.write_snapshot(self.to_dict())
+            self._persisted = self._state_marks()
+            logging.info(f"State saved to {self.saved_state_path}")
+            return
+
+        records = self._state_delta()
+        store.append(records)
+        if records:
+            logging.info(f"State saved to {self.saved_state_path} ({len(records)} journal records)")
+
     def load_state(self):
-        """Loads the agent's state from a JSON file."""
-        with open(self.saved_state_path, "r") as file:
-            state = json.load(file)
-        self.__dict__.update(state)
+        """Loads the agent's state from its snapshot and journal."""
+        if self._state_store is None or self._state_store.path != self.saved_state_path:
+            self._state_store = StateStore(self.saved_state_path, compact_every=self.journal_compact_every)
+        state = self._state_store.load()
+        entries = state.pop("short_term_memory", [])
+        self.__dict__.update({key: value for key, value in state.items()
+                              if not key.startswith("_") and key not in _TRANSIENT_FIELDS})
+
+        self._restore_short_term(entries)
+        self._persisted = self._state_marks()
         logging.info(f"State loaded from {self.saved_state_path}")
-    
+
+    def _restore_short_term(self, entries: List[str]):
+        """Refills short-term memory from saved entries without spilling them again."""
+        on_evict, self.short_term_memory.on_evict = self.short_term_memory.on_evict, None
+        self.short_term_memory.clear()
+        self.short_term_memory.extend(entries)
+        self.short_term_memory.on_evict = on_evict
+
+    def compact_state(self):
+        """Folds the state journal into the snapshot now and waits for it to finish."""
+        if self._state_store is not None:
+            self._state_store.compact()
+            self._state_store.wait()
+
+    def _state_fields(self) -> Iterator[tuple]:
+        """Yields the plain (non-memory) attributes that can be saved."""
+        for key, value in self.__dict__.items():
+            if key.startswith("_") or key in _TRANSIENT_FIELDS or key in ("short_term_memory", "long_term_memory"):
+                continue
+            if _jsonable(value):
+                yield key, value
+
+    def _state_marks(self) -> Dict[str, Any]:
+        """Records what has been persisted so the next save can write only the difference."""
+        return {
+            "fields": {key: json.dumps(value) for key, value in self._state_fields()},
+            "stm": self.short_term_memory.total_appended,
+            "ltm": {key: self._ltm_mark(value) for key, value in self.long_term_memory.items() if _jsonable(value)},
+        }
+
+    @staticmethod
+    def _ltm_mark(value: Any) -> tuple:
+        # Lists keep a shallow copy: comparing it with the list's prefix is a C-level pass over item
+        # identities, far cheaper than re-encoding, and catches items replaced or reordered in place
+        if isinstance(value, list):
+            return value, len(value), list(value)
+        return value, None, json.dumps(value)
+
+    def _state_delta(self) -> List[Dict[str, Any]]:
+        """Builds journal records for everything changed since the last save."""
+        marks = self._persisted
+        records = []
+
+        for key, value in self._state_fields():
+            encoded = json.dumps(value)
+            if marks["fields"].get(key) != encoded:
+                records.append({"op": "set", "key": key, "value": value})
+                marks["fields"][key] = encoded
+
+        memory = self.short_term_memory
+        new_entries = min(memory.total_appended - marks["stm"], len(memory))
+        if new_entries > 0:
+            records.append({"op": "stm", "entries": memory.to_list()[-new_entries:],
+                            "max_entries": memory.max_entries})
+        marks["stm"] = memory.total_appended
+
+        ltm_marks = marks["ltm"]
+        for key in [key for key in ltm_marks if key not in self.long_term_memory]:
+            records.append({"op": "ltm_del", "key": key})
+            del ltm_marks[key]
+        for key, value in list(self.long_term_memory.items()):
+            mark = ltm_marks.get(key)
+            if isinstance(value, list) and mark is not None and mark[0] is value and len(value) >= mark[1] \
+                    and value[:mark[1]] == mark[2]:
+                if len(value) > mark[1] and _jsonable(value[mark[1]:]):
+                    records.append({"op": "ltm_extend", "key": key, "values": value[mark[1]:]})
+                    ltm_marks[key] = self._ltm_mark(value)
+                continue
+            if not _jsonable(value):
+                continue
+            new_mark = self._ltm_mark(value)
+            if mark is None or mark[0] is not value or mark[1:] != new_mark[1:]:
+                records.append({"op": "ltm_set", "key": key, "value": value})
+                ltm_marks[key] = new_mark
+        return records
+
     def to_dict(self) -> Dict[str, Any]:
-        """Converts agent attributes to a dictionary."""
-        return self.__dict__
+        """
+        Converts agent attributes to a dictionary.
+        Tools, model clients and other non-serializable values are skipped; the vector store
+        is persisted separately with its own save().
+        """
+        state = dict(self._state_fields())
+        state["short_term_memory"] = self.short_term_memory.to_list()
+        state["long_term_memory"] = {key: value for key, value in self.long_term_memory.items() if _jsonable(value)}
+        return state
+
+    def __getstate__(self):
+        # The state store holds a lock and open-file bookkeeping that belong to this process
+        state = self.__dict__.copy()
+        state["_state_store"] = None
+        state["_persisted"] = None
+        state["group_chat"] = None
+        return state
 
     def to_toml(self) -> str:
         """Converts agent attributes to TOML format."""
@@ -131,24 +416,66 @@ class TroveAgent:
             yaml.dump(self.to_dict(), file)
         logging.info(f"Model state saved as YAML: {self.agent_name}.yaml")
 
+    def save_binary(self, path: Optional[str] = None) -> str:
+        """
+        Saves the agent's state in the compact binary format (see trove_binary).
+        
+        :param path: Target file (defaults to <agent_name>.trove).
+        :return: The path written.
+        """
+        path = path or f"{self.agent_name}.trove"
+        write_binary(path, self.to_dict())
+        logging.info(f"State saved as binary: {path}")
+        return path
+
+    def load_binary(self, path: Optional[str] = None):
+        """
+        Loads state saved with save_binary. Config and short-term memory are restored
+        immediately; long-term memory values are memory-mapped and decoded on first access.
+        
+        :param path: Source file (defaults to <agent_name>.trove).
+        """
+        path = path or f"{self.agent_name}.trove"
+        state = read_binary(path)
+        self.__dict__.update({key: value for key, value in state.config.items()
+                              if not key.startswith("_") and key not in _TRANSIENT_FIELDS})
+        self._restore_short_term(state.short_term_memory)
+        self.long_term_memory = state.long_term_memory
+        self._persisted = None  # next save_state writes a full snapshot
+        logging.info(f"State loaded from binary: {path}")
+
     def ingest_docs(self, docs: List[str]):
-        """Ingests documents into the agent's long-term memory."""
+        """Ingests documents into the agent's long-term memory, indexing them in the vector store if one is set."""
+        if self.vector_store is not None:
+            self.vector_store.add(docs)
+            self.long_term_memory["documents_indexed"] = len(self.vector_store)
+            logging.info(f"{len(docs)} documents indexed into the vector store.")
+            return
         self.long_term_memory["documents"] = docs
         logging.info("Documents ingested into memory.")
 
     def receive_message(self, message: str):
-        """Handles incoming messages."""
+        """Handles incoming messages. A group chat calls this when it delivers a direct message."""
         logging.info(f"Message received: {message}")
         return f"Processed message: {message}"
 
     def send_agent_message(self, recipient: str, message: str):
-        """Sends a message from the agent."""
+        """
+        Sends a message from the agent. While the agent is in a group chat the message is posted
+        to the chat transcript, addressed to `recipient` ("all" for everyone), and the recipient
+        sees it in its next turn.
+        """
+        if self.group_chat is not None:
+            self.group_chat.post(self.agent_name, message, recipient=recipient)
         return f"Sent message to {recipient}: {message}"
     
     def print_dashboard(self):
         """Prints dashboard if enabled."""
         if self.dashboard:
-            logging.info(f"Agent: {self.agent_name} | LLM: {self.llm} | Memory size: {len(self.long_term_memory)}")
+            usage = self.short_term_memory.memory_usage()
+            logging.info(f"Agent: {self.agent_name} | LLM: {self.llm} | Memory size: {len(self.long_term_memory)} | "
+                         f"Short-term: {usage['entries']}/{usage['max_entries']} entries, "
+                         f"{usage['bytes']} bytes ({usage['resident_bytes']} resident)")
     
 if __name__ == "__main__":
     agent = TroveAgent()
@@ -1,14 +1,36 @@
 import os
+import time
+import asyncio
+import queue
 import logging
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_context import ContextBuilder, TokenCounter
+
+_STREAM_DONE = object()
+
+
+class MOAStreamEvent(NamedTuple):
+    """A chunk of output streamed by one agent of a TroveMOA run."""
+    layer: int
+    agent_name: str
+    text: str
+    final: bool
+
 
 class TroveMOA:
     """
     Mixture-of-Agents (MOA) class implementing a multi-layered agent processing system.
     Ensures structured logging, indexed execution, and meaningful output.
+    Agents within a layer are independent, so each layer is fanned out concurrently.
     """
 
-    def __init__(self, name, agents, layers, final_agent):
+    EXECUTORS = ("thread", "asyncio")
+
+    def __init__(self, name, agents, layers, final_agent,
+                 executor="thread", max_workers=None, agent_timeout=None,
+                 layer_token_budget=None, context_strategy="truncate", summarizer=None):
         """
         Initializes the MOA system.
         
@@ -16,12 +38,34 @@ class TroveMOA:
         :param agents: List of TroveAgent objects
         :param layers: Number of processing layers
         :param final_agent: Final agent responsible for summarizing results
+        :param executor: Layer executor, either "thread" (thread pool) or "asyncio"
+        :param max_workers: Maximum agents running at once per layer (defaults to all agents)
+        :param agent_timeout: Seconds, counted from the start of the layer, each agent may take before its
+                              result is replaced by a placeholder (None = no limit)
+        :param layer_token_budget: Maximum tokens of aggregated layer output passed to the next layer.
+                                   Always capped by the receiving agents' context_length.
+        :param context_strategy: How over-budget layer output is reduced: "truncate", "excerpt" or "summarize"
+        :param summarizer: Callable (e.g. an agent's run method) used by the "summarize" strategy
         """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}'. Expected one of {self.EXECUTORS}.")
+
         self.name = name
         self.agents = agents
         self.layers = layers
         self.final_agent = final_agent
+        self.executor = executor
+        self.max_workers = max_workers or max(len(agents), 1)
+        self.agent_timeout = agent_timeout
+        self.layer_token_budget = layer_token_budget
+        self.context_builder = ContextBuilder(
+            token_budget=layer_token_budget or 0,
+            strategy=context_strategy,
+            counter=TokenCounter(),
+            summarizer=summarizer,
+        )
         self.intermediate_results = []
+        self.layer_timings = []
         
         # Configure logging
         log_filename = f"logs/{self.name}_execution.log"
@@ -31,7 +75,7 @@ class TroveMOA:
             level=logging.INFO,
             format="%(asctime)s - %(levelname)s - %(message)s"
         )
-        logging.info(f"✅ Initialized MOA system: {self.name}")
+        logging.info(f"✅ Initialized MOA system: {self.name} (executor={self.executor}, max_workers={self.max_workers})")
 
     def run(self, task):
         """
@@ -45,21 +89,19 @@ class TroveMOA:
 
         for layer in range(self.layers):
             logging.info(f"📌 Processing Layer {layer + 1}/{self.layers}")
-            layer_results = []
+            started = time.perf_counter()
 
-            for agent in self.agents:
-                logging.info(f"🔍 Agent {agent.agent_name} executing task...")
-                result = agent.run(current_task)
+            if self.executor == "asyncio":
+                layer_results = asyncio.run(self._run_layer_async(current_task))
+            else:
+                layer_results = self._run_layer_threaded(current_task)
 
-                if not result:
-                    logging.error(f"❌ Agent {agent.agent_name} returned an empty response!")
-                    result = f"⚠️ No data available from {agent.agent_name}."
-
-                logging.info(f"✅ Agent {agent.agent_name} completed task. Preview: {result[:200]}...")
-                layer_results.append(result)
+            elapsed = time.perf_counter() - started
+            self.layer_timings.append(elapsed)
+            logging.info(f"⏱️ Layer {layer + 1}/{self.layers} finished in {elapsed:.2f}s")
 
             self.intermediate_results.append(layer_results)
-            current_task = "\n\n".join(layer_results)  # Aggregate results
+            current_task = self._assemble_context(layer_results, layer, task)  # Aggregate results
 
         # Final agent processes the aggregated results
         logging.info("🔹 Final agent aggregating and summarizing results...")
@@ -72,69 +114,239 @@ class TroveMOA:
         logging.info("✅ MOA execution completed successfully.")
         return final_result
 
+    def stream(self, task):
+        """
+        Streaming version of run(). Yields MOAStreamEvent chunks as agents produce them.
+        Agents of a layer stream concurrently and their chunks are interleaved as they arrive,
+        so the first tokens show up after one model round-trip instead of the whole pipeline.
+        The final agent needs every upstream result in its prompt, so it starts as soon as
+        the last layer completes and its tokens are streamed with final=True.
+        
+        :param task: The input task for processing
+        :return: Iterator of MOAStreamEvent
+        """
+        logging.info(f"🚀 Starting streaming MOA execution for task: {task}")
+        current_task = task
+
+        for layer in range(self.layers):
+            logging.info(f"📌 Streaming Layer {layer + 1}/{self.layers}")
+            started = time.perf_counter()
+            buffers = [[] for _ in self.agents]
+            timed_out = set()
+
+            for index, text in self._stream_layer(current_task, timed_out):
+                buffers[index].append(text)
+                yield MOAStreamEvent(layer + 1, self.agents[index].agent_name, text, False)
+
+            layer_results = [
+                self._check_result(agent, None if index in timed_out else "".join(parts))
+                for index, (agent, parts) in enumerate(zip(self.agents, buffers))
+            ]
+
+            elapsed = time.perf_counter() - started
+            self.layer_timings.append(elapsed)
+            logging.info(f"⏱️ Layer {layer + 1}/{self.layers} finished in {elapsed:.2f}s")
+
+            self.intermediate_results.append(layer_results)
+            current_task = self._assemble_context(layer_results, layer, task)  # Aggregate results
+
+        logging.info("🔹 Final agent aggregating and summarizing results...")
+        produced = False
+        for text in self.final_agent.stream(current_task):
+            produced = produced or bool(text)
+            yield MOAStreamEvent(self.layers + 1, self.final_agent.agent_name, text, True)
+
+        if not produced:
+            logging.error("❌ Final agent returned an empty report!")
+            yield MOAStreamEvent(self.layers + 1, self.final_agent.agent_name,
+                                 "⚠️ Report generation failed. Please check logs for more details.", True)
+
+        logging.info("✅ Streaming MOA execution completed successfully.")
+
+    def _assemble_context(self, layer_results, layer, task):
+        """
+        Joins a layer's results into the next layer's task, within the token budget.
+        The budget is the smaller of layer_token_budget and the tokens the receiving
+        agents have left after their system prompt.
+        """
+        receivers = self.agents if layer + 1 < self.layers else [self.final_agent]
+        counter = self.context_builder.counter
+        budget = min(agent.context_length - counter.count(agent.system_prompt) for agent in receivers)
+        if self.layer_token_budget:
+            budget = min(budget, self.layer_token_budget)
+
+        context = self.context_builder.build(layer_results, query=task, token_budget=max(budget, 0))
+        logging.info(f"🧮 Layer {layer + 1} context: {counter.count(context)} tokens (budget {budget})")
+        return context
+
+    def _stream_layer(self, task, timed_out):
+        """
+        Streams every agent of a layer concurrently, yielding (agent index, chunk) in arrival order.
+        Indices of agents that miss the layer deadline are added to `timed_out`.
+        """
+        chunks = queue.Queue()
+
+        def pump(index, agent):
+            try:
+                for text in agent.stream(task):
+                    if text:
+                        chunks.put((index, text))
+            except Exception as e:
+                logging.error(f"❌ Agent {agent.agent_name} failed: {e}")
+            finally:
+                chunks.put((index, _STREAM_DONE))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-stream")
+        try:
+            for index, agent in enumerate(self.agents):
+                logging.info(f"🔍 Agent {agent.agent_name} streaming task...")
+                executor.submit(pump, index, agent)
+
+            deadline = None if self.agent_timeout is None else time.monotonic() + self.agent_timeout
+            remaining = set(range(len(self.agents)))
+            while remaining:
+                wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    index, text = chunks.get(timeout=wait)
+                except queue.Empty:
+                    for index in remaining:
+                        logging.error(f"❌ Agent {self.agents[index].agent_name} timed out after {self.agent_timeout}s!")
+                    timed_out.update(remaining)
+                    return
+                if text is _STREAM_DONE:
+                    remaining.discard(index)
+                elif index in remaining:
+                    yield index, text
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_layer_threaded(self, task):
+        """Runs every agent of a layer on a thread pool, returning results in agent order."""
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-layer")
+        try:
+            futures = []
+            for agent in self.agents:
+                logging.info(f"🔍 Agent {agent.agent_name} executing task...")
+                futures.append(executor.submit(agent.run, task))
+
+            deadline = None if self.agent_timeout is None else time.monotonic() + self.agent_timeout
+            results = []
+            for agent, future in zip(self.agents, futures):
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    result = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    future.cancel()
+                    logging.error(f"❌ Agent {agent.agent_name} timed out after {self.agent_timeout}s!")
+                    result = None
+                except Exception as e:
+                    logging.error(f"❌ Agent {agent.agent_name} failed: {e}")
+                    result = None
+                results.append(self._check_result(agent, result))
+            return results
+        finally:
+            # Don't block the layer on agents that already timed out
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_layer_async(self, task):
+        """
+        Runs every agent of a layer as asyncio tasks, returning results in agent order.
+        Blocking agent.run calls are moved onto a dedicated thread pool so they overlap.
+        """
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-layer")
+
+        async def run_agent(agent):
+            logging.info(f"🔍 Agent {agent.agent_name} executing task...")
+            call = loop.run_in_executor(pool, agent.run, task)
+            try:
+                result = await asyncio.wait_for(call, timeout=self.agent_timeout)
+            except asyncio.TimeoutError:
+                logging.error(f"❌ Agent {agent.agent_name} timed out after {self.agent_timeout}s!")
+                result = None
+            except Exception as e:
+                logging.error(f"❌ Agent {agent.agent_name} failed: {e}")
+                result = None
+            return self._check_result(agent, result)
+
+        try:
+            return await asyncio.gather(*(run_agent(agent) for agent in self.agents))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _check_result(self, agent, result):
+        """Substitutes a placeholder for empty agent output and logs a preview."""
+        if not result:
+            logging.error(f"❌ Agent {agent.agent_name} returned an empty response!")
+            result = f"⚠️ No data available from {agent.agent_name}."
+
+        logging.info(f"✅ Agent {agent.agent_name} completed task. Preview: {result[:200]}...")
+        return result
+
+
+if __name__ == "__main__":
+    # 🏢 **Define Agents with Detailed Prompts**
+    financial_agent = TroveAgent(
+        agent_name="FinancialStatementAnalyzer",
+        system_prompt="""
+        Provide an **in-depth financial analysis** for Indian and global companies:
+        - Key metrics: **Revenue, Net Profit, EBITDA, Debt-to-Equity ratio**.
+        - Analyze **trends over the past 5 years**.
+        - Assess **financial risks, growth opportunities, and profitability**.
+        - Evaluate **investment feasibility and financial health**.
+        """,
+        llm="gpt-4o",
+    )
+
+    risk_agent = TroveAgent(
+        agent_name="RiskAssessmentSpecialist",
+        system_prompt="""
+        Conduct a **comprehensive risk analysis**:
+        - **Market Risks**: Competitive threats, economic instability, inflation impact.
+        - **Regulatory & Compliance**: Government policies, tax laws, industry regulations.
+        - **Operational Risks**: Supply chain disruptions, workforce challenges, technological obsolescence.
+        - Suggest **risk mitigation strategies** for long-term sustainability.
+        """,
+        llm="gpt-4o",
+    )
+
+    strategy_agent = TroveAgent(
+        agent_name="BusinessStrategyEvaluator",
+        system_prompt="""
+        Evaluate **business strategy and competitive positioning**:
+        - **Industry Analysis**: Market trends, global expansion opportunities.
+        - **Competitive Landscape**: Direct competitors, market share, differentiation.
+        - **Strategic Growth Opportunities**: Mergers, acquisitions, R&D investment, sustainability.
+        - Provide **long-term growth recommendations** and market dominance strategies.
+        """,
+        llm="gpt-4o",
+    )
+
+    aggregator_agent = TroveAgent(
+        agent_name="ReportAggregator",
+        system_prompt="""
+        Generate a **rich, detailed 10-page business analysis report**:
+        1️⃣ **Company Overview** - Market positioning, history, key milestones.
+        2️⃣ **Financial Performance** - Revenue, profitability, debt trends over years.
+        3️⃣ **Risk Assessment** - Market, regulatory, financial, operational risks.
+        4️⃣ **Business Strategy Analysis** - Innovations, expansion, competition landscape.
+        5️⃣ **Market & Industry Trends** - EV sector growth, economic trends.
+        6️⃣ **Future Outlook & Recommendations** - Strategic directions, investment advice.
+        7️⃣ **Data Insights & Visualization** - Charts, trends, and comparisons.
+        """,
+        llm="gpt-4o",
+    )
+
+    # **🔥 Initialize Mixture-of-Agents**
+    moa = TroveMOA(
+        name="Trove-MOA-BusinessAnalysis",
+        agents=[financial_agent, risk_agent, strategy_agent],
+        layers=2,
+        final_agent=aggregator_agent,
+    )
+
+    # **🏢 Example Execution for Tesla**
+    company_name = "Tesla"
+    result = moa.run(f"Generate a comprehensive business analysis report for {company_name}.")
 
-# 🏢 **Define Agents with Detailed Prompts**
-financial_agent = TroveAgent(
-    agent_name="FinancialStatementAnalyzer",
-    system_prompt="""
-    Provide an **in-depth financial analysis** for Indian and global companies:
-    - Key metrics: **Revenue, Net Profit, EBITDA, Debt-to-Equity ratio**.
-    - Analyze **trends over the past 5 years**.
-    - Assess **financial risks, growth opportunities, and profitability**.
-    - Evaluate **investment feasibility and financial health**.
-    """,
-    llm="gpt-4o",
-)
-
-risk_agent = TroveAgent(
-    agent_name="RiskAssessmentSpecialist",
-    system_prompt="""
-    Conduct a **comprehensive risk analysis**:
-    - **Market Risks**: Competitive threats, economic instability, inflation impact.
-    - **Regulatory & Compliance**: Government policies, tax laws, industry regulations.
-    - **Operational Risks**: Supply chain disruptions, workforce challenges, technological obsolescence.
-    - Suggest **risk mitigation strategies** for long-term sustainability.
-    """,
-    llm="gpt-4o",
-)
-
-strategy_agent = TroveAgent(
-    agent_name="BusinessStrategyEvaluator",
-    system_prompt="""
-    Evaluate **business strategy and competitive positioning**:
-    - **Industry Analysis**: Market trends, global expansion opportunities.
-    - **Competitive Landscape**: Direct competitors, market share, differentiation.
-    - **Strategic Growth Opportunities**: Mergers, acquisitions, R&D investment, sustainability.
-    - Provide **long-term growth recommendations** and market dominance strategies.
-    """,
-    llm="gpt-4o",
-)
-
-aggregator_agent = TroveAgent(
-    agent_name="ReportAggregator",
-    system_prompt="""
-    Generate a **rich, detailed 10-page business analysis report**:
-    1️⃣ **Company Overview** - Market positioning, history, key milestones.
-    2️⃣ **Financial Performance** - Revenue, profitability, debt trends over years.
-    3️⃣ **Risk Assessment** - Market, regulatory, financial, operational risks.
-    4️⃣ **Business Strategy Analysis** - Innovations, expansion, competition landscape.
-    5️⃣ **Market & Industry Trends** - EV sector growth, economic trends.
-    6️⃣ **Future Outlook & Recommendations** - Strategic directions, investment advice.
-    7️⃣ **Data Insights & Visualization** - Charts, trends, and comparisons.
-    """,
-    llm="gpt-4o",
-)
-
-# **🔥 Initialize Mixture-of-Agents**
-moa = TroveMOA(
-    name="Trove-MOA-BusinessAnalysis",
-    agents=[financial_agent, risk_agent, strategy_agent],
-    layers=2,
-    final_agent=aggregator_agent,
-)
-
-# **🏢 Example Execution for Tesla**
-company_name = "Tesla"
-result = moa.run(f"Generate a comprehensive business analysis report for {company_name}.")
-
-print("\n📊 **Final Aggregated Report:**\n", result)
+    print("\n📊 **Final Aggregated Report:**\n", result)
@@ -0,0 +1,327 @@
+import os
+import copy
+import time
+import asyncio
+import logging
+import weakref
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_memory import ShortTermMemory
+
+
+@dataclass
+class _Session:
+    agent: TroveAgent
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    in_use: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _AsyncGate:
+    """Queue of one event loop's async callers for one session."""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+
+
+class AgentPool:
+    """
+    AgentPool: serves many concurrent users from one TroveAgent definition.
+    The template agent is configured once (system prompt, tools, LLM client, vector store).
+    Each session gets a lightweight shallow copy that shares those parts but has its own
+    user name, short-term memory and long-term memory, so sessions never see each other's history.
+    The shared vector store is read-only to sessions: history a session's short-term memory
+    evicts is archived in that session's long-term memory, never added to the shared store.
+    Requests for the same session are serialized; requests for different sessions run concurrently
+    up to `max_concurrent`. Idle sessions are evicted least-recently-used once `max_sessions` is reached.
+    Async callers of a session queue on an asyncio.Lock without holding threads; only the head of
+    that queue waits for the session in a thread, on the pool's own acquire threads, so waiting
+    never starves the default executor that runs the agents.
+    """
+
+    ACQUIRE_THREADS = 32
+
+    def __init__(self,
+                 template: TroveAgent,
+                 max_sessions: int = 1024,
+                 max_concurrent: Optional[int] = None,
+                 on_evict: Optional[Callable[[str, TroveAgent], None]] = None):
+        """
+        Initializes the pool.
+
+        :param template: Fully configured agent that sessions are copied from. It is never run directly.
+        :param max_sessions: Maximum sessions kept; the least recently used idle session is evicted beyond it.
+        :param max_concurrent: Maximum checkouts held at once across all sessions (None = no cap).
+        :param on_evict: Called with (session_id, agent) when a session is evicted or ended,
+                         e.g. to save its state.
+        """
+        if max_sessions < 1:
+            raise ValueError("AgentPool needs max_sessions >= 1.")
+        self.template = template
+        self.max_sessions = max_sessions
+        self.max_concurrent = max_concurrent
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _AsyncGate]]" = \
+            weakref.WeakKeyDictionary()
+        self._acquire_executor: Optional[ThreadPoolExecutor] = None
+        self._metrics = {"sessions_created": 0, "sessions_evicted": 0, "checkouts": 0, "waited_checkouts": 0,
+                         "timeouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                         "in_use": 0, "peak_in_use": 0, "waiting": 0}
+
+        logging.info(f"AgentPool for {template.agent_name} initialized "
+                     f"(max {max_sessions} sessions, max {max_concurrent or 'unbounded'} concurrent)")
+
+    def _new_agent(self, session_id: str, user_name: Optional[str]) -> TroveAgent:
+        """
+        Copies the template, sharing its tools, clients and (read-only) vector store but giving
+        the copy its own memory and state file.
+        """
+        template = self.template
+        agent = copy.copy(template)
+        memory = template.short_term_memory
+        agent.short_term_memory = ShortTermMemory(
+            max_entries=memory.max_entries,
+            max_bytes=memory.max_bytes,
+            # Spilling into the shared vector store would serve this session's history to every other session
+            on_evict=agent._archive_short_term if memory.on_evict is not None else None,
+        )
+        agent.long_term_memory = copy.deepcopy(template.long_term_memory)
+        agent.user_name = user_name or session_id
+        directory, filename = os.path.split(template.saved_state_path)
+        agent.saved_state_path = os.path.join(directory, f"{session_id}_{filename}")
+        agent.group_chat = None  # session copies are not members of the template's chat
+        return agent
+
+    def _session(self, session_id: str, user_name: Optional[str]) -> _Session:
+        """Returns a session, creating it if needed. Caller holds self._lock."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            return session
+
+        session = _Session(self._new_agent(session_id, user_name))
+        self._sessions[session_id] = session
+        self._metrics["sessions_created"] += 1
+        return session
+
+    def _evict_idle(self):
+        """Drops least recently used idle sessions while over capacity."""
+        evicted = []
+        with self._lock:
+            for session_id in list(self._sessions):
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                if self._sessions[session_id].in_use == 0:
+                    evicted.append((session_id, self._sessions.pop(session_id).agent))
+            self._metrics["sessions_evicted"] += len(evicted)
+        for session_id, agent in evicted:
+            logging.info(f"AgentPool evicted idle session {session_id}")
+            if self.on_evict is not None:
+                self.on_evict(session_id, agent)
+
+    def _acquire(self, session_id: str, user_name: Optional[str], timeout: Optional[float]) -> _Session:
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._lock:
+            session = self._session(session_id, user_name)
+            session.in_use += 1  # pins the session against eviction while waiting
+            self._metrics["waiting"] += 1
+        self._evict_idle()
+
+        # Session lock first, so a request queued behind its own session doesn't hold a pool slot
+        acquired_session = False
+        try:
+            acquired_session = session.lock.acquire(timeout=-1 if deadline is None else timeout)
+            if not acquired_session:
+                raise TimeoutError(f"Session {session_id} stayed busy for {timeout}s")
+            if self._slots is not None and not self._slots.acquire(
+                    timeout=None if deadline is None else max(deadline - time.monotonic(), 0)):
+                raise TimeoutError(f"AgentPool saturated: no slot free within {timeout}s")
+        except TimeoutError:
+            if acquired_session:
+                session.lock.release()
+            with self._lock:
+                session.in_use -= 1
+                self._metrics["waiting"] -= 1
+                self._metrics["timeouts"] += 1
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            metrics = self._metrics
+            metrics["waiting"] -= 1
+            metrics["checkouts"] += 1
+            metrics["in_use"] += 1
+            metrics["peak_in_use"] = max(metrics["peak_in_use"], metrics["in_use"])
+            metrics["wait_seconds"] += waited
+            metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], waited)
+            if waited > 0.001:
+                metrics["waited_checkouts"] += 1
+        return session
+
+    def _release(self, session: _Session):
+        session.last_used = time.monotonic()
+        if self._slots is not None:
+            self._slots.release()
+        session.lock.release()
+        with self._lock:
+            session.in_use -= 1
+            self._metrics["in_use"] -= 1
+        self._evict_idle()
+
+    @contextmanager
+    def checkout(self, session_id: str, user_name: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Iterator[TroveAgent]:
+        """
+        Checks out the agent for a session, blocking while the session is busy or the pool is saturated.
+
+        :param session_id: Session (e.g. conversation or user) identifier.
+        :param user_name: User name set on a newly created session agent (defaults to the session id).
+        :param timeout: Seconds to wait before raising TimeoutError (None = wait forever).
+        """
+        session = self._acquire(session_id, user_name, timeout)
+        try:
+            yield session.agent
+        finally:
+            self._release(session)
+
+    def _enter_gate(self, loop: asyncio.AbstractEventLoop, session_id: str) -> _AsyncGate:
+        with self._lock:
+            gates = self._gates.setdefault(loop, {})
+            gate = gates.get(session_id)
+            if gate is None:
+                gate = gates[session_id] = _AsyncGate()
+            gate.users += 1
+            if self._acquire_executor is None:
+                self._acquire_executor = ThreadPoolExecutor(max_workers=self.ACQUIRE_THREADS,
+                                                            thread_name_prefix="AgentPool-acquire")
+        return gate
+
+    def _leave_gate(self, loop: asyncio.AbstractEventLoop, session_id: str, gate: _AsyncGate):
+        with self._lock:
+            gate.users -= 1
+            gates = self._gates.get(loop)
+            if gate.users == 0 and gates is not None and gates.get(session_id) is gate:
+                del gates[session_id]
+
+    def _release_acquired(self, future: Future):
+        """Releases a session whose thread-side acquire finished after its async waiter was cancelled."""
+        if not future.cancelled() and future.exception() is None:
+            self._release(future.result())
+
+    async def _aacquire(self, session_id: str, user_name: Optional[str],
+                        timeout: Optional[float]) -> Tuple[_Session, _AsyncGate]:
+        """Async counterpart of _acquire. Must be paired with _arelease on the same event loop."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        gate = self._enter_gate(loop, session_id)
+        queued = False
+        try:
+            try:
+                async with asyncio.timeout(timeout):
+                    await gate.lock.acquire()
+                queued = True
+            except TimeoutError:
+                with self._lock:
+                    self._metrics["timeouts"] += 1
+                raise TimeoutError(f"Session {session_id} stayed busy for {timeout}s") from None
+
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            pending = self._acquire_executor.submit(self._acquire, session_id, user_name, remaining)
+            try:
+                session = await asyncio.wrap_future(pending)
+            except asyncio.CancelledError:
+                pending.add_done_callback(self._release_acquired)  # the thread may still get the session
+                raise
+        except BaseException:
+            if queued:
+                gate.lock.release()
+            self._leave_gate(loop, session_id, gate)
+            raise
+        return session, gate
+
+    def _arelease(self, session_id: str, session: _Session, gate: _AsyncGate):
+        """Releases an async checkout. Runs on the event loop that acquired it."""
+        try:
+            self._release(session)
+        finally:
+            gate.lock.release()
+            self._leave_gate(asyncio.get_running_loop(), session_id, gate)
+
+    @asynccontextmanager
+    async def acheckout(self, session_id: str, user_name: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Async checkout: waits for the session without blocking the event loop. Cancelling a
+        waiting caller never leaves the session held.
+        """
+        session, gate = await self._aacquire(session_id, user_name, timeout)
+        try:
+            yield session.agent
+        finally:
+            self._arelease(session_id, session, gate)
+
+    def run(self, session_id: str, task: str, user_name: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """Runs a task on a session's agent."""
+        with self.checkout(session_id, user_name, timeout) as agent:
+            return agent.run(task)
+
+    async def arun(self, session_id: str, task: str, user_name: Optional[str] = None,
+                   timeout: Optional[float] = None) -> str:
+        """
+        Runs a task on a session's agent without blocking the event loop. If the caller is
+        cancelled, the session stays checked out until the already running task finishes.
+        """
+        session, gate = await self._aacquire(session_id, user_name, timeout)
+        loop = asyncio.get_running_loop()
+        try:
+            running = loop.run_in_executor(None, session.agent.run, task)
+        except BaseException:
+            self._arelease(session_id, session, gate)
+            raise
+
+        def finished(future: asyncio.Future):
+            if not future.cancelled():
+                future.exception()  # retrieved here too, in case the caller was cancelled
+            self._arelease(session_id, session, gate)
+
+        running.add_done_callback(finished)
+        return await asyncio.shield(running)
+
+    def end_session(self, session_id: str) -> bool:
+        """Removes a session once it is idle. Returns False if it is unknown or in use."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.in_use:
+                return False
+            del self._sessions[session_id]
+        if self.on_evict is not None:
+            self.on_evict(session_id, session.agent)
+        return True
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns pool size and saturation metrics."""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["sessions"] = len(self._sessions)
+            stats["max_sessions"] = self.max_sessions
+            stats["max_concurrent"] = self.max_concurrent
+        checkouts = stats["checkouts"]
+        stats["utilization"] = stats["in_use"] / self.max_concurrent if self.max_concurrent else None
+        stats["mean_wait_seconds"] = stats["wait_seconds"] / checkouts if checkouts else 0.0
+        stats["waited_fraction"] = stats["waited_checkouts"] / checkouts if checkouts else 0.0
+        return stats
@@ -0,0 +1,254 @@
+import io
+import os
+import json
+import mmap
+import struct
+import logging
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+
+from agents_trove.trove_persistence import atomic_write
+
+try:
+    import msgpack
+except ImportError:  # Optional: generic blocks fall back to JSON
+    msgpack = None
+
+MAGIC = b"TROVEAG1"
+_HEADER_LENGTH = struct.Struct("<Q")
+_ALIGNMENT = 8
+_INT64_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def _encode_generic(value: Any) -> tuple:
+    if msgpack is not None:
+        try:
+            return "msgpack", msgpack.packb(value, use_bin_type=True)
+        except (OverflowError, TypeError, ValueError):  # e.g. integers wider than 64 bits
+            pass
+    return "json", json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _decode_generic(codec: str, data) -> Any:
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ImportError("This state file uses msgpack blocks; install msgpack to read it.")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if codec == "json":
+        return json.loads(bytes(data).decode("utf-8"))
+    raise ValueError(f"Unknown block codec '{codec}'")
+
+
+def _column_dtype(column: List[Any]) -> Optional[str]:
+    """Returns the raw array dtype a column can be stored as without loss, if any."""
+    if all(type(item) is float for item in column):
+        return "<f8"
+    if all(type(item) is int for item in column) and \
+            _INT64_RANGE[0] <= min(column) and max(column) <= _INT64_RANGE[1]:
+        return "<i8"
+    return None
+
+
+def _record_keys(value: Any) -> Optional[List[str]]:
+    """Returns the shared keys of a list of same-shaped dicts (e.g. energy records), else None."""
+    if not isinstance(value, list) or len(value) < 2 or not isinstance(value[0], dict):
+        return None
+    keys = list(value[0])
+    if not all(isinstance(key, str) for key in keys):
+        return None
+    for record in value:
+        if not isinstance(record, dict) or len(record) != len(keys) or list(record) != keys:
+            return None
+    return keys
+
+
+class _BlockWriter:
+    """Collects 8-byte aligned data blocks and records their offsets relative to the data section."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def add(self, data: bytes) -> Dict[str, int]:
+        offset = self.buffer.tell()
+        self.buffer.write(data)
+        self.buffer.write(b"\0" * (-len(data) % _ALIGNMENT))
+        return {"offset": offset, "length": len(data)}
+
+    def add_value(self, value: Any) -> Dict[str, Any]:
+        """Stores a value, as raw column arrays when it is a list of same-shaped records."""
+        keys = _record_keys(value)
+        if keys is not None:
+            columns = []
+            for key in keys:
+                column = [record[key] for record in value]
+                dtype = _column_dtype(column)
+                if dtype is not None:
+                    columns.append(dict(self.add(np.asarray(column, dtype=dtype).tobytes()), name=key, dtype=dtype))
+                else:
+                    codec, data = _encode_generic(column)
+                    columns.append(dict(self.add(data), name=key, codec=codec))
+            return {"codec": "records", "rows": len(value), "columns": columns}
+        codec, data = _encode_generic(value)
+        return dict(self.add(data), codec=codec)
+
+
+def write_binary(path: str, state: Dict[str, Any]):
+    """
+    Writes agent state in the Trove binary format, atomically.
+
+    Layout: MAGIC, an 8-byte header length, a JSON header holding the plain config fields
+    and a block table, then 8-byte aligned data blocks. Short-term memory and each
+    long-term memory key get their own block. Lists of same-shaped records (such as energy
+    data) are stored column-wise, with numeric columns as raw little-endian arrays, so
+    they can be memory-mapped without parsing; other values are msgpack (or JSON when
+    msgpack is not installed).
+
+    :param path: Target file path.
+    :param state: State dictionary as produced by TroveAgent.to_dict().
+    """
+    blocks = _BlockWriter()
+    config = {key: value for key, value in state.items() if key not in ("short_term_memory", "long_term_memory")}
+    header = {
+        "format": 1,
+        "config": config,
+        "short_term_memory": blocks.add_value(list(state.get("short_term_memory", []))),
+        "long_term_memory": {key: blocks.add_value(value)
+                             for key, value in state.get("long_term_memory", {}).items()},
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + _HEADER_LENGTH.size + len(header_bytes)) % _ALIGNMENT)
+    atomic_write(path, MAGIC + _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes + blocks.buffer.getvalue())
+
+
+class LazyMemory(MutableMapping):
+    """
+    Long-term memory backed by a memory-mapped binary state file.
+    Keys are known up front; a value is decoded from the file the first time it is read
+    and kept afterwards. Assigning or deleting a key works like a normal dict.
+    """
+
+    def __init__(self, buffer, data_offset: int, blocks: Dict[str, Dict[str, Any]]):
+        self._buffer = buffer
+        self._data_offset = data_offset
+        self._blocks = dict(blocks)
+        self._pending = dict(blocks)
+        self._values: Dict[str, Any] = {}
+        self._order = list(blocks)
+
+    def _view(self, descriptor: Dict[str, Any]) -> memoryview:
+        start = self._data_offset + descriptor["offset"]
+        return memoryview(self._buffer)[start:start + descriptor["length"]]
+
+    def _decode(self, descriptor: Dict[str, Any]) -> Any:
+        if descriptor["codec"] != "records":
+            return _decode_generic(descriptor["codec"], self._view(descriptor))
+        columns = self._columns(descriptor)
+        names = list(columns)
+        values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def _columns(self, descriptor: Dict[str, Any]) -> Dict[str, Any]:
+        columns = {}
+        for column in descriptor["columns"]:
+            if "dtype" in column:
+                columns[column["name"]] = np.frombuffer(self._view(column), dtype=column["dtype"])
+            else:
+                columns[column["name"]] = _decode_generic(column["codec"], self._view(column))
+        return columns
+
+    def columns(self, key: str) -> Dict[str, Any]:
+        """
+        Returns a record block as columns without building the records: numeric columns are
+        read-only arrays mapped straight from the file, other columns are lists.
+        """
+        descriptor = self._blocks.get(key)
+        if descriptor is None or descriptor["codec"] != "records":
+            raise KeyError(f"'{key}' is not a stored record block")
+        return self._columns(descriptor)
+
+    def is_loaded(self, key: str) -> bool:
+        """Returns True if a key's value has been decoded (or assigned) already."""
+        return key in self._values
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._values:
+            return self._values[key]
+        descriptor = self._pending.pop(key)  # KeyError for unknown keys
+        value = self._values[key] = self._decode(descriptor)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self._blocks.pop(key, None)
+        self._pending.pop(key, None)
+        if key not in self._values and key not in self._order:
+            self._order.append(key)
+        self._values[key] = value
+
+    def __delitem__(self, key: str):
+        if key not in self._values and key not in self._pending:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self._blocks.pop(key, None)
+        self._pending.pop(key, None)
+        self._order.remove(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._order))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __repr__(self) -> str:
+        return f"LazyMemory(keys={self._order!r}, loaded={list(self._values)!r})"
+
+
+class BinaryState:
+    """
+    A Trove binary state file opened for reading. The config is parsed immediately;
+    short-term memory and long-term memory values are decoded on first access.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: File written by write_binary.
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                raise ValueError(f"{path} is empty")
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buffer[:len(MAGIC)] != MAGIC:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a Trove binary state file")
+
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._buffer, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(self._buffer[header_start:header_start + header_length].decode("utf-8"))
+        data_offset = header_start + header_length
+
+        self.config: Dict[str, Any] = header["config"]
+        self.long_term_memory = LazyMemory(self._buffer, data_offset, header["long_term_memory"])
+        self._short_term = LazyMemory(self._buffer, data_offset, {"entries": header["short_term_memory"]})
+
+    @property
+    def short_term_memory(self) -> List[str]:
+        return self._short_term["entries"]
+
+    def close(self):
+        """Releases the mapping. Values decoded so far stay usable; numeric column views do not."""
+        try:
+            self._buffer.close()
+        except BufferError:
+            logging.debug(f"{self.path} is still referenced by column views; leaving it mapped")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_binary(path: str) -> BinaryState:
+    """Opens a Trove binary state file for lazy reading."""
+    return BinaryState(path)
@@ -1 +1,266 @@
-# trove_concurrent_workflows.py
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from agents_trove.trove_agent import TroveAgent
+
+
+@dataclass
+class WorkflowNode:
+    """A unit of work: a TroveAgent run or a tool call, plus the nodes it depends on."""
+    name: str
+    runner: Union[TroveAgent, Callable[..., Any]]
+    depends_on: List[str] = field(default_factory=list)
+    task_template: Optional[str] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class WorkflowRun:
+    """Results and timing report of one workflow execution."""
+    results: Dict[str, Any]
+    errors: Dict[str, str]
+    timings: Dict[str, Tuple[float, float]]
+    resumed: List[str]
+    critical_path: List[str]
+    critical_path_latency: float
+    wall_clock: float
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.errors
+
+
+class TroveConcurrentWorkflow:
+    """
+    TroveConcurrentWorkflow: a DAG scheduler for agents and tools.
+    Each node starts as soon as all of its dependencies have finished, on a bounded worker pool.
+    Finished node results can be checkpointed so a failed run resumes without repeating LLM calls,
+    and every run reports its critical path.
+    """
+
+    def __init__(self, name: str, max_workers: int = 4, checkpoint_path: Optional[str] = None):
+        """
+        Initializes the workflow.
+
+        :param name: Name of the workflow.
+        :param max_workers: Maximum nodes running at once.
+        :param checkpoint_path: JSON file where finished node results are kept between runs (None = no checkpointing).
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.checkpoint_path = checkpoint_path
+        self.nodes: Dict[str, WorkflowNode] = {}
+        self._checkpoint_lock = threading.Lock()
+
+    def add_node(self,
+                 name: str,
+                 runner: Union[TroveAgent, Callable[..., Any]],
+                 depends_on: Optional[List[str]] = None,
+                 task_template: Optional[str] = None,
+                 params: Optional[Dict[str, Any]] = None) -> "TroveConcurrentWorkflow":
+        """
+        Adds a node to the workflow.
+
+        Agent nodes receive a task string: `task_template` formatted with `task` and the outputs
+        of their dependencies (by node name), or by default the workflow task followed by the
+        dependency outputs. Callable nodes are called with `params` plus the dependency outputs
+        as keyword arguments.
+
+        :param name: Unique node name.
+        :param runner: A TroveAgent, or a callable such as a tool function.
+        :param depends_on: Names of the nodes whose outputs this node needs.
+        :param task_template: Optional format string for agent tasks, e.g. "Summarize: {research}".
+        :param params: Static keyword arguments for callable nodes.
+        :return: The workflow, so calls can be chained.
+        """
+        if name in self.nodes:
+            raise ValueError(f"Node '{name}' already exists in workflow {self.name}.")
+        self.nodes[name] = WorkflowNode(name, runner, list(depends_on or []), task_template, dict(params or {}))
+        return self
+
+    def topological_order(self) -> List[str]:
+        """Returns node names in dependency order, raising ValueError on unknown dependencies or cycles."""
+        indegree = {name: 0 for name in self.nodes}
+        for node in self.nodes.values():
+            for dependency in node.depends_on:
+                if dependency not in self.nodes:
+                    raise ValueError(f"Node '{node.name}' depends on unknown node '{dependency}'.")
+                indegree[node.name] += 1
+
+        order = [name for name, degree in indegree.items() if degree == 0]
+        for name in order:
+            for child in self._children(name):
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    order.append(child)
+
+        if len(order) != len(self.nodes):
+            cyclic = sorted(set(self.nodes) - set(order))
+            raise ValueError(f"Workflow {self.name} has a dependency cycle involving: {cyclic}")
+        return order
+
+    def _children(self, name: str) -> List[str]:
+        return [node.name for node in self.nodes.values() if name in node.depends_on]
+
+    def run(self, task: str = "", resume: bool = True) -> WorkflowRun:
+        """
+        Executes the workflow.
+
+        :param task: The workflow task, passed to every agent node.
+        :param resume: Reuse checkpointed results from an earlier run of the same task.
+        :return: WorkflowRun with results, errors, timings and the critical path.
+        """
+        order = self.topological_order()
+        children = {name: self._children(name) for name in order}
+        pending = {name: len(self.nodes[name].depends_on) for name in order}
+
+        results = self._load_checkpoint(task) if resume else {}
+        results = {name: value for name, value in results.items() if name in self.nodes}
+        resumed = list(results)
+        errors: Dict[str, str] = {}
+        timings: Dict[str, Tuple[float, float]] = {}
+        if resumed:
+            logging.info(f"Workflow {self.name} resuming with {len(resumed)} checkpointed nodes: {resumed}")
+
+        for name in resumed:
+            for child in children[name]:
+                pending[child] -= 1
+
+        started = time.perf_counter()
+        ready = [name for name in order if pending[name] == 0 and name not in results]
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as executor:
+            while ready or in_flight:
+                for name in ready:
+                    node = self.nodes[name]
+                    inputs = {dependency: results[dependency] for dependency in node.depends_on}
+                    logging.info(f"Workflow {self.name}: starting node {name}")
+                    in_flight[executor.submit(self._execute, node, task, inputs, started)] = name
+                ready = []
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = in_flight.pop(future)
+                    try:
+                        result, node_started, node_finished = future.result()
+                    except Exception as e:
+                        logging.error(f"Workflow {self.name}: node {name} failed: {e}")
+                        errors[name] = str(e)
+                        for skipped in self._descendants(name, children):
+                            errors.setdefault(skipped, f"Skipped because upstream node '{name}' failed.")
+                        continue
+
+                    results[name] = result
+                    timings[name] = (node_started, node_finished)
+                    logging.info(f"Workflow {self.name}: node {name} finished in {node_finished - node_started:.2f}s")
+                    self._save_checkpoint(task, results)
+
+                    for child in children[name]:
+                        pending[child] -= 1
+                        if pending[child] == 0 and child not in errors:
+                            ready.append(child)
+
+        wall_clock = time.perf_counter() - started
+        critical_path, critical_latency = self._critical_path(order, timings)
+        logging.info(f"Workflow {self.name} finished in {wall_clock:.2f}s; critical path "
+                     f"{' -> '.join(critical_path) or '(none)'} = {critical_latency:.2f}s")
+
+        return WorkflowRun(results, errors, timings, resumed, critical_path, critical_latency, wall_clock)
+
+    def _execute(self, node: WorkflowNode, task: str, inputs: Dict[str, Any], origin: float):
+        """Runs a single node, returning (result, start offset, end offset) relative to the run start."""
+        node_started = time.perf_counter() - origin
+        if isinstance(node.runner, TroveAgent):
+            result = node.runner.run(self._agent_task(node, task, inputs))
+        else:
+            result = node.runner(**node.params, **inputs)
+        return result, node_started, time.perf_counter() - origin
+
+    @staticmethod
+    def _agent_task(node: WorkflowNode, task: str, inputs: Dict[str, Any]) -> str:
+        """Builds the task string for an agent node."""
+        if node.task_template:
+            return node.task_template.format(task=task, **inputs)
+        sections = [task] if task else []
+        sections.extend(f"[{name}]\n{value}" for name, value in inputs.items())
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _descendants(name: str, children: Dict[str, List[str]]) -> List[str]:
+        found, stack = [], list(children[name])
+        while stack:
+            child = stack.pop()
+            if child not in found:
+                found.append(child)
+                stack.extend(children[child])
+        return found
+
+    def _critical_path(self, order: List[str], timings: Dict[str, Tuple[float, float]]):
+        """Longest chain of dependent node durations among the nodes executed in this run."""
+        longest: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for name in order:
+            duration = timings[name][1] - timings[name][0] if name in timings else 0.0
+            best, best_dependency = 0.0, None
+            for dependency in self.nodes[name].depends_on:
+                if longest.get(dependency, 0.0) > best:
+                    best, best_dependency = longest[dependency], dependency
+            longest[name] = best + duration
+            previous[name] = best_dependency
+
+        if not longest:
+            return [], 0.0
+        end = max(longest, key=longest.get)
+        path = []
+        while end is not None:
+            if end in timings:
+                path.append(end)
+            end = previous[end]
+        path.reverse()
+        return path, max(longest.values())
+
+    def _load_checkpoint(self, task: str) -> Dict[str, Any]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, "r") as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Workflow {self.name}: ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return {}
+        if checkpoint.get("task") != task:
+            return {}
+        return checkpoint.get("results", {})
+
+    def _save_checkpoint(self, task: str, results: Dict[str, Any]):
+        """Atomically rewrites the checkpoint with every JSON-serializable result."""
+        if not self.checkpoint_path:
+            return
+        serializable = {}
+        for name, value in results.items():
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            serializable[name] = value
+
+        with self._checkpoint_lock:
+            directory = os.path.dirname(self.checkpoint_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.checkpoint_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump({"workflow": self.name, "task": task, "results": serializable}, file)
+            os.replace(temp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        """Deletes the checkpoint so the next run starts from scratch."""
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
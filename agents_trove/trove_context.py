@@ -0,0 +1,169 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import Callable, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a regex approximation
+    tiktoken = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_PATTERN = re.compile(r"[^\n.!?]+(?:[.!?]+|\n+|$)")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class TokenCounter:
+    """
+    Counts and truncates text by tokens with a local tokenizer.
+    Uses tiktoken when it is installed and its encoding is available offline,
+    otherwise a word/punctuation regex that tracks BPE counts closely enough for budgeting.
+    """
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        """
+        :param encoding: tiktoken encoding name.
+        """
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                logging.warning(f"tiktoken encoding {encoding} unavailable ({e}); using approximate token counts")
+
+    def count(self, text: str) -> int:
+        """Returns the number of tokens in a text."""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return sum(1 for _ in _TOKEN_PATTERN.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Returns the longest prefix of a text that fits in max_tokens."""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+        for index, match in enumerate(_TOKEN_PATTERN.finditer(text)):
+            if index + 1 == max_tokens:
+                return text[:match.end()]
+        return text
+
+
+class ContextBuilder:
+    """
+    Assembles several agent outputs into one prompt that fits a token budget.
+    When the joined outputs exceed the budget they are truncated fairly, reduced to
+    the excerpts most relevant to the query, or summarized.
+    """
+
+    STRATEGIES = ("truncate", "excerpt", "summarize")
+
+    def __init__(self,
+                 token_budget: int,
+                 strategy: str = "truncate",
+                 counter: Optional[TokenCounter] = None,
+                 summarizer: Optional[Callable[[str], str]] = None,
+                 separator: str = "\n\n"):
+        """
+        :param token_budget: Maximum tokens in the assembled context.
+        :param strategy: "truncate", "excerpt" or "summarize".
+        :param counter: TokenCounter to use (a shared default is created if omitted).
+        :param summarizer: Callable taking a prompt and returning a summary, e.g. an agent's run method.
+                           Required for the "summarize" strategy.
+        :param separator: Text placed between outputs.
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown context strategy '{strategy}'. Expected one of {self.STRATEGIES}.")
+        if strategy == "summarize" and summarizer is None:
+            raise ValueError("The 'summarize' context strategy needs a summarizer.")
+
+        self.token_budget = token_budget
+        self.strategy = strategy
+        self.counter = counter or TokenCounter()
+        self.summarizer = summarizer
+        self.separator = separator
+
+    def build(self, results: List[str], query: str = "", token_budget: Optional[int] = None) -> str:
+        """
+        Joins results into a context that fits the token budget.
+
+        :param results: Agent outputs, in order.
+        :param query: Task the context is for; used to rank excerpts.
+        :param token_budget: Overrides the builder's budget for this call.
+        :return: The assembled context.
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        sizes = [self.counter.count(result) for result in results]
+        separator_cost = self.counter.count(self.separator) * max(len(results) - 1, 0)
+        available = max(budget - separator_cost, 0)
+
+        if sum(sizes) <= available:
+            return self.separator.join(results)
+
+        logging.info(f"Context of {sum(sizes)} tokens exceeds budget of {budget}; applying '{self.strategy}'")
+        if self.strategy == "excerpt":
+            return self._excerpt(results, query, available)
+
+        shares = self._fair_shares(sizes, available)
+        if self.strategy == "summarize":
+            results = [self._summarize(result, size, share)
+                       for result, size, share in zip(results, sizes, shares)]
+        return self.separator.join(self.counter.truncate(result, share)
+                                   for result, share in zip(results, shares))
+
+    @staticmethod
+    def _fair_shares(sizes: List[int], budget: int) -> List[int]:
+        """Max-min fair split of a budget: short results keep everything, long ones share the rest."""
+        shares = [0] * len(sizes)
+        remaining = sorted(range(len(sizes)), key=lambda index: sizes[index])
+        while remaining:
+            share = budget // len(remaining)
+            index = remaining[0]
+            if sizes[index] > share:
+                for index in remaining:
+                    shares[index] = share
+                break
+            shares[index] = sizes[index]
+            budget -= sizes[index]
+            remaining.pop(0)
+        return shares
+
+    def _summarize(self, result: str, size: int, share: int) -> str:
+        if size <= share:
+            return result
+        prompt = (f"Summarize the following in at most {share} tokens, keeping key facts and figures:"
+                  f"\n\n{result}")
+        return self.summarizer(prompt) or result
+
+    def _excerpt(self, results: List[str], query: str, budget: int) -> str:
+        """Keeps the sentences that best match the query, in their original order."""
+        sentences = []  # (result index, position, text, tokens)
+        for result_index, result in enumerate(results):
+            for position, match in enumerate(_SENTENCE_PATTERN.finditer(result)):
+                text = match.group().strip()
+                if text:
+                    sentences.append((result_index, position, text, self.counter.count(text)))
+
+        terms = [set(_WORD_PATTERN.findall(text.lower())) for _, _, text, _ in sentences]
+        document_frequency = Counter(term for sentence_terms in terms for term in sentence_terms)
+        query_terms = set(_WORD_PATTERN.findall(query.lower()))
+        total = len(sentences) or 1
+
+        def score(index):
+            overlap = terms[index] & query_terms if query_terms else terms[index]
+            weight = sum(math.log(1 + total / document_frequency[term]) for term in overlap)
+            return weight / math.sqrt(sentences[index][3] + 1)
+
+        chosen, used = [], 0
+        for index in sorted(range(len(sentences)), key=score, reverse=True):
+            cost = sentences[index][3] + 1
+            if used + cost <= budget:
+                chosen.append(index)
+                used += cost
+
+        grouped = {}
+        for index in sorted(chosen, key=lambda i: sentences[i][:2]):
+            grouped.setdefault(sentences[index][0], []).append(sentences[index][2])
+        return self.separator.join(" ".join(grouped[result_index]) for result_index in sorted(grouped))
@@ -1 +1,469 @@
-# trove_group_chat.py
+import re
+import time
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_context import TokenCounter
+
+BROADCAST = "all"
+
+TURN_TEMPLATE = ("You are {name} in a group chat with {participants}.\n\n"
+                 "{direct}Conversation so far (most recent last):\n{history}\n\n"
+                 "Write your next message to the group.")
+DIRECT_TEMPLATE = "Direct messages to you since your last turn:\n{messages}\n\n"
+
+
+@dataclass
+class ChatMessage:
+    """One message of a group chat transcript."""
+    index: int
+    speaker: str
+    content: str
+    tokens: int  # tokens of the rendered line, counted once when the message is appended
+    recipient: Optional[str] = None  # None = everyone
+    timestamp: float = field(default_factory=time.time)
+
+    def render(self) -> str:
+        if self.recipient is None:
+            return f"{self.speaker}: {self.content}"
+        return f"{self.speaker} (to {self.recipient}): {self.content}"
+
+
+class _TokenLog:
+    """Positions of messages in the transcript with a prefix sum of their tokens."""
+
+    def __init__(self):
+        self.indices: List[int] = []
+        self.cumulative: List[int] = [0]
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def append(self, index: int, tokens: int):
+        self.indices.append(index)
+        self.cumulative.append(self.cumulative[-1] + tokens)
+
+    def span(self, budget: int, start: int = 0, end: Optional[int] = None) -> Tuple[int, int]:
+        """Returns the longest range [first, end) of entries after `start` whose tokens fit the budget, in O(log n)."""
+        end = len(self.indices) if end is None else end
+        first = bisect.bisect_left(self.cumulative, self.cumulative[end] - budget, start, end)
+        return first, end
+
+
+class Transcript:
+    """
+    Transcript: the append-only message log shared by every agent of a group chat.
+    Each message is stored once and its token count is computed once. A prefix sum of
+    token counts lets a reader take the newest messages that fit a token budget with a
+    binary search, so building a turn's context costs O(log n) plus the size of the window
+    instead of a pass over (or a copy of) the whole history. Direct messages are kept in
+    per-recipient logs of their own and never appear in other agents' windows.
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None):
+        """
+        :param counter: TokenCounter used to size messages (a new one if omitted).
+        """
+        self.counter = counter or TokenCounter()
+        self._messages: List[ChatMessage] = []
+        self._public = _TokenLog()
+        self._direct: Dict[str, _TokenLog] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index: int) -> ChatMessage:
+        return self._messages[index]
+
+    def append(self, speaker: str, content: str, recipient: Optional[str] = None) -> ChatMessage:
+        """Adds a message to the end of the transcript. recipient=None addresses everyone."""
+        content = "" if content is None else str(content)
+        message = ChatMessage(0, speaker, content, 0, recipient)
+        message.tokens = self.counter.count(message.render()) + 1  # + the line break joining it to the next
+        with self._lock:
+            message.index = len(self._messages)
+            self._messages.append(message)
+            if recipient is None:
+                self._public.append(message.index, message.tokens)
+            else:
+                self._direct.setdefault(recipient, _TokenLog()).append(message.index, message.tokens)
+        return message
+
+    def since(self, cursor: int) -> List[ChatMessage]:
+        """Returns every message appended after the first `cursor` messages (public and direct)."""
+        with self._lock:
+            return self._messages[cursor:]
+
+    def public_count(self, end: Optional[int] = None) -> int:
+        """Number of public messages among the first `end` transcript messages (all of them by default)."""
+        with self._lock:
+            if end is None:
+                return len(self._public)
+            return bisect.bisect_left(self._public.indices, end)
+
+    def direct_count(self, recipient: str) -> int:
+        """Number of direct messages ever addressed to a recipient."""
+        with self._lock:
+            log = self._direct.get(recipient)
+            return len(log) if log else 0
+
+    def public_tokens(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Tokens of public messages [start, end) in O(1) (positions count public messages only)."""
+        with self._lock:
+            cumulative = self._public.cumulative
+            return cumulative[len(cumulative) - 1 if end is None else end] - cumulative[start]
+
+    def window(self, budget: int, end: Optional[int] = None) -> List[ChatMessage]:
+        """
+        Returns the newest public messages that fit in `budget` tokens, oldest first.
+
+        :param budget: Token budget of the window.
+        :param end: Only consider the first `end` transcript messages (a snapshot of the transcript length).
+        """
+        with self._lock:
+            stop = len(self._public) if end is None else bisect.bisect_left(self._public.indices, end)
+            first, stop = self._public.span(budget, 0, stop)
+            return [self._messages[index] for index in self._public.indices[first:stop]]
+
+    def direct_window(self, recipient: str, budget: int, start: int = 0,
+                      end: Optional[int] = None) -> List[ChatMessage]:
+        """
+        Returns the newest direct messages to a recipient that fit in `budget` tokens, oldest first.
+
+        :param start: Skip the first `start` direct messages to the recipient (those already read).
+        :param end: Only consider direct messages among the first `end` transcript messages.
+        """
+        with self._lock:
+            log = self._direct.get(recipient)
+            if not log:
+                return []
+            stop = len(log) if end is None else bisect.bisect_left(log.indices, end)
+            first, stop = log.span(budget, min(start, stop), stop)
+            return [self._messages[index] for index in log.indices[first:stop]]
+
+    def latest(self, end: Optional[int] = None) -> Optional[ChatMessage]:
+        """Returns the newest public message among the first `end` transcript messages."""
+        with self._lock:
+            stop = len(self._public) if end is None else bisect.bisect_left(self._public.indices, end)
+            return self._messages[self._public.indices[stop - 1]] if stop else None
+
+    @staticmethod
+    def render(messages: List[ChatMessage]) -> str:
+        return "\n".join(message.render() for message in messages)
+
+    def total_tokens(self) -> int:
+        with self._lock:
+            return self._public.cumulative[-1] + sum(log.cumulative[-1] for log in self._direct.values())
+
+
+@dataclass
+class _Participant:
+    agent: TroveAgent
+    position: int
+    direct_read: int = 0  # direct messages already shown to the agent
+    cursor: int = 0  # transcript length when the agent last spoke
+    turns: int = 0
+    errors: int = 0
+
+
+@dataclass
+class GroupChatRun:
+    """Outcome of one TroveGroupChat conversation."""
+    result: str
+    messages: List[ChatMessage]
+    rounds: int
+    errors: Dict[str, str] = field(default_factory=dict)
+    prompt_tokens: int = 0  # tokens sent to agents over the whole run
+    max_prompt_tokens: int = 0  # largest single prompt, never above the chat's cap
+    elapsed: float = 0.0
+
+
+class TroveGroupChat:
+    """
+    TroveGroupChat: several TroveAgents talking in one shared conversation.
+    The conversation lives in a single append-only Transcript. On its turn an agent gets a
+    prompt built from the newest messages that fit `max_prompt_tokens` (plus any direct
+    messages sent to it), so the history is neither copied into each agent's memory nor
+    resent in full: memory grows linearly with the number of messages and every turn costs
+    at most `max_prompt_tokens`, however long the chat runs. A round lets up to
+    `max_concurrent_speakers` agents speak at once; they all read the same snapshot of the
+    transcript, so their answers are independent and are appended in speaking order.
+    Turn prompts go straight to each agent's model (TroveAgent.reply): no retrieval is added,
+    so the cap holds, and tool calls quoted in the history are never executed.
+    Agents in the chat can message each other with TroveAgent.send_agent_message.
+    """
+
+    SELECTIONS = ("round_robin", "mention")
+
+    def __init__(self,
+                 name: str,
+                 agents: List[TroveAgent],
+                 max_prompt_tokens: int = 4000,
+                 max_concurrent_speakers: int = 1,
+                 speaker_selection: Union[str, Callable[["TroveGroupChat", int], List[str]]] = "round_robin",
+                 max_rounds: int = 10,
+                 stop_phrase: Optional[str] = None,
+                 direct_share: float = 0.25,
+                 turn_template: str = TURN_TEMPLATE,
+                 transcript: Optional[Transcript] = None):
+        """
+        Initializes the group chat.
+
+        :param name: Name of the chat.
+        :param agents: Participating agents; their names must be unique.
+        :param max_prompt_tokens: Hard cap on the tokens of any prompt sent to an agent, system
+                                  prompt included (also capped by each agent's context_length).
+        :param max_concurrent_speakers: Agents generating at once in one round (1 = strict turn taking).
+        :param speaker_selection: "round_robin", "mention" (agents with unread direct messages
+                                  or named in the last round speak next; round robin when
+                                  there are none) or a function (chat, round) -> names of the next speakers.
+        :param max_rounds: Rounds run by default.
+        :param stop_phrase: Ends the conversation when a message contains it (e.g. "TERMINATE").
+        :param direct_share: Share of a turn's history budget that unread direct messages may use.
+        :param turn_template: Prompt of a turn, with {name}, {participants}, {direct} and {history}.
+        :param transcript: Existing transcript to continue (a new one if omitted).
+        """
+        if not agents:
+            raise ValueError("TroveGroupChat needs at least one agent.")
+        if max_concurrent_speakers < 1:
+            raise ValueError("TroveGroupChat needs max_concurrent_speakers >= 1.")
+        if not callable(speaker_selection) and speaker_selection not in self.SELECTIONS:
+            raise ValueError(f"Unknown speaker_selection '{speaker_selection}'. "
+                             f"Expected one of {self.SELECTIONS} or a function.")
+        self.name = name
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_concurrent_speakers = max_concurrent_speakers
+        self.speaker_selection = speaker_selection
+        self.max_rounds = max_rounds
+        self.stop_phrase = stop_phrase
+        self.direct_share = direct_share
+        self.turn_template = turn_template
+        self.transcript = transcript or Transcript()
+        self.counter = self.transcript.counter
+        self.participants: Dict[str, _Participant] = {}
+        self._order: List[str] = []
+        self._next = 0
+        self._last_round: List[ChatMessage] = []
+        self._pattern: Optional[re.Pattern] = None
+        self._lock = threading.Lock()
+        self.rounds = 0
+        self.prompt_tokens = 0
+        self.max_prompt_seen = 0
+        for agent in agents:
+            self.add_agent(agent)
+
+        logging.info(f"TroveGroupChat {self.name} initialized with {len(agents)} agents "
+                     f"(max {max_prompt_tokens} prompt tokens, {max_concurrent_speakers} concurrent speakers)")
+
+    def add_agent(self, agent: TroveAgent):
+        """Adds an agent to the chat and attaches it, so its send_agent_message posts here."""
+        with self._lock:
+            if agent.agent_name in self.participants:
+                raise ValueError(f"An agent named {agent.agent_name} is already in {self.name}.")
+            if agent.group_chat is not None and agent.group_chat is not self:
+                logging.warning(f"{agent.agent_name} leaves {agent.group_chat.name} to join {self.name}")
+            self.participants[agent.agent_name] = _Participant(agent, len(self._order),
+                                                               cursor=len(self.transcript))
+            self._order.append(agent.agent_name)
+            self._pattern = self._mention_pattern()
+        agent.group_chat = self
+
+    def remove_agent(self, name: str):
+        """Removes an agent from the chat; the transcript keeps its messages."""
+        with self._lock:
+            participant = self.participants.pop(name)
+            self._order.remove(name)
+            self._next = self._next % len(self._order) if self._order else 0
+            self._pattern = self._mention_pattern()
+        if participant.agent.group_chat is self:
+            participant.agent.group_chat = None
+
+    def close(self):
+        """Detaches every agent from the chat."""
+        for name in list(self._order):
+            self.remove_agent(name)
+
+    def _mention_pattern(self) -> Optional[re.Pattern]:
+        if not self._order:
+            return None
+        names = sorted(self._order, key=len, reverse=True)
+        return re.compile(r"(?<!\w)(" + "|".join(map(re.escape, names)) + r")(?!\w)")
+
+    def post(self, speaker: str, content: str, recipient: Optional[str] = None) -> ChatMessage:
+        """
+        Appends a message to the transcript. A message to one participant is shown only to them
+        (and delivered to their receive_message); recipient None or "all" addresses everyone.
+        """
+        if recipient == BROADCAST:
+            recipient = None
+        participant = self.participants.get(recipient) if recipient is not None else None
+        if recipient is not None and participant is None:
+            raise ValueError(f"{recipient} is not in the group chat {self.name}.")
+        message = self.transcript.append(speaker, content, recipient)
+        if participant is not None:
+            participant.agent.receive_message(message.render())
+        return message
+
+    def _next_speakers(self, round_number: int) -> List[str]:
+        """Names of the agents speaking in the next round."""
+        limit = self.max_concurrent_speakers
+        if callable(self.speaker_selection):
+            names = [name for name in self.speaker_selection(self, round_number) if name in self.participants]
+            return list(dict.fromkeys(names))[:limit]
+        if self.speaker_selection == "mention" and self._pattern is not None:
+            # agents with unread direct messages, then agents named by someone else in the last round
+            wanted = {name for name, participant in self.participants.items()
+                      if self.transcript.direct_count(name) > participant.direct_read}
+            for message in self._last_round:
+                wanted.update(name for name in self._pattern.findall(message.content) if name != message.speaker)
+            names = [name for name in self._order if name in wanted][:limit]
+            if names:
+                return names
+        count = min(limit, len(self._order))
+        names = [self._order[(self._next + offset) % len(self._order)] for offset in range(count)]
+        self._next = (self._next + count) % len(self._order)
+        return names
+
+    def _cap(self, agent: TroveAgent) -> int:
+        return min(self.max_prompt_tokens, agent.context_length)
+
+    def build_prompt(self, name: str, end: Optional[int] = None) -> Tuple[str, int]:
+        """
+        Builds an agent's turn prompt from the transcript, within the token cap.
+
+        :param name: Participant whose turn it is.
+        :param end: Transcript length to read up to (a snapshot shared by a round's speakers).
+        :return: (prompt, tokens including the agent's system prompt).
+        """
+        participant = self.participants[name]
+        agent = participant.agent
+        end = len(self.transcript) if end is None else end
+        others = ", ".join(other for other in self._order if other != name) or "no one else yet"
+        fill = dict(name=name, participants=others)
+        system_tokens = self.counter.count(agent.system_prompt or "")
+        budget = self._cap(agent) - system_tokens - self.counter.count(
+            self.turn_template.format(direct="", history="", **fill))
+        if budget <= 0:
+            raise ValueError(f"The turn prompt of {name} leaves no room within {self._cap(agent)} tokens.")
+
+        direct_text = ""
+        direct = self.transcript.direct_window(name, int(budget * self.direct_share)
+                                               - self.counter.count(DIRECT_TEMPLATE.format(messages="")),
+                                               start=participant.direct_read, end=end)
+        if direct:
+            direct_text = DIRECT_TEMPLATE.format(messages=self.transcript.render(direct))
+            budget -= self.counter.count(direct_text)
+
+        window = self.transcript.window(budget, end=end)
+        history = self.transcript.render(window)
+        if not window and self.transcript.public_count(end):  # the newest message alone is over budget
+            newest = self.transcript.latest(end)
+            history = self.counter.truncate(newest.render(), budget)
+
+        prompt = self.turn_template.format(direct=direct_text, history=history, **fill)
+        tokens = system_tokens + self.counter.count(prompt)
+        while tokens > self._cap(agent) and window:  # token counts of joined text can drift from the sum of parts
+            window = window[1:]
+            prompt = self.turn_template.format(direct=direct_text, history=self.transcript.render(window), **fill)
+            tokens = system_tokens + self.counter.count(prompt)
+        return prompt, tokens
+
+    def _speak(self, name: str, prompt: str) -> str:
+        return self.participants[name].agent.reply(prompt)
+
+    def run(self, task: Optional[str] = None, max_rounds: Optional[int] = None,
+            speaker: str = "user") -> GroupChatRun:
+        """
+        Runs the conversation.
+
+        :param task: Opening message, posted to everyone (omit to continue the existing transcript).
+        :param max_rounds: Rounds to run (defaults to the chat's max_rounds).
+        :param speaker: Name the opening message is posted under.
+        :return: GroupChatRun with the last message, the messages added, and token usage.
+        """
+        started = time.perf_counter()
+        first = len(self.transcript)
+        if task is not None:
+            self._last_round = [self.post(speaker, task)]
+        errors: Dict[str, str] = {}
+        prompt_tokens, max_tokens, rounds = 0, 0, 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_speakers, thread_name_prefix=self.name) as pool:
+            for _ in range(max_rounds if max_rounds is not None else self.max_rounds):
+                speakers = self._next_speakers(self.rounds)
+                if not speakers:
+                    break
+                end = len(self.transcript)  # every speaker of the round reads this snapshot
+                turns = []
+                for name in speakers:
+                    prompt, tokens = self.build_prompt(name, end)
+                    participant = self.participants[name]
+                    participant.direct_read = self.transcript.direct_count(name)
+                    participant.cursor = end
+                    prompt_tokens += tokens
+                    max_tokens = max(max_tokens, tokens)
+                    turns.append((name, pool.submit(self._speak, name, prompt)))
+
+                posted = []
+                for name, future in turns:
+                    participant = self.participants[name]
+                    try:
+                        reply = future.result()
+                    except Exception as e:
+                        logging.error(f"TroveGroupChat {self.name}: {name} failed in round {self.rounds}: {e}")
+                        errors[f"{self.rounds}:{name}"] = str(e)
+                        participant.errors += 1
+                        continue
+                    participant.turns += 1
+                    posted.append(self.post(name, reply))
+                self._last_round = posted
+                self.rounds += 1
+                rounds += 1
+                if self.stop_phrase and any(self.stop_phrase in message.content for message in posted):
+                    logging.info(f"TroveGroupChat {self.name}: stop phrase seen after round {self.rounds}")
+                    break
+
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.max_prompt_seen = max(self.max_prompt_seen, max_tokens)
+        messages = self.transcript.since(first)
+        public = [message for message in messages if message.recipient is None]
+        elapsed = time.perf_counter() - started
+        logging.info(f"TroveGroupChat {self.name}: {rounds} rounds, {len(messages)} messages, "
+                     f"{prompt_tokens} prompt tokens (max {max_tokens}) in {elapsed:.2f}s")
+        return GroupChatRun(public[-1].content if public else "", messages, rounds, errors,
+                            prompt_tokens, max_tokens, elapsed)
+
+    def stats(self) -> Dict[str, object]:
+        """Transcript size, prompt token usage and per-agent turns."""
+        with self._lock:
+            return {
+                "messages": len(self.transcript),
+                "transcript_tokens": self.transcript.total_tokens(),
+                "rounds": self.rounds,
+                "prompt_tokens": self.prompt_tokens,
+                "max_prompt_tokens": self.max_prompt_seen,
+                "agents": {name: {"turns": participant.turns, "errors": participant.errors}
+                           for name, participant in self.participants.items()},
+            }
+
+
+if __name__ == "__main__":
+    analysts = [
+        TroveAgent(agent_name="FinanceAnalyst", system_prompt="You analyze revenue, margins and debt."),
+        TroveAgent(agent_name="RiskAnalyst", system_prompt="You assess market and supply chain risks."),
+        TroveAgent(agent_name="StrategyAnalyst", system_prompt="You evaluate competitive strategy."),
+    ]
+    chat = TroveGroupChat(name="Trove-Group-Chat", agents=analysts, max_prompt_tokens=300,
+                          max_concurrent_speakers=3, max_rounds=4)
+    analysts[0].send_agent_message("RiskAnalyst", "Please check Tesla's battery supply risk.")
+    outcome = chat.run("Discuss Tesla's outlook for next year.")
+    print(outcome.rounds, len(outcome.messages), outcome.max_prompt_tokens)
+    print(chat.stats())
+    chat.close()
@@ -1 +1,227 @@
-# trove_hierarchical.py
+import re
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_context import ContextBuilder, TokenCounter
+
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)]|\(\d+\))\s+(.+?)\s*$")
+
+SPLIT_TEMPLATE = ("Split the following task into at most {fanout} independent subtasks that can be worked on "
+                  "in parallel. Reply with one subtask per line, as a numbered list, and nothing else.\n\n"
+                  "Task: {task}")
+REDUCE_TEMPLATE = ("Combine the partial results below into one complete answer to the task. Keep key facts "
+                   "and figures and resolve overlaps.\n\nTask: {task}\n\nPartial results:\n{results}")
+
+
+@dataclass
+class HierarchicalRun:
+    """Result and shape of one TroveHierarchical execution."""
+    result: str
+    subtasks: List[str]
+    worker_results: List[str]
+    errors: Dict[str, str] = field(default_factory=dict)
+    reduce_levels: List[int] = field(default_factory=list)  # nodes per reduction level, bottom up
+    max_node_tokens: int = 0  # largest prompt sent to a reducer, system prompt included
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class TroveHierarchical:
+    """
+    TroveHierarchical: a supervisor/worker tree.
+    The supervisor splits a task into at most `fanout` subtasks, optionally splitting those
+    again breadth-first up to `split_depth` levels, and the leaves run concurrently on the
+    worker agents. Results are combined by a tree reduction: groups of at most `fanout`
+    results that fit the reducer's context_length are merged in parallel, level by level,
+    until one answer remains, so no node ever receives more than its context window however
+    many workers report back. Split and reduce prompts go to the model as built (TroveAgent.reply):
+    no retrieved context is added and tool calls quoted in worker output are never run.
+    """
+
+    def __init__(self,
+                 name: str,
+                 supervisor: TroveAgent,
+                 workers: List[TroveAgent],
+                 reducer: Optional[TroveAgent] = None,
+                 fanout: int = 8,
+                 split_depth: int = 1,
+                 max_reduce_depth: int = 8,
+                 max_workers: int = 8,
+                 context_strategy: str = "truncate",
+                 splitter: Optional[Callable[[str], List[str]]] = None,
+                 split_template: str = SPLIT_TEMPLATE,
+                 reduce_template: str = REDUCE_TEMPLATE):
+        """
+        Initializes the hierarchy.
+
+        :param name: Name of the hierarchy.
+        :param supervisor: Agent that splits tasks into subtasks.
+        :param workers: Agents that run the leaf subtasks (assigned round robin).
+        :param reducer: Agent that merges partial results (defaults to the supervisor).
+        :param fanout: Maximum children per node, both when splitting and when reducing.
+        :param split_depth: Levels of splitting below the root task (1 = the supervisor splits once).
+        :param max_reduce_depth: Maximum reduction levels; the last level merges whatever is left
+                                 into one context, reduced to fit by context_strategy.
+        :param max_workers: Agent calls running at once (shared by splitting, workers and reduction).
+        :param context_strategy: How an over-long group is fitted to the reducer's context:
+                                 "truncate" or "excerpt" (see ContextBuilder).
+        :param splitter: Optional function returning the subtasks of a task, used instead of the supervisor.
+        :param split_template: Prompt asking the supervisor to split, with {task} and {fanout}.
+        :param reduce_template: Prompt asking the reducer to merge, with {task} and {results}.
+        """
+        if not workers:
+            raise ValueError("TroveHierarchical needs at least one worker.")
+        if fanout < 2:
+            raise ValueError("TroveHierarchical needs fanout >= 2.")
+        self.name = name
+        self.supervisor = supervisor
+        self.workers = workers
+        self.reducer = reducer or supervisor
+        self.fanout = fanout
+        self.split_depth = split_depth
+        self.max_reduce_depth = max_reduce_depth
+        self.max_workers = max_workers
+        self.splitter = splitter
+        self.split_template = split_template
+        self.reduce_template = reduce_template
+        self.counter = TokenCounter()
+        self.context_builder = ContextBuilder(token_budget=0, strategy=context_strategy, counter=self.counter)
+
+        logging.info(f"TroveHierarchical {self.name} initialized with {len(workers)} workers "
+                     f"(fanout={fanout}, split_depth={split_depth})")
+
+    def parse_subtasks(self, text: str) -> List[str]:
+        """Reads a list of subtasks (numbered or bulleted lines) from supervisor output, at most `fanout`."""
+        lines = [line for line in (text or "").splitlines() if line.strip()]
+        items = [match.group(1) for match in map(_LIST_ITEM.match, lines) if match]
+        subtasks = items or [line.strip() for line in lines]
+        if len(subtasks) > self.fanout:
+            logging.warning(f"TroveHierarchical {self.name}: supervisor returned {len(subtasks)} subtasks, "
+                            f"keeping the first {self.fanout}")
+        return subtasks[:self.fanout]
+
+    def _split(self, task: str) -> List[str]:
+        if self.splitter is not None:
+            subtasks = list(self.splitter(task))[:self.fanout]
+        else:
+            subtasks = self.parse_subtasks(self.supervisor.reply(self.split_template.format(task=task,
+                                                                                          fanout=self.fanout)))
+        return subtasks or [task]
+
+    def _reduce_budget(self, task: str) -> int:
+        """Tokens left for partial results in a reducer prompt."""
+        overhead = self.counter.count(self.reducer.system_prompt or "") + \
+            self.counter.count(self.reduce_template.format(task=task, results=""))
+        budget = self.reducer.context_length - overhead
+        if budget <= 0:
+            raise ValueError(f"The reduce prompt for {self.name} leaves no room in the reducer's context_length.")
+        return budget
+
+    def _groups(self, results: List[str], budget: int, last_level: bool) -> List[List[str]]:
+        """Packs consecutive results into groups of at most `fanout` that fit the budget together."""
+        if last_level:
+            return [results]
+        separator_cost = self.counter.count(self.context_builder.separator)
+        groups, current, used = [], [], 0
+        for result in results:
+            size = self.counter.count(result) + separator_cost
+            if current and (len(current) == self.fanout or used + size > budget):
+                groups.append(current)
+                current, used = [], 0
+            current.append(result)
+            used += size
+        if current:
+            groups.append(current)
+        if len(groups) == len(results):  # every result fills the budget alone: merge by fanout, fitted to the budget
+            groups = [results[start:start + self.fanout] for start in range(0, len(results), self.fanout)]
+        return groups
+
+    def run(self, task: str, subtasks: Optional[List[str]] = None) -> HierarchicalRun:
+        """
+        Splits, runs and reduces a task.
+
+        :param task: The root task.
+        :param subtasks: Leaf subtasks to use instead of asking the supervisor (skips splitting).
+        :return: HierarchicalRun with the final answer, the leaf subtasks and results, and the tree's shape.
+        """
+        errors: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as pool:
+            started = time.perf_counter()
+            if subtasks is None:
+                subtasks = [task]
+                for level in range(self.split_depth):
+                    # Breadth first: every task of this level is split concurrently
+                    subtasks = [child for children in pool.map(self._split, subtasks) for child in children]
+                    logging.info(f"TroveHierarchical {self.name}: split level {level + 1} -> {len(subtasks)} subtasks")
+            timings["split"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            futures = [pool.submit(self.workers[index % len(self.workers)].run, subtask)
+                       for index, subtask in enumerate(subtasks)]
+            worker_results = []
+            for index, future in enumerate(futures):
+                worker = self.workers[index % len(self.workers)]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"TroveHierarchical {self.name}: {worker.agent_name} failed subtask {index}: {e}")
+                    errors[f"worker:{index}"] = str(e)
+                    result = None
+                worker_results.append(result or f"⚠️ No data available from {worker.agent_name} for: {subtasks[index]}")
+            timings["workers"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            result, levels, max_tokens = self._reduce(task, worker_results, pool, errors)
+            timings["reduce"] = time.perf_counter() - started
+
+        logging.info(f"TroveHierarchical {self.name}: {len(subtasks)} subtasks reduced in {len(levels)} levels "
+                     f"{levels}; largest reducer prompt {max_tokens} tokens")
+        return HierarchicalRun(result, subtasks, worker_results, errors, levels, max_tokens, timings)
+
+    def _reduce(self, task: str, results: List[str], pool: ThreadPoolExecutor, errors: Dict[str, str]):
+        """Merges results level by level; the groups of a level are reduced in parallel."""
+        budget = self._reduce_budget(task)
+        system_tokens = self.counter.count(self.reducer.system_prompt or "")
+        levels: List[int] = []
+        max_tokens = 0
+        while len(results) > 1:
+            depth = len(levels)
+            groups = self._groups(results, budget, last_level=depth + 1 >= self.max_reduce_depth)
+            contexts = [self.context_builder.build(group, query=task, token_budget=budget) for group in groups]
+            prompts = [self.reduce_template.format(task=task, results=context) for context in contexts]
+            max_tokens = max([max_tokens] + [system_tokens + self.counter.count(prompt) for prompt in prompts])
+            futures = [pool.submit(self.reducer.reply, prompt) if len(group) > 1 else None
+                       for group, prompt in zip(groups, prompts)]
+
+            merged = []
+            for index, (group, context, future) in enumerate(zip(groups, contexts, futures)):
+                if future is None:  # a lone result passes up unchanged
+                    merged.append(group[0])
+                    continue
+                try:
+                    output = future.result()
+                except Exception as e:
+                    logging.error(f"TroveHierarchical {self.name}: reduce node {depth}.{index} failed: {e}")
+                    errors[f"reduce:{depth}.{index}"] = str(e)
+                    output = None
+                merged.append(output or context)  # fall back to the fitted inputs
+            levels.append(len(groups))
+            logging.info(f"TroveHierarchical {self.name}: reduce level {depth + 1}: {len(results)} -> {len(merged)}")
+            results = merged
+        return (results[0] if results else ""), levels, max_tokens
+
+
+if __name__ == "__main__":
+    supervisor = TroveAgent(agent_name="Supervisor", system_prompt="You plan research and combine findings.")
+    analysts = [TroveAgent(agent_name=f"Analyst-{number}", system_prompt="You research one narrow question.")
+                for number in range(4)]
+
+    hierarchy = TroveHierarchical(name="Trove-Hierarchy", supervisor=supervisor, workers=analysts, fanout=4)
+    outcome = hierarchy.run("Assess the EV market",
+                            subtasks=[f"Assess EV demand in region {region}" for region in range(16)])
+    print(outcome.reduce_levels, outcome.max_node_tokens)
+    print(outcome.result)
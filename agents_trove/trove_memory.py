@@ -0,0 +1,128 @@
+import sys
+import threading
+from array import array
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+class ShortTermMemory:
+    """
+    ShortTermMemory: a bounded ring buffer of recent agent inputs.
+    Keeps at most `max_entries` entries and, optionally, `max_bytes` of UTF-8 text.
+    The oldest entries are evicted first and can be handed to `on_evict` (e.g. to spill
+    them into long-term memory). Entries live in a fixed slot list with a parallel
+    array of sizes, so there is no per-entry object overhead beyond the strings themselves.
+    Supports the list operations agents use: append, extend, len, iteration and indexing.
+    """
+
+    __slots__ = ("max_entries", "max_bytes", "on_evict", "total_appended",
+                 "_slots", "_sizes", "_start", "_count", "_bytes", "_lock")
+
+    def __init__(self,
+                 max_entries: int = 1000,
+                 max_bytes: Optional[int] = None,
+                 on_evict: Optional[Callable[[List[str]], None]] = None,
+                 entries: Iterable[str] = ()):
+        """
+        :param max_entries: Maximum number of entries kept.
+        :param max_bytes: Maximum total UTF-8 size of kept entries (None = no byte cap).
+                          A single entry larger than the cap is kept on its own until the next append.
+        :param on_evict: Called with the list of evicted entries, oldest first.
+        :param entries: Initial entries, oldest first.
+        """
+        if max_entries < 1:
+            raise ValueError("ShortTermMemory needs max_entries >= 1.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.total_appended = 0
+        self._slots: List[Optional[str]] = [None] * max_entries
+        self._sizes = array("L", [0]) * max_entries
+        self._start = 0
+        self._count = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.extend(entries)
+
+    def append(self, entry: str):
+        """Adds an entry, evicting the oldest ones if a cap is exceeded."""
+        self.extend((entry,))
+
+    def extend(self, entries: Iterable[str]):
+        """Adds several entries, oldest first."""
+        evicted = []
+        with self._lock:
+            for entry in entries:
+                entry = str(entry)
+                size = len(entry.encode("utf-8"))
+                while self._count and (self._count == self.max_entries or
+                                       (self.max_bytes is not None and self._bytes + size > self.max_bytes)):
+                    evicted.append(self._pop_oldest())
+                slot = (self._start + self._count) % self.max_entries
+                self._slots[slot] = entry
+                self._sizes[slot] = size
+                self._count += 1
+                self._bytes += size
+                self.total_appended += 1
+        if evicted and self.on_evict is not None:
+            self.on_evict(evicted)
+
+    def _pop_oldest(self) -> str:
+        entry = self._slots[self._start]
+        self._bytes -= self._sizes[self._start]
+        self._slots[self._start] = None
+        self._sizes[self._start] = 0
+        self._start = (self._start + 1) % self.max_entries
+        self._count -= 1
+        return entry
+
+    def to_list(self) -> List[str]:
+        """Returns the entries as a list, oldest first."""
+        with self._lock:
+            return [self._slots[(self._start + offset) % self.max_entries] for offset in range(self._count)]
+
+    def clear(self):
+        with self._lock:
+            self._slots = [None] * self.max_entries
+            self._sizes = array("L", [0]) * self.max_entries
+            self._start = self._count = self._bytes = 0
+
+    def memory_usage(self) -> dict:
+        """Returns entry count, payload bytes and approximate resident bytes of the buffer."""
+        with self._lock:
+            resident = (sys.getsizeof(self._slots) + self._sizes.buffer_info()[1] * self._sizes.itemsize +
+                        sum(sys.getsizeof(entry) for entry in self._slots if entry is not None))
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "resident_bytes": resident,
+                "total_appended": self.total_appended,
+            }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_list())
+
+    def __getitem__(self, index):
+        return self.to_list()[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ShortTermMemory):
+            other = other.to_list()
+        return self.to_list() == other
+
+    def __repr__(self) -> str:
+        return f"ShortTermMemory({self.to_list()!r}, max_entries={self.max_entries}, max_bytes={self.max_bytes})"
+
+    def __getstate__(self):
+        return {"max_entries": self.max_entries, "max_bytes": self.max_bytes,
+                "on_evict": self.on_evict, "entries": self.to_list()}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_agent_moa import TroveMOA
+from agents_trove.trove_agent_pool import AgentPool
+from agents_trove.trove_persistence import atomic_write
+
+DEFAULT_TASK = ("Generate a comprehensive business analysis report for {company}.\n"
+                "Company data:\n{data}")
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _format_data(data: Dict[str, Any]) -> str:
+    lines = []
+    for key, value in data.items():
+        if isinstance(value, float):
+            value = f"{value:,.2f}"
+        elif isinstance(value, int) and not isinstance(value, bool):
+            value = f"{value:,}"
+        lines.append(f"- {key}: {value}")
+    return "\n".join(lines) or "- (no data)"
+
+
+class TroveMOABatch:
+    """
+    TroveMOABatch: runs one Mixture-of-Agents pipeline over many companies.
+    The agents are defined once with company-neutral system prompts; each company's data
+    is passed in its task. Every company runs on its own copies of the agents (shared LLM
+    clients and tools, separate memory, via AgentPool), so up to `max_concurrent` companies
+    run at once without seeing each other's history. Each finished company is checkpointed
+    to its own file, and a re-run skips companies that already have one.
+    """
+
+    def __init__(self,
+                 name: str,
+                 agents: List[TroveAgent],
+                 final_agent: TroveAgent,
+                 layers: int = 1,
+                 max_concurrent: int = 4,
+                 checkpoint_dir: Optional[str] = None,
+                 task_template: str = DEFAULT_TASK,
+                 on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 **moa_options):
+        """
+        Initializes the batch runner.
+
+        :param name: Name of the batch (also names the default checkpoint directory).
+        :param agents: Layer agents, used as templates.
+        :param final_agent: Aggregating agent, used as a template.
+        :param layers: Number of MOA layers per company.
+        :param max_concurrent: Companies processed at once.
+        :param checkpoint_dir: Directory of per-company result files (defaults to checkpoints/<name>).
+        :param task_template: Task text with {company} and {data} placeholders.
+        :param on_complete: Called with each company's result record as soon as it finishes.
+        :param moa_options: Passed to each TroveMOA (executor, agent_timeout, layer_token_budget, ...).
+        """
+        if max_concurrent < 1:
+            raise ValueError("TroveMOABatch needs max_concurrent >= 1.")
+        self.name = name
+        self.layers = layers
+        self.max_concurrent = max_concurrent
+        self.checkpoint_dir = checkpoint_dir or os.path.join("checkpoints", _UNSAFE.sub("_", name))
+        self.task_template = task_template
+        self.on_complete = on_complete
+        self.moa_options = moa_options
+        # One pool per agent definition; a company's session holds its copy of that agent
+        self._pools = [AgentPool(agent, max_sessions=max_concurrent * 2) for agent in agents + [final_agent]]
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+
+        logging.info(f"✅ Initialized MOA batch: {self.name} ({len(agents)} agents, {layers} layers, "
+                     f"max {max_concurrent} companies at once, checkpoints in {self.checkpoint_dir})")
+
+    @staticmethod
+    def _normalize(company: Union[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """Returns (key, company record) for a company name/ticker or a {"name", "ticker", "data"} dict."""
+        if isinstance(company, str):
+            company = {"name": company}
+        if "name" not in company and "ticker" not in company:
+            raise ValueError(f"Company needs a name or ticker: {company}")
+        record = {"name": company.get("name") or company["ticker"], "ticker": company.get("ticker"),
+                  "data": dict(company.get("data") or {})}
+        return record["ticker"] or record["name"], record
+
+    def checkpoint_path(self, key: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{_UNSAFE.sub('_', key)}.json")
+
+    def load_checkpoint(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns a company's saved result, or None if it hasn't completed (or the file is unreadable)."""
+        try:
+            with open(self.checkpoint_path(key), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def run_company(self, key: str, company: Dict[str, Any]) -> Dict[str, Any]:
+        """Runs the MOA for one company on its own agent copies and checkpoints the result."""
+        started = time.perf_counter()
+        task = self.task_template.format(company=company["name"], data=_format_data(company["data"]))
+        try:
+            with ExitStack() as stack:
+                agents = [stack.enter_context(pool.checkout(key)) for pool in self._pools]
+                moa = TroveMOA(name=f"{self.name}-{_UNSAFE.sub('_', key)}", agents=agents[:-1], layers=self.layers,
+                               final_agent=agents[-1], **self.moa_options)
+                report = moa.run(task)
+        finally:
+            for pool in self._pools:
+                pool.end_session(key)
+
+        record = dict(company, key=key, report=report, layer_results=moa.intermediate_results,
+                      layer_timings=moa.layer_timings, elapsed=time.perf_counter() - started,
+                      completed_at=time.time())
+        atomic_write(self.checkpoint_path(key), json.dumps(record, indent=2, default=str))
+        return record
+
+    def run(self, companies: Iterable[Union[str, Dict[str, Any]]], resume: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Processes every company, running up to max_concurrent at once. A failing company is
+        logged and left without a checkpoint (so the next run retries it) without stopping the batch.
+
+        :param companies: Names/tickers, or dicts like {"name": "Tesla", "ticker": "TSLA", "data": {...}}.
+        :param resume: Reuse existing checkpoints instead of re-running those companies.
+        :return: Result records keyed by ticker (or name), in input order; failed companies get
+                 {"key", "name", "ticker", "error"}.
+        """
+        jobs = dict(self._normalize(company) for company in companies)
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = {}
+        for key, company in jobs.items():
+            saved = self.load_checkpoint(key) if resume else None
+            if saved is not None:
+                results[key] = saved
+            else:
+                pending[key] = company
+        with self._lock:
+            self.skipped += len(results)
+        logging.info(f"🚀 MOA batch {self.name}: {len(pending)} companies to run, {len(results)} from checkpoints")
+
+        started, done = time.perf_counter(), 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix=f"{self.name}-batch") as pool:
+            futures = {pool.submit(self.run_company, key, company): key for key, company in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    logging.error(f"❌ MOA batch {self.name}: {key} failed: {e}")
+                    with self._lock:
+                        self.failed += 1
+                    results[key] = {"key": key, "name": pending[key]["name"], "ticker": pending[key]["ticker"],
+                                    "error": str(e)}
+                    continue
+                with self._lock:
+                    self.completed += 1
+                done += 1
+                results[key] = record
+                logging.info(f"✅ MOA batch {self.name}: {key} done in {record['elapsed']:.1f}s "
+                             f"({done}/{len(pending)})")
+                if self.on_complete:
+                    try:
+                        self.on_complete(record)
+                    except Exception as e:
+                        logging.error(f"❌ MOA batch {self.name}: on_complete failed for {key}: {e}")
+
+        elapsed = time.perf_counter() - started
+        logging.info(f"⏱️ MOA batch {self.name} finished {len(pending)} companies in {elapsed:.1f}s")
+        return {key: results[key] for key in jobs}
+
+    def stats(self) -> Dict[str, int]:
+        return {"completed": self.completed, "skipped": self.skipped, "failed": self.failed}
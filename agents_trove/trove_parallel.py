@@ -1 +1,171 @@
-# trove_parallel.py
+import os
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from agents_trove.trove_agent import TroveAgent
+
+
+@dataclass
+class ParallelResult:
+    """Outcome of one agent running one task."""
+    agent_name: str
+    task_index: int
+    task: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+def _run_agent_task(agent: TroveAgent, task: str):
+    """Runs a task on an agent and times it. Module-level so process pools can pickle it."""
+    started = time.perf_counter()
+    result = agent.run(task)
+    return result, time.perf_counter() - started
+
+
+class TroveParallel:
+    """
+    TroveParallel: runs every agent on every task of a batch in parallel.
+    Uses a thread pool for I/O-bound LLM agents or a process pool for CPU-heavy tool agents,
+    streams results back as they finish, and applies backpressure so large or lazy task
+    batches are never fully queued up front.
+    """
+
+    BACKENDS = ("thread", "process")
+
+    def __init__(self,
+                 name: str,
+                 agents: List[TroveAgent],
+                 backend: str = "thread",
+                 max_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 max_per_agent: Optional[int] = None):
+        """
+        Initializes the parallel workflow.
+
+        :param name: Name of the workflow.
+        :param agents: TroveAgent objects; each one runs every task.
+        :param backend: "thread" for I/O-bound agents, "process" for CPU-bound agents.
+                        Process agents must be picklable (no lambda tools) and their memory
+                        updates stay in the worker process.
+        :param max_workers: Pool size. Defaults to the number of agents for threads, CPU count for processes.
+        :param max_in_flight: Maximum submitted-but-unfinished jobs (backpressure). Defaults to 2 x max_workers.
+        :param max_per_agent: Maximum jobs running at once on the same agent (None = no cap).
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Expected one of {self.BACKENDS}.")
+        if not agents:
+            raise ValueError("TroveParallel needs at least one agent.")
+
+        self.name = name
+        self.agents = agents
+        self.backend = backend
+        default_workers = len(agents) if backend == "thread" else (os.cpu_count() or 1)
+        self.max_workers = max_workers or default_workers
+        self.max_in_flight = max_in_flight or 2 * self.max_workers
+        self.max_per_agent = max_per_agent
+        self._cancelled = threading.Event()
+
+        logging.info(f"TroveParallel {self.name} initialized with {len(agents)} agents "
+                     f"({self.backend} backend, {self.max_workers} workers)")
+
+    def cancel(self):
+        """Cancels outstanding work. Running jobs finish, queued jobs are dropped."""
+        self._cancelled.set()
+        logging.info(f"TroveParallel {self.name} cancelled")
+
+    def _make_executor(self):
+        if self.backend == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+    def stream(self, tasks: Iterable[str]) -> Iterator[ParallelResult]:
+        """
+        Runs every agent on every task, yielding results in completion order.
+
+        `tasks` may be any iterable, including a generator; it is consumed only as
+        capacity frees up. Closing the generator early cancels the remaining work.
+
+        :param tasks: Tasks to run.
+        :return: Iterator of ParallelResult objects.
+        """
+        self._cancelled.clear()
+        jobs = ((index, task, agent_index)
+                for index, task in enumerate(tasks)
+                for agent_index in range(len(self.agents)))
+        deferred = deque()  # jobs pulled while their agent was at its cap
+        running_per_agent = [0] * len(self.agents)
+        in_flight = {}
+        exhausted = False
+
+        def has_capacity(agent_index):
+            return self.max_per_agent is None or running_per_agent[agent_index] < self.max_per_agent
+
+        def next_job():
+            nonlocal exhausted
+            for _ in range(len(deferred)):
+                job = deferred.popleft()
+                if has_capacity(job[2]):
+                    return job
+                deferred.append(job)
+            while not exhausted and len(deferred) < self.max_in_flight:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                elif has_capacity(job[2]):
+                    return job
+                else:
+                    deferred.append(job)
+            return None
+
+        executor = self._make_executor()
+        try:
+            while not self._cancelled.is_set():
+                while len(in_flight) < self.max_in_flight:
+                    job = next_job()
+                    if job is None:
+                        break
+                    index, task, agent_index = job
+                    running_per_agent[agent_index] += 1
+                    future = executor.submit(_run_agent_task, self.agents[agent_index], task)
+                    in_flight[future] = job
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, task, agent_index = in_flight.pop(future)
+                    running_per_agent[agent_index] -= 1
+                    yield self._collect(future, index, task, self.agents[agent_index])
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, tasks: Iterable[str]) -> List[ParallelResult]:
+        """
+        Runs every agent on every task and returns all results ordered by task, then agent.
+
+        :param tasks: Tasks to run.
+        :return: List of ParallelResult objects.
+        """
+        order = {agent.agent_name: position for position, agent in enumerate(self.agents)}
+        results = list(self.stream(tasks))
+        results.sort(key=lambda r: (r.task_index, order.get(r.agent_name, 0)))
+        return results
+
+    def _collect(self, future, index: int, task: str, agent: TroveAgent) -> ParallelResult:
+        """Converts a finished future into a ParallelResult."""
+        try:
+            result, elapsed = future.result()
+            logging.info(f"{agent.agent_name} finished task {index} in {elapsed:.2f}s")
+            return ParallelResult(agent.agent_name, index, task, result=result, elapsed=elapsed)
+        except Exception as e:
+            logging.error(f"{agent.agent_name} failed task {index}: {e}")
+            return ParallelResult(agent.agent_name, index, task, error=str(e))
@@ -0,0 +1,231 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+SEQ_KEY = "_journal_seq"
+
+
+def atomic_write(path: str, data: Union[str, bytes]):
+    """
+    Writes a file atomically: the data goes to a temporary file in the same directory,
+    is fsynced, and then renamed over the target, so readers see either the old or the
+    new contents and never a partial write.
+
+    :param path: Target file path.
+    :param data: Text or bytes to write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        binary = isinstance(data, bytes)
+        with os.fdopen(descriptor, "wb" if binary else "w", encoding=None if binary else "utf-8") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory: str):
+    """Persists a rename by syncing its directory (a no-op where directories can't be opened)."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def apply_record(state: Dict[str, Any], record: Dict[str, Any]):
+    """
+    Applies one journal record to a state dictionary.
+
+    Operations:
+      set        - replace a top-level field
+      stm        - append entries to short_term_memory, keeping the newest `max_entries`
+      ltm_set    - replace a long_term_memory key
+      ltm_extend - append values to a long_term_memory list
+      ltm_del    - delete a long_term_memory key
+    """
+    op = record["op"]
+    if op == "set":
+        state[record["key"]] = record["value"]
+    elif op == "stm":
+        entries = state.get("short_term_memory", []) + record["entries"]
+        state["short_term_memory"] = entries[-record["max_entries"]:] if record.get("max_entries") else entries
+    elif op == "ltm_set":
+        state.setdefault("long_term_memory", {})[record["key"]] = record["value"]
+    elif op == "ltm_extend":
+        state.setdefault("long_term_memory", {}).setdefault(record["key"], []).extend(record["values"])
+    elif op == "ltm_del":
+        state.setdefault("long_term_memory", {}).pop(record["key"], None)
+    else:
+        raise ValueError(f"Unknown journal operation '{op}'")
+
+
+class StateStore:
+    """
+    StateStore: snapshot + append-only journal persistence for agent state.
+    The snapshot is a plain JSON state file (the format save_state has always written) plus
+    the sequence number of the last journal record folded into it. Changes since the snapshot
+    are appended to `<path>.journal` as one JSON record per line and fsynced.
+    Once the journal grows past a threshold it is rotated and merged into a new snapshot on a
+    background thread, so load time stays bounded by the snapshot size.
+    """
+
+    def __init__(self,
+                 path: str,
+                 compact_every: int = 1000,
+                 compact_bytes: int = 4 * 1024 * 1024,
+                 background: bool = True):
+        """
+        :param path: Snapshot file path (e.g. agent_state.json).
+        :param compact_every: Journal records that trigger compaction.
+        :param compact_bytes: Journal size in bytes that triggers compaction.
+        :param background: Compact on a background thread instead of inline.
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compacting_path = f"{path}.journal.compacting"
+        self.compact_every = compact_every
+        self.compact_bytes = compact_bytes
+        self.background = background
+        self.seq = 0
+        self._records = 0
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+
+    def write_snapshot(self, state: Dict[str, Any]):
+        """Atomically replaces the snapshot with a full state and discards the journals."""
+        self.wait()
+        with self._lock:
+            snapshot = dict(state)
+            snapshot[SEQ_KEY] = self.seq
+            atomic_write(self.path, json.dumps(snapshot))
+            for path in (self.journal_path, self.compacting_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._records = 0
+
+    def append(self, records: List[Dict[str, Any]]):
+        """Appends journal records durably, compacting once the journal is large enough."""
+        if not records:
+            return
+        with self._lock:
+            lines = []
+            for record in records:
+                self.seq += 1
+                lines.append(json.dumps(dict(record, seq=self.seq)))
+            with open(self.journal_path, "a", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+                size = file.tell()
+            self._records += len(records)
+            due = self._records >= self.compact_every or size >= self.compact_bytes
+
+        if due:
+            self.compact()
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Reads the snapshot and replays any journal records newer than it.
+        A torn final journal line (crash mid-append) is ignored.
+        """
+        self.wait()
+        state: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        snapshot_seq = state.pop(SEQ_KEY, 0)
+        seq = snapshot_seq
+        records = 0
+
+        for path in (self.compacting_path, self.journal_path):
+            for record in self._read_journal(path):
+                if record["seq"] <= snapshot_seq:
+                    continue
+                apply_record(state, record)
+                seq = max(seq, record["seq"])
+                records += 1
+
+        with self._lock:
+            self.seq = max(self.seq, seq)
+            self._records = records
+        return state
+
+    @staticmethod
+    def _read_journal(path: str) -> List[Dict[str, Any]]:
+        """
+        Reads a journal's records. A torn final record (crash mid-append) is dropped and
+        truncated away so that later appends are not hidden behind it.
+        """
+        if not os.path.exists(path):
+            return []
+        records, good = [], 0
+        with open(path, "rb") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Dropping torn journal record in {path}")
+                    break
+                good += len(line)
+        if good < os.path.getsize(path):
+            with open(path, "r+b") as file:
+                file.truncate(good)
+        return records
+
+    def compact(self):
+        """Folds the journal into a new snapshot (in the background unless disabled)."""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if not os.path.exists(self.compacting_path):  # else retry a merge that failed earlier
+                if not os.path.exists(self.journal_path):
+                    return
+                os.replace(self.journal_path, self.compacting_path)
+                self._records = 0
+
+        if self.background:
+            self._compactor = threading.Thread(target=self._merge, name=f"compact-{os.path.basename(self.path)}",
+                                               daemon=True)
+            self._compactor.start()
+        else:
+            self._merge()
+
+    def _merge(self):
+        try:
+            state: Dict[str, Any] = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as file:
+                    state = json.load(file)
+            seq = state.pop(SEQ_KEY, 0)
+            for record in self._read_journal(self.compacting_path):
+                if record["seq"] > seq:
+                    apply_record(state, record)
+                    seq = record["seq"]
+            state[SEQ_KEY] = seq
+            atomic_write(self.path, json.dumps(state))
+            os.remove(self.compacting_path)
+            logging.info(f"Compacted journal into {self.path} (seq {seq})")
+        except Exception as e:
+            logging.error(f"Journal compaction for {self.path} failed: {e}")
+
+    def wait(self):
+        """Blocks until a running background compaction has finished."""
+        compactor = self._compactor
+        if compactor is not None and compactor is not threading.current_thread():
+            compactor.join()
@@ -1 +1,269 @@
-# trove_sequential.py
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_tool_runtime import LatencyHistogram
+
+_END = object()
+
+
+@dataclass
+class SequentialResult:
+    """Outcome of one task passed through every stage of a TroveSequential pipeline."""
+    task_index: int
+    task: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    failed_stage: Optional[str] = None
+    stage_outputs: List[Any] = field(default_factory=list)  # filled only with keep_intermediate
+    elapsed: float = 0.0
+
+
+@dataclass
+class _Item:
+    index: int
+    task: str
+    value: Any
+    started: float
+    queued: float = 0.0
+    error: Optional[str] = None
+    failed_stage: Optional[str] = None
+    outputs: List[Any] = field(default_factory=list)
+
+
+class StageMetrics:
+    """Throughput and latency of one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        self.errors = 0
+        self.busy = 0.0
+        self.max_queue_depth = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, waited: float, depth: int, failed: bool):
+        with self._lock:
+            self.latency.record(seconds)
+            self.queue_wait.record(waited)
+            self.busy += seconds
+            self.errors += failed
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def to_dict(self, wall_clock: float) -> Dict[str, Any]:
+        with self._lock:
+            processed = self.latency.count
+            return {
+                "processed": processed,
+                "errors": self.errors,
+                "throughput": processed / wall_clock if wall_clock > 0 else 0.0,  # tasks per second
+                "utilization": self.busy / wall_clock if wall_clock > 0 else 0.0,
+                "latency": self.latency.to_dict(),
+                "queue_wait": self.queue_wait.to_dict(),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+class TroveSequential:
+    """
+    TroveSequential: a chain of agents where each agent's output is the next agent's task.
+    A single task runs the stages one after another. A stream of tasks runs them as a pipeline:
+    every stage has its own worker thread(s) and a bounded queue in front of it, so task k+1
+    is in stage 1 while task k is in stage 2, and a batch takes roughly
+    tasks x slowest stage instead of tasks x sum of stages. Slow stages apply backpressure
+    through the bounded queues, so lazy task iterables are never fully read ahead.
+    """
+
+    def __init__(self,
+                 name: str,
+                 agents: List[Union[TroveAgent, Callable[[str], Any]]],
+                 queue_size: int = 2,
+                 stage_workers: Optional[List[int]] = None,
+                 task_template: Optional[str] = None,
+                 keep_intermediate: bool = False):
+        """
+        Initializes the pipeline.
+
+        :param name: Name of the pipeline.
+        :param agents: Stages in order: TroveAgents, or callables taking the previous output.
+        :param queue_size: Capacity of the queue in front of each stage.
+        :param stage_workers: Worker threads per stage (default 1 each). A stage with several
+                              workers runs that agent concurrently and may reorder tasks.
+        :param task_template: Format string for the task of every stage after the first, with
+                              {previous} (the previous stage's output) and {task} (the original task).
+                              By default the previous output is passed as is.
+        :param keep_intermediate: Keep every stage's output in the results.
+        """
+        if not agents:
+            raise ValueError("TroveSequential needs at least one agent.")
+        if queue_size < 1:
+            raise ValueError("TroveSequential needs queue_size >= 1.")
+        self.name = name
+        self.agents = agents
+        self.queue_size = queue_size
+        self.stage_workers = list(stage_workers or [1] * len(agents))
+        if len(self.stage_workers) != len(agents) or min(self.stage_workers) < 1:
+            raise ValueError("stage_workers needs one count >= 1 per agent.")
+        self.task_template = task_template
+        self.keep_intermediate = keep_intermediate
+        self.stage_names = [self._stage_name(agent, position) for position, agent in enumerate(agents)]
+        self.stage_metrics = [StageMetrics(name) for name in self.stage_names]
+        self.wall_clock = 0.0
+
+        logging.info(f"TroveSequential {self.name} initialized with stages: {' -> '.join(self.stage_names)}")
+
+    @staticmethod
+    def _stage_name(agent: Any, position: int) -> str:
+        name = getattr(agent, "agent_name", None) or getattr(agent, "__name__", None) or "stage"
+        return f"{position + 1}:{name}"
+
+    def _stage_task(self, position: int, item: _Item) -> str:
+        if position == 0 or self.task_template is None:
+            return item.value
+        return self.task_template.format(previous=item.value, task=item.task)
+
+    def _call_stage(self, position: int, item: _Item, depth: int):
+        """Runs one stage on an item in place, recording its metrics. Failed items skip later stages."""
+        if item.error is not None:
+            return
+        agent = self.agents[position]
+        waited = time.perf_counter() - item.queued
+        started = time.perf_counter()
+        try:
+            task = self._stage_task(position, item)
+            item.value = agent.run(task) if isinstance(agent, TroveAgent) else agent(task)
+        except Exception as e:
+            logging.error(f"TroveSequential {self.name}: stage {self.stage_names[position]} "
+                          f"failed task {item.index}: {e}")
+            item.error, item.failed_stage = str(e), self.stage_names[position]
+        else:
+            if self.keep_intermediate:
+                item.outputs.append(item.value)
+        self.stage_metrics[position].record(time.perf_counter() - started, waited, depth, item.error is not None)
+
+    def _result(self, item: _Item) -> SequentialResult:
+        return SequentialResult(item.index, item.task,
+                                result=None if item.error is not None else item.value,
+                                error=item.error, failed_stage=item.failed_stage,
+                                stage_outputs=item.outputs, elapsed=time.perf_counter() - item.started)
+
+    def run(self, task: str) -> str:
+        """
+        Runs one task through every stage in order and returns the last stage's output.
+        Raises RuntimeError if a stage fails.
+        """
+        started = time.perf_counter()
+        item = _Item(0, task, task, started, queued=started)
+        for position in range(len(self.agents)):
+            item.queued = time.perf_counter()
+            self._call_stage(position, item, 0)
+            if item.error is not None:
+                raise RuntimeError(f"Stage {item.failed_stage} of {self.name} failed: {item.error}")
+        self.wall_clock += time.perf_counter() - started
+        return item.value
+
+    def stream(self, tasks: Iterable[str]) -> Iterator[SequentialResult]:
+        """
+        Runs tasks through the pipeline, yielding results as they leave the last stage
+        (in task order unless a stage has several workers). A failing stage marks the task's
+        result with the error and the task skips the remaining stages. Closing the generator
+        early stops the pipeline.
+
+        :param tasks: Tasks to run; any iterable, consumed only as the first queue has room.
+        :return: Iterator of SequentialResult objects.
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.agents] + [queue.Queue()]
+        remaining = list(self.stage_workers)
+        remaining_lock = threading.Lock()
+
+        def put(target: queue.Queue, value: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    target.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for index, task in enumerate(tasks):
+                    now = time.perf_counter()
+                    if not put(queues[0], _Item(index, task, task, now, queued=now)):
+                        return
+            except Exception as e:
+                logging.error(f"TroveSequential {self.name}: reading tasks failed: {e}")
+            finally:
+                for _ in range(self.stage_workers[0]):
+                    put(queues[0], _END)
+
+        def work(position: int):
+            inbox, outbox = queues[position], queues[position + 1]
+            while not stop.is_set():
+                try:
+                    item = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    break
+                self._call_stage(position, item, inbox.qsize())
+                item.queued = time.perf_counter()
+                if not put(outbox, item):
+                    return
+            with remaining_lock:
+                remaining[position] -= 1
+                last = remaining[position] == 0
+            if last:  # the stage's last worker passes the end marker on to every worker of the next stage
+                for _ in range(self.stage_workers[position + 1] if position + 1 < len(self.agents) else 1):
+                    put(outbox, _END)
+
+        threads = [threading.Thread(target=feed, name=f"{self.name}-feed", daemon=True)]
+        for position, workers in enumerate(self.stage_workers):
+            threads.extend(threading.Thread(target=work, args=(position,), daemon=True,
+                                            name=f"{self.name}-stage{position + 1}-{worker}")
+                           for worker in range(workers))
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _END:
+                    break
+                yield self._result(item)
+        finally:
+            stop.set()
+            self.wall_clock += time.perf_counter() - started
+            logging.info(f"TroveSequential {self.name} pipeline finished in {time.perf_counter() - started:.2f}s")
+
+    def run_batch(self, tasks: Iterable[str]) -> List[SequentialResult]:
+        """Runs many tasks through the pipeline and returns the results in task order."""
+        return sorted(self.stream(tasks), key=lambda result: result.task_index)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Per-stage metrics: tasks processed, errors, throughput (tasks per second of pipeline wall
+        clock), utilization (busy share of the wall clock), latency and queue-wait histograms,
+        and the deepest input queue seen. The stage with the highest utilization is the bottleneck.
+        """
+        stages = {metrics.name: metrics.to_dict(self.wall_clock) for metrics in self.stage_metrics}
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"]) if self.wall_clock else None
+        return {"wall_clock": self.wall_clock, "bottleneck": bottleneck, "stages": stages}
+
+
+if __name__ == "__main__":
+    researcher = TroveAgent(agent_name="Researcher", system_prompt="Research the topic in the task.")
+    writer = TroveAgent(agent_name="Writer", system_prompt="Write a short article from the research.")
+    editor = TroveAgent(agent_name="Editor", system_prompt="Edit the article for clarity.")
+
+    pipeline = TroveSequential(name="Trove-Sequential-Articles", agents=[researcher, writer, editor])
+    for outcome in pipeline.stream(f"Topic {number}: energy efficiency" for number in range(5)):
+        print(outcome.task_index, outcome.result or outcome.error)
+    print(pipeline.metrics()["stages"].keys())
@@ -1 +1,334 @@
-# trove_swarm_router.py
+import re
+import math
+import time
+import logging
+import threading
+import itertools
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_tool_runtime import LatencyHistogram
+from models_trove.embeddings.vector_store import HashingEmbedder
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class _Replica:
+    agent: TroveAgent
+    outstanding: int = 0
+    requests: int = 0
+    errors: int = 0
+    hedge_wins: int = 0
+    ewma: Optional[float] = None  # seconds of successful calls; None until the first success
+    consecutive_errors: int = 0
+    cooldown_until: float = 0.0  # perf_counter time before which a failing replica is skipped
+
+
+@dataclass
+class _Group:
+    """Replicas sharing one system prompt: interchangeable for routing purposes."""
+    prompt: str
+    replicas: List[_Replica]
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=500))
+    turn: Any = None
+
+    def p(self, quantile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(math.ceil(quantile / 100 * len(ordered))) - 1)]
+
+
+class TroveSwarmRouter:
+    """
+    TroveSwarmRouter: dispatches each task to one of several TroveAgents.
+    Agents with the same system prompt are replicas of one specialist. Routing has two steps:
+    `match` picks the specialist whose system prompt fits the task best (keyword or embedding
+    similarity), then `strategy` picks a replica by round robin, fewest outstanding requests,
+    or lowest EWMA latency weighted by outstanding requests. With hedging on, a task still
+    running after its specialist's observed p95 latency is also sent to a second replica and
+    the first answer wins, so one slow replica no longer sets the tail latency. Latencies are
+    learned from successful calls only; a failing replica is skipped for a cooldown that grows
+    with its consecutive errors, and a failed task is retried on another replica.
+    """
+
+    MATCHES = ("keyword", "embedding", None)
+    STRATEGIES = ("round_robin", "least_outstanding", "ewma")
+
+    def __init__(self,
+                 name: str,
+                 agents: List[TroveAgent],
+                 match: Optional[str] = "keyword",
+                 strategy: str = "ewma",
+                 hedge: bool = False,
+                 hedge_quantile: float = 95,
+                 hedge_min_samples: int = 20,
+                 hedge_after: Optional[float] = None,
+                 max_hedge_ratio: float = 0.1,
+                 ewma_alpha: float = 0.3,
+                 max_retries: int = 1,
+                 error_cooldown: float = 5.0,
+                 embedder: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Initializes the router.
+
+        :param name: Name of the router.
+        :param agents: Agents to route across. Agents with identical system prompts are replicas.
+        :param match: How a specialist is chosen: "keyword" (IDF-weighted word overlap with the
+                      system prompt), "embedding" (cosine similarity) or None (all agents are replicas).
+        :param strategy: How a replica is chosen: "round_robin", "least_outstanding" or "ewma".
+        :param hedge: Send slow tasks to a second replica.
+        :param hedge_quantile: Latency percentile of the specialist after which a hedge fires.
+        :param hedge_min_samples: Responses observed before the percentile is trusted.
+        :param hedge_after: Fixed hedge delay in seconds, used until enough samples exist (None = don't hedge then).
+        :param max_hedge_ratio: Maximum share of requests that may be hedged, bounding the extra load.
+        :param ewma_alpha: Weight of the newest latency in the moving average.
+        :param max_retries: Other replicas tried, one after another, when every attempt at a task failed.
+        :param error_cooldown: Seconds a replica is skipped after an error, doubling with each
+                               consecutive error (up to 32x) and reset by a success.
+        :param embedder: Embedding function for match="embedding" (defaults to HashingEmbedder).
+        :param max_workers: Threads running agent calls (defaults to 4 per agent).
+        """
+        if not agents:
+            raise ValueError("TroveSwarmRouter needs at least one agent.")
+        if match not in self.MATCHES:
+            raise ValueError(f"Unknown match '{match}'. Expected one of {self.MATCHES}.")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Expected one of {self.STRATEGIES}.")
+
+        self.name = name
+        self.match = match
+        self.strategy = strategy
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_after = hedge_after
+        self.max_hedge_ratio = max_hedge_ratio
+        self.ewma_alpha = ewma_alpha
+        self.max_retries = max_retries
+        self.error_cooldown = error_cooldown
+
+        groups: Dict[str, _Group] = {}
+        for agent in agents:
+            prompt = (agent.system_prompt or "").strip() if match else ""
+            group = groups.setdefault(prompt, _Group(prompt, []))
+            group.replicas.append(_Replica(agent))
+        self.groups = list(groups.values())
+        for group in self.groups:
+            group.turn = itertools.count()
+
+        self._profiles = [self._terms(f"{group.replicas[0].agent.agent_name} {group.prompt}") for group in self.groups]
+        document_frequency = Counter(term for profile in self._profiles for term in profile)
+        self._idf = {term: math.log(1 + len(self.groups) / count) for term, count in document_frequency.items()}
+        self.embedder = embedder
+        self._prompt_vectors = None
+        if match == "embedding":
+            self.embedder = embedder or HashingEmbedder()
+            self._prompt_vectors = self._normalize(self.embedder([group.prompt for group in self.groups]))
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or 4 * len(agents),
+                                            thread_name_prefix=f"{self.name}-router")
+        self._lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.failures = 0
+
+        logging.info(f"TroveSwarmRouter {self.name} initialized with {len(agents)} agents in "
+                     f"{len(self.groups)} groups (match={match}, strategy={strategy}, hedge={hedge})")
+
+    @staticmethod
+    def _terms(text: str) -> set:
+        return set(_WORD_PATTERN.findall(text.lower()))
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def _match_group(self, task: str) -> _Group:
+        """Picks the specialist group best matching the task (the first group on ties or no signal)."""
+        if len(self.groups) == 1:
+            return self.groups[0]
+        if self.match == "embedding":
+            scores = self._prompt_vectors @ self._normalize(self.embedder([task]))[0]
+        else:
+            terms = self._terms(task)
+            scores = [sum(self._idf[term] for term in profile & terms) for profile in self._profiles]
+        return self.groups[int(np.argmax(scores))]
+
+    def _pick(self, group: _Group, exclude: Iterable[_Replica] = ()) -> Optional[_Replica]:
+        """
+        Picks a replica of the group by the balancing strategy, skipping replicas cooling down
+        after errors unless all of them are. Caller holds self._lock.
+        """
+        excluded = {id(replica) for replica in exclude}
+        candidates = [replica for replica in group.replicas if id(replica) not in excluded]
+        if not candidates:
+            return None
+        now = time.perf_counter()
+        candidates = [replica for replica in candidates if replica.cooldown_until <= now] or candidates
+        if self.strategy == "round_robin":
+            return candidates[next(group.turn) % len(candidates)]
+        if self.strategy == "least_outstanding":
+            return min(candidates, key=lambda replica: (replica.outstanding, replica.requests))
+        # Unmeasured replicas score 0 so each gets tried; outstanding work scales the expected wait
+        return min(candidates, key=lambda replica: ((replica.ewma or 0.0) * (replica.outstanding + 1),
+                                                    replica.outstanding))
+
+    def route(self, task: str) -> TroveAgent:
+        """Returns the agent a task would be sent to, without running it."""
+        group = self._match_group(task)
+        with self._lock:
+            return self._pick(group).agent
+
+    def _hedge_delay(self, group: _Group) -> Optional[float]:
+        if len(group.latencies) >= self.hedge_min_samples:
+            return group.p(self.hedge_quantile)
+        return self.hedge_after
+
+    def _call(self, group: _Group, replica: _Replica, task: str):
+        started = time.perf_counter()
+        try:
+            result = replica.agent.run(task)
+        except Exception:
+            # Failures often return fast; learning their latency would steer traffic to the broken replica
+            with self._lock:
+                replica.outstanding -= 1
+                replica.errors += 1
+                replica.consecutive_errors += 1
+                replica.cooldown_until = time.perf_counter() + \
+                    self.error_cooldown * 2 ** min(replica.consecutive_errors - 1, 5)
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            replica.outstanding -= 1
+            replica.consecutive_errors = 0
+            replica.cooldown_until = 0.0
+            replica.ewma = elapsed if replica.ewma is None else \
+                self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * replica.ewma
+            group.latencies.append(elapsed)
+        return result
+
+    def _submit(self, group: _Group, replica: _Replica, task: str):
+        """Starts a call on a replica. Caller holds self._lock."""
+        replica.outstanding += 1
+        replica.requests += 1
+        return self._executor.submit(self._call, group, replica, task)
+
+    def run(self, task: str) -> str:
+        """
+        Routes a task and returns the first successful answer. With hedging on, a second replica
+        is started once the first exceeds the hedge delay; if one attempt fails, the other's result is used.
+        When every attempt has failed, the task is retried on up to max_retries other replicas.
+        """
+        started = time.perf_counter()
+        group = self._match_group(task)
+        with self._lock:
+            primary = self._pick(group)
+            self.requests += 1
+            attempts = {self._submit(group, primary, task): primary}
+            delay = self._hedge_delay(group) if self.hedge and len(group.replicas) > 1 else None
+
+        logging.info(f"TroveSwarmRouter {self.name}: task routed to {primary.agent.agent_name}")
+        if delay is not None:
+            done, _ = wait(attempts, timeout=delay)
+            if not done:
+                with self._lock:
+                    allowed = self.hedges < self.max_hedge_ratio * self.requests
+                    backup = self._pick(group, exclude=[primary]) if allowed else None
+                    if backup is not None:
+                        self.hedges += 1
+                        future = self._submit(group, backup, task)
+                        attempts[future] = backup
+                if backup is not None:
+                    logging.info(f"TroveSwarmRouter {self.name}: {primary.agent.agent_name} slower than "
+                                 f"{delay:.2f}s, hedging to {backup.agent.agent_name}")
+
+        error = None
+        retries = 0
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                replica = attempts[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"TroveSwarmRouter {self.name}: {replica.agent.agent_name} failed: {e}")
+                    error = e
+                    if not pending and retries < self.max_retries:
+                        with self._lock:
+                            retry = self._pick(group, exclude=attempts.values())
+                            if retry is not None:
+                                retries += 1
+                                self.retries += 1
+                                future = self._submit(group, retry, task)
+                                attempts[future] = retry
+                                pending = {future}
+                        if retry is not None:
+                            logging.info(f"TroveSwarmRouter {self.name}: retrying on {retry.agent.agent_name}")
+                    continue
+                with self._lock:
+                    self.latency.record(time.perf_counter() - started)
+                    if replica is not primary and retries == 0:
+                        replica.hedge_wins += 1
+                        self.hedge_wins += 1
+                return result
+
+        with self._lock:
+            self.failures += 1
+        raise error
+
+    def run_many(self, tasks: List[str], max_concurrent: int = 8) -> List[Any]:
+        """Routes many tasks concurrently. Returns results in task order, with the exception for failed tasks."""
+        def attempt(task):
+            try:
+                return self.run(task)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix=f"{self.name}-batch") as pool:
+            return list(pool.map(attempt, tasks))
+
+    def stats(self) -> Dict[str, Any]:
+        """Router-wide latency and hedging counts, plus per-agent load and latency."""
+        with self._lock:
+            agents = {}
+            for group in self.groups:
+                for replica in group.replicas:
+                    agents[replica.agent.agent_name] = {
+                        "requests": replica.requests, "outstanding": replica.outstanding,
+                        "errors": replica.errors, "hedge_wins": replica.hedge_wins, "ewma": replica.ewma,
+                        "cooling_down": replica.cooldown_until > time.perf_counter(),
+                    }
+            return {"requests": self.requests, "hedges": self.hedges, "hedge_wins": self.hedge_wins,
+                    "retries": self.retries, "failures": self.failures, "latency": self.latency.to_dict(), "agents": agents,
+                    "p95_by_group": {group.replicas[0].agent.agent_name: group.p(95) for group in self.groups}}
+
+    def shutdown(self):
+        """Stops the call threads once running calls (including losing hedges) finish."""
+        self._executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    finance = [TroveAgent(agent_name=f"FinanceAnalyst-{replica}",
+                          system_prompt="Analyze revenue, profit, debt and cash flow of companies.")
+               for replica in range(2)]
+    energy = TroveAgent(agent_name="EnergyAnalyst",
+                        system_prompt="Analyze energy consumption, production and efficiency.")
+
+    router = TroveSwarmRouter(name="Trove-Swarm", agents=finance + [energy], hedge=True, hedge_after=2.0)
+    for task in ["Summarize Tesla's revenue and debt", "Why did energy consumption spike in June?"]:
+        print(router.route(task).agent_name, "->", router.run(task))
+    print(router.stats())
+    router.shutdown()
@@ -0,0 +1,329 @@
+import json
+import time
+import hashlib
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+_MISS = object()
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class ToolSpec:
+    """A registered tool and how it may be executed."""
+    name: str
+    function: Callable[..., Any]
+    pure: bool = False
+    timeout: Optional[float] = None
+    backend: str = "thread"
+
+
+@dataclass
+class ToolResult:
+    """Outcome of one tool invocation."""
+    name: str
+    params: Dict[str, Any]
+    result: Any = None
+    error: Optional[str] = None
+    exception: Optional[BaseException] = None
+    elapsed: float = 0.0
+    cached: bool = False
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count, sum, max and approximate percentiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Returns the upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}s" for bound in self.buckets] + [f">{self.buckets[-1]}s"]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+def _array_key(value: Any) -> str:
+    """JSON fallback for array params (e.g. NumPy): digest the contents, since repr elides large arrays."""
+    if hasattr(value, "tobytes") and hasattr(value, "dtype") and hasattr(value, "shape"):
+        digest = hashlib.blake2b(value.tobytes(), digest_size=16).hexdigest()
+        return f"array:{value.dtype}:{value.shape}:{digest}"
+    raise TypeError(f"Unhashable tool param of type {type(value).__name__}")
+
+
+def _timed_call(function: Callable[..., Any], params: Dict[str, Any]):
+    """Runs a tool and times it where it runs. Module-level so process pools can pickle it."""
+    started = time.perf_counter()
+    result = function(**params)
+    return result, time.perf_counter() - started
+
+
+class ToolRuntime:
+    """
+    ToolRuntime: executes batches of tool invocations.
+    Independent calls in a batch run in parallel on a thread pool (or a process pool for
+    CPU-bound tools), so a step that calls several tools costs about the slowest call rather
+    than the sum. Pure tools are memoized in an LRU cache, and duplicate pure calls in one batch
+    run once. Each tool can have a timeout, and every call's latency is recorded per tool.
+    """
+
+    BACKENDS = ("thread", "process")
+
+    def __init__(self,
+                 max_workers: int = 8,
+                 process_workers: Optional[int] = None,
+                 cache_size: int = 1024,
+                 default_timeout: Optional[float] = None):
+        """
+        :param max_workers: Thread pool size for thread-backed tools.
+        :param process_workers: Process pool size for process-backed tools (defaults to CPU count).
+        :param cache_size: Maximum memoized results of pure tools.
+        :param default_timeout: Timeout in seconds for tools registered without one (None = no limit).
+        """
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self.cache_size = cache_size
+        self.default_timeout = default_timeout
+        self._tools: Dict[str, ToolSpec] = {}
+        self._setup()
+
+    def _setup(self):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def register(self, name: str, function: Callable[..., Any], pure: bool = False,
+                 timeout: Optional[float] = None, backend: str = "thread"):
+        """
+        Registers a tool.
+
+        :param name: Tool name used in invocations.
+        :param function: Callable taking the invocation params as keyword arguments.
+        :param pure: The result depends only on the params and calling it has no side effects,
+                     so results can be memoized.
+        :param timeout: Seconds before a call is reported as timed out (defaults to default_timeout).
+                        A thread cannot be interrupted, so a timed-out call keeps running in the background.
+        :param backend: "thread", or "process" for CPU-bound tools (the function must be picklable).
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Expected one of {self.BACKENDS}.")
+        timeout = self.default_timeout if timeout is None else timeout
+        with self._lock:
+            self._tools[name] = ToolSpec(name, function, pure, timeout, backend)
+            self._cache = OrderedDict((key, value) for key, value in self._cache.items()
+                                      if not key.startswith(f"{name}\0"))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def spec(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def _executor(self, spec: ToolSpec):
+        with self._lock:
+            if spec.backend == "process":
+                if self._processes is None:
+                    self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+                return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+            return self._threads
+
+    @staticmethod
+    def _cache_key(spec: ToolSpec, params: Dict[str, Any]) -> Optional[str]:
+        """Memoization key for a pure call; None when a param can't be keyed reliably."""
+        if not spec.pure:
+            return None
+        try:
+            return f"{spec.name}\0{json.dumps(params, sort_keys=True, default=_array_key)}"
+        except TypeError:
+            return None
+
+    def _cache_get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._cache:
+                return _MISS
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _cache_set(self, key: str, value: Any):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _record(self, name: str, elapsed: Optional[float], outcome: str):
+        with self._lock:
+            counters = self._counters.setdefault(name, {"calls": 0, "cache_hits": 0, "errors": 0, "timeouts": 0})
+            counters["calls"] += 1
+            if outcome != "ok":
+                counters[outcome] += 1
+            if elapsed is not None:
+                self._histograms.setdefault(name, LatencyHistogram()).record(elapsed)
+
+    @staticmethod
+    def _normalize(call: Union[Tuple[str, Dict[str, Any]], Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """Accepts (name, params) tuples or {"name": ..., "params": ...} dicts."""
+        if isinstance(call, dict):
+            return call["name"], dict(call.get("params") or {})
+        name, params = call
+        return name, dict(params or {})
+
+    def execute(self, calls: Iterable[Union[Tuple[str, Dict[str, Any]], Dict[str, Any]]]) -> List[ToolResult]:
+        """
+        Executes a batch of tool invocations concurrently.
+        Failures, timeouts and unknown tools are reported in the corresponding ToolResult
+        rather than raised, so one bad call doesn't lose the others' results.
+
+        :param calls: (name, params) tuples or {"name": ..., "params": ...} dicts.
+        :return: One ToolResult per call, in call order.
+        """
+        calls = [self._normalize(call) for call in calls]
+        results: List[Optional[ToolResult]] = [None] * len(calls)
+        jobs = []  # (index, spec, params, cache key, future)
+        in_flight = {}
+
+        started = time.perf_counter()
+        for index, (name, params) in enumerate(calls):
+            spec = self._tools.get(name)
+            if spec is None:
+                results[index] = ToolResult(name, params, error=f"Tool {name} not found")
+                continue
+            key = self._cache_key(spec, params)
+            if key is not None:
+                cached = self._cache_get(key)
+                if cached is not _MISS:
+                    self._record(name, None, "cache_hits")
+                    results[index] = ToolResult(name, params, result=cached, cached=True)
+                    continue
+                if key in in_flight:
+                    jobs.append((index, spec, params, key, in_flight[key]))
+                    continue
+            future = self._executor(spec).submit(_timed_call, spec.function, params)
+            if key is not None:
+                in_flight[key] = future
+            jobs.append((index, spec, params, key, future))
+
+        recorded = set()
+        for index, spec, params, key, future in jobs:
+            first = id(future) not in recorded
+            recorded.add(id(future))
+            remaining = None if spec.timeout is None else max(started + spec.timeout - time.perf_counter(), 0)
+            try:
+                value, elapsed = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                if first:
+                    self._record(spec.name, spec.timeout, "timeouts")
+                    logging.warning(f"Tool {spec.name} timed out after {spec.timeout}s")
+                error = TimeoutError(f"Tool {spec.name} timed out after {spec.timeout}s")
+                results[index] = ToolResult(spec.name, params, error=str(error), exception=error, elapsed=spec.timeout)
+                continue
+            except Exception as e:
+                if first:
+                    self._record(spec.name, None, "errors")  # where it failed in the batch is unknown
+                    logging.error(f"Tool {spec.name} failed: {e}")
+                results[index] = ToolResult(spec.name, params, error=f"Tool {spec.name} failed: {e}", exception=e)
+                continue
+
+            if first:
+                self._record(spec.name, elapsed, "ok")
+                if key is not None:
+                    self._cache_set(key, value)
+            results[index] = ToolResult(spec.name, params, result=value, elapsed=elapsed, cached=not first)
+        return results
+
+    def call(self, name: str, params: Optional[Dict[str, Any]] = None) -> ToolResult:
+        """
+        Executes one tool invocation. Thread-backed tools without a timeout run inline in the
+        calling thread, skipping the pool hand-off; everything else goes through execute().
+        """
+        params = dict(params or {})
+        spec = self._tools.get(name)
+        if spec is None or spec.timeout is not None or spec.backend != "thread":
+            return self.execute([(name, params)])[0]
+
+        key = self._cache_key(spec, params)
+        if key is not None:
+            cached = self._cache_get(key)
+            if cached is not _MISS:
+                self._record(name, None, "cache_hits")
+                return ToolResult(name, params, result=cached, cached=True)
+        started = time.perf_counter()
+        try:
+            value, elapsed = _timed_call(spec.function, params)
+        except Exception as e:
+            self._record(name, time.perf_counter() - started, "errors")
+            return ToolResult(name, params, error=f"Tool {name} failed: {e}", exception=e)
+        self._record(name, elapsed, "ok")
+        if key is not None:
+            self._cache_set(key, value)
+        return ToolResult(name, params, result=value, elapsed=elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns per-tool call counters and latency histograms."""
+        with self._lock:
+            return {name: dict(counters,
+                               latency=self._histograms[name].to_dict() if name in self._histograms else None)
+                    for name, counters in self._counters.items()}
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def shutdown(self, wait: bool = True):
+        """Shuts down the worker pools; they are recreated on the next call."""
+        with self._lock:
+            threads, processes = self._threads, self._processes
+            self._threads = self._processes = None
+        for executor in (threads, processes):
+            if executor is not None:
+                executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __getstate__(self):
+        # Pools, locks and caches belong to this process; a copy starts with fresh ones
+        return {"max_workers": self.max_workers, "process_workers": self.process_workers,
+                "cache_size": self.cache_size, "default_timeout": self.default_timeout, "_tools": self._tools}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
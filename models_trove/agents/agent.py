@@ -31,15 +31,28 @@ class Agent:
         print(f"\n🔍 DEBUG: Full Prompt Sent to OpenAI:\n{full_prompt}\n")
 
         try:
-            response = self.llm.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": self.system_prompt},
-                          {"role": "user", "content": user_query}],
-                temperature=0.1,
-                max_tokens=500
-            )
+            output = self.llm.chat(self._messages(user_query), temperature=0.1, max_tokens=500)
 
-            output = response.choices[0].message.content.strip()
+            print(f"\n✅ DEBUG: Response Generated: {output}\n")
+            return output
+
+        except Exception as e:
+            print(f"\n❌ ERROR: Failed to generate response: {e}")
+            return None
+
+    async def arun(self, user_query):
+        """
+        Async version of run(). Requests go through the shared client pool, so
+        hundreds of agents can be awaited together without opening their own sockets.
+
+        Args:
+            user_query (str): The input question/query.
+
+        Returns:
+            str: The generated response.
+        """
+        try:
+            output = await self.llm.achat(self._messages(user_query), temperature=0.1, max_tokens=500)
 
             print(f"\n✅ DEBUG: Response Generated: {output}\n")
             return output
@@ -47,3 +60,41 @@ class Agent:
         except Exception as e:
             print(f"\n❌ ERROR: Failed to generate response: {e}")
             return None
+
+    def stream(self, user_query):
+        """
+        Runs the agent in streaming mode.
+
+        Args:
+            user_query (str): The input question/query.
+
+        Yields:
+            str: Response text deltas as they arrive.
+        """
+        try:
+            yield from self.llm.stream_chat(self._messages(user_query), temperature=0.1, max_tokens=500)
+
+        except Exception as e:
+            print(f"\n❌ ERROR: Failed to stream response: {e}")
+
+    async def astream(self, user_query):
+        """
+        Async version of stream().
+
+        Args:
+            user_query (str): The input question/query.
+
+        Yields:
+            str: Response text deltas as they arrive.
+        """
+        try:
+            async for delta in self.llm.astream_chat(self._messages(user_query), temperature=0.1, max_tokens=500):
+                yield delta
+
+        except Exception as e:
+            print(f"\n❌ ERROR: Failed to stream response: {e}")
+
+    def _messages(self, user_query):
+        """Builds the chat messages for a query."""
+        return [{"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_query}]
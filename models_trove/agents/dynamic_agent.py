@@ -1,6 +1,6 @@
 import textwrap
-from models.agents.agent import Agent  
-from prompts.meta_system_prompt import META_SYSTEM_PROMPT  
+from models_trove.agents.agent import Agent
+from prompts_trove.meta_system_prompt import META_SYSTEM_PROMPT
 
 class DynamicAgent:
     def __init__(self, domain, task_description, llm):
@@ -24,15 +24,12 @@ class DynamicAgent:
         print(f"📌 SYSTEM PROMPT:\n{structured_prompt}\n")
 
         try:
-            response = self.llm.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": structured_prompt}],
+            system_prompt_generated = self.llm.chat(
+                [{"role": "system", "content": structured_prompt}],
                 temperature=0.1,
                 max_tokens=500
             )
 
-            system_prompt_generated = response.choices[0].message.content.strip()
-
             print("\n✅ System Prompt Generated Successfully!")
             print(f"🔹 FINAL SYSTEM PROMPT:\n{system_prompt_generated}\n")
 
@@ -0,0 +1,545 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from typing import NamedTuple
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _atomic_save(path, write):
+    """
+    Writes a file through `write(file)` into a temporary file in the same directory and renames
+    it over `path`, so a reader (or a memory map of the old file) never sees a partial write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SearchResult(NamedTuple):
+    id: str
+    score: float
+    document: str
+    metadata: dict
+
+
+class HashingEmbedder:
+    def __init__(self, dim=384, ngram_range=(1, 2)):
+        """
+        A dependency-free local embedding function using the hashing trick.
+
+        Word n-grams are hashed into `dim` buckets with a random sign, then the
+        vector is L2-normalised. Deterministic across processes, so it is suited to
+        offline tests and to small deployments without an embedding API.
+
+        Args:
+            dim (int): Embedding dimensionality.
+            ngram_range (tuple): Smallest and largest word n-gram sizes to hash.
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text):
+        words = _WORD_PATTERN.findall(text.lower())
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for start in range(len(words) - n + 1):
+                yield " ".join(words[start:start + n])
+
+    def __call__(self, texts):
+        """
+        Embeds a list of texts.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim).
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                matrix[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class IVFIndex:
+    def __init__(self, n_lists=256, n_probe=8, min_train_size=None, kmeans_iterations=10,
+                 train_sample=None, retrain_growth=4.0, seed=0):
+        """
+        Inverted-file (IVF) approximate nearest-neighbour index over a VectorStore's rows.
+
+        Rows are clustered around `n_lists` k-means centroids; a search only scores the rows
+        of the `n_probe` lists whose centroids are closest to the query. Raising `n_probe`
+        trades latency for recall (n_probe == n_lists is exact).
+
+        Args:
+            n_lists (int): Number of k-means clusters (inverted lists).
+            n_probe (int): Lists scanned per query.
+            min_train_size (int): Rows needed before the index trains; below it search is exact.
+                Defaults to 39 x n_lists.
+            kmeans_iterations (int): Lloyd iterations when training.
+            train_sample (int): Rows sampled for k-means. Defaults to 64 x n_lists.
+            retrain_growth (float): Retrain once the store has grown by this factor since training.
+            seed (int): Random seed for sampling and initialisation.
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size or 39 * n_lists
+        self.kmeans_iterations = kmeans_iterations
+        self.train_sample = train_sample or 64 * n_lists
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+
+        self.centroids = None
+        self.labels = np.empty(0, dtype=np.int32)
+        self.trained_size = 0
+        self._lists = None
+        # Guards swapping centroids and lists; searches read a consistent snapshot and never write
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def config(self):
+        return {
+            "type": "ivf",
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "min_train_size": self.min_train_size,
+            "kmeans_iterations": self.kmeans_iterations,
+            "train_sample": self.train_sample,
+            "retrain_growth": self.retrain_growth,
+            "seed": self.seed,
+        }
+
+    def _nearest(self, vectors, centroids, count=1, chunk=65536):
+        """Indices of the `count` closest centroids (L2) for each vector, processed in chunks."""
+        centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+        out = np.empty((vectors.shape[0], count), dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk):
+            block = vectors[start:start + chunk]
+            distances = centroid_norms - 2.0 * (block @ centroids.T)
+            if count >= centroids.shape[0]:
+                out[start:start + chunk] = np.argsort(distances, axis=1)[:, :count]
+            else:
+                nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+                order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+                out[start:start + chunk] = np.take_along_axis(nearest, order, axis=1)
+        return out
+
+    def train(self, vectors):
+        """
+        Runs k-means on (a sample of) the vectors and assigns every row to a list.
+
+        Args:
+            vectors (np.ndarray): All rows of the store.
+        """
+        rng = np.random.default_rng(self.seed)
+        n_lists = min(self.n_lists, vectors.shape[0])
+        sample_size = min(self.train_sample, vectors.shape[0])
+        sample = np.asarray(vectors[rng.choice(vectors.shape[0], sample_size, replace=False)], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignment = self._nearest(sample, centroids)[:, 0]
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():  # Re-seed empty clusters from random sample points
+                centroids[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+
+        labels = self._nearest(vectors, centroids)[:, 0]
+        with self._lock:
+            self.centroids = centroids
+            self.labels = labels
+            self.trained_size = vectors.shape[0]
+            self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        """Groups every row by list. Caller holds self._lock (or owns the index exclusively)."""
+        order = np.argsort(self.labels, kind="stable")
+        bounds = np.searchsorted(self.labels[order], np.arange(self.centroids.shape[0] + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.centroids.shape[0])]
+
+    def add(self, vectors, start_row):
+        """
+        Assigns newly appended rows to their nearest list.
+
+        Args:
+            vectors (np.ndarray): The new rows.
+            start_row (int): Row number of the first new vector in the store.
+        """
+        if not self.trained:
+            return
+        with self._lock:
+            labels = self._nearest(vectors, self.centroids)[:, 0]
+            self.labels = np.concatenate([self.labels, labels])
+            # New arrays replace the touched lists, so a search holding the old list set is unaffected
+            order = np.argsort(labels, kind="stable")
+            touched, starts = np.unique(labels[order], return_index=True)
+            rows = start_row + order
+            lists = list(self._lists)
+            for label, chunk in zip(touched, np.split(rows, starts[1:])):
+                lists[label] = np.concatenate([lists[label], chunk])
+            self._lists = lists
+
+    def remove(self, keep):
+        """
+        Drops deleted rows and renumbers the rest after the store compacts.
+
+        Args:
+            keep (np.ndarray): Boolean mask over the old rows.
+        """
+        if not self.trained:
+            return
+        with self._lock:
+            self.labels = self.labels[keep]
+            self._rebuild_lists()
+
+    def needs_training(self, size):
+        if not self.trained:
+            return size >= self.min_train_size
+        return size >= self.trained_size * self.retrain_growth
+
+    def candidates(self, queries, n_probe=None):
+        """
+        Rows to score for each query.
+
+        Args:
+            queries (np.ndarray): (q, dim) query matrix.
+            n_probe (int): Overrides the index's n_probe.
+
+        Returns:
+            list[np.ndarray]: Candidate row numbers per query.
+        """
+        with self._lock:
+            centroids, lists = self.centroids, self._lists
+        n_probe = min(n_probe or self.n_probe, centroids.shape[0])
+        probes = self._nearest(queries, centroids, count=n_probe)
+        return [np.concatenate([lists[label] for label in probe]) for probe in probes]
+
+    def save(self, path):
+        with self._lock:
+            centroids, labels = self.centroids, self.labels
+        _atomic_save(os.path.join(path, "ivf_centroids.npy"), lambda file: np.save(file, centroids))
+        _atomic_save(os.path.join(path, "ivf_labels.npy"), lambda file: np.save(file, labels))
+
+    @classmethod
+    def load(cls, path, config, trained_size):
+        config = {key: value for key, value in config.items() if key != "type"}
+        index = cls(**config)
+        centroids_path = os.path.join(path, "ivf_centroids.npy")
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+            index.labels = np.load(os.path.join(path, "ivf_labels.npy"))
+            index.trained_size = trained_size
+            index._rebuild_lists()
+        return index
+
+
+class VectorStore:
+    METRICS = ("cosine", "dot")
+
+    def __init__(self, embedder=None, dim=None, metric="cosine", initial_capacity=1024, index=None):
+        """
+        An in-memory vector store backed by one contiguous float32 NumPy matrix.
+
+        Rows are appended into a pre-allocated buffer that doubles when full, searches
+        score a whole batch of queries with a single matrix product and select the top-k
+        with argpartition, and the matrix can be saved and memory-mapped back from disk.
+
+        Args:
+            embedder (callable): Maps a list of texts to a (n, dim) array. Defaults to HashingEmbedder.
+            dim (int): Embedding dimensionality. Defaults to `embedder.dim`.
+            metric (str): "cosine" (vectors are normalised on insert) or "dot".
+            initial_capacity (int): Number of rows to pre-allocate.
+            index (IVFIndex): Optional approximate index. Searches stay exact until it has
+                enough rows to train; pass `exact=True` to search() to bypass it.
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Expected one of {self.METRICS}.")
+
+        self.embedder = embedder or HashingEmbedder(dim=dim or 384)
+        self.dim = dim or getattr(self.embedder, "dim", None)
+        if not self.dim:
+            raise ValueError("VectorStore needs a dim when the embedder does not define one.")
+        self.metric = metric
+
+        self._vectors = np.empty((initial_capacity, self.dim), dtype=np.float32)
+        self._size = 0
+        self.ids = []
+        self.documents = []
+        self.metadata = []
+        self._rows = {}
+        self._next_id = 0
+        self.index = index
+        # Serializes writers and gives searches a consistent snapshot; embedding and scoring run outside it
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        """The (len, dim) float32 matrix of stored embeddings."""
+        return self._vectors[:self._size]
+
+    def _prepare(self, embeddings):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of dim {self.dim}, got {matrix.shape[1]}.")
+        if self.metric == "cosine":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        return matrix
+
+    def _reserve(self, rows):
+        """Grows the buffer (doubling) so `rows` more vectors fit."""
+        needed = self._size + rows
+        capacity = self._vectors.shape[0]
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        capacity = max(needed, capacity * 2, 16)
+        grown = np.empty((capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def add(self, documents, embeddings=None, ids=None, metadata=None):
+        """
+        Adds documents to the store.
+
+        Args:
+            documents (list[str]): Document texts.
+            embeddings (np.ndarray): Optional precomputed (n, dim) embeddings.
+            ids (list[str]): Optional unique ids. Generated when omitted.
+            metadata (list[dict]): Optional per-document metadata.
+
+        Returns:
+            list[str]: The ids of the added documents.
+        """
+        documents = list(documents)
+        if not documents:
+            return []
+        matrix = self._prepare(self.embedder(documents) if embeddings is None else embeddings)
+        if matrix.shape[0] != len(documents):
+            raise ValueError("Number of embeddings does not match number of documents.")
+
+        with self._lock:
+            if ids is None:
+                ids = [f"doc-{self._next_id + offset}" for offset in range(len(documents))]
+            ids = [str(doc_id) for doc_id in ids]
+            duplicates = [doc_id for doc_id in ids if doc_id in self._rows]
+            if duplicates or len(set(ids)) != len(ids):
+                raise ValueError(f"Duplicate document ids: {duplicates or ids}")
+
+            self._reserve(len(documents))
+            start = self._size
+            self._vectors[start:start + len(documents)] = matrix
+            self._next_id += len(documents)
+            for offset, doc_id in enumerate(ids):
+                self._rows[doc_id] = start + offset
+            self.ids.extend(ids)
+            self.documents.extend(documents)
+            self.metadata.extend(metadata or [{} for _ in documents])
+            # Rows become visible (size, then index lists) only once their metadata is in place
+            self._size += len(documents)
+
+            if self.index is not None:
+                if self.index.needs_training(self._size):
+                    self.index.train(self.vectors)
+                else:
+                    self.index.add(matrix, start)
+        return ids
+
+    def delete(self, ids):
+        """
+        Removes documents by id and compacts the matrix.
+
+        Args:
+            ids (list[str]): Ids to remove. Unknown ids are ignored.
+
+        Returns:
+            int: Number of documents removed.
+        """
+        with self._lock:
+            rows = [self._rows[str(doc_id)] for doc_id in ids if str(doc_id) in self._rows]
+            if not rows:
+                return 0
+
+            keep = np.ones(self._size, dtype=bool)
+            keep[rows] = False
+            kept = np.flatnonzero(keep)
+            # New arrays and lists replace the old ones, so a search's snapshot stays consistent
+            self.ids = [self.ids[row] for row in kept]
+            self.documents = [self.documents[row] for row in kept]
+            self.metadata = [self.metadata[row] for row in kept]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            self._vectors = np.ascontiguousarray(self._vectors[:self._size][keep])
+            self._size = self._vectors.shape[0]
+            if self.index is not None:
+                self.index.remove(keep)
+            return len(rows)
+
+    def embed_queries(self, queries):
+        """Embeds (and normalises, for cosine) a query string, a list of strings or a raw array."""
+        if isinstance(queries, str):
+            queries = [queries]
+        if isinstance(queries, np.ndarray):
+            return self._prepare(queries)
+        return self._prepare(self.embedder(list(queries)))
+
+    def search(self, queries, k=5, exact=False, n_probe=None):
+        """
+        Finds the k most similar documents for one or many queries.
+
+        Args:
+            queries (str | list[str] | np.ndarray): One query, a batch of queries, or query embeddings.
+            k (int): Number of results per query.
+            exact (bool): Force a brute-force search even when an ANN index is trained.
+            n_probe (int): Lists scanned per query by an IVF index (overrides its default).
+
+        Returns:
+            list[SearchResult] for a single string query, otherwise a list of such lists.
+        """
+        single = isinstance(queries, str)
+        matrix = self.embed_queries(queries)
+        with self._lock:
+            # Writers only append to these or replace them, so the snapshot stays valid outside the lock
+            vectors = self._vectors[:self._size]
+            rows_metadata = (self.ids, self.documents, self.metadata)
+            use_index = self.index is not None and self.index.trained and not exact and vectors.shape[0] > 0
+            probes = self.index.candidates(matrix, n_probe) if use_index else None
+        if vectors.shape[0] == 0 or k <= 0:
+            return [] if single else [[] for _ in range(matrix.shape[0])]
+
+        if use_index:
+            results = []
+            for query, candidates in zip(matrix, probes):
+                scores = vectors[candidates] @ query
+                best, best_scores = self._top_k(scores[None, :], k)
+                results.append(self._results(candidates[best[0]], best_scores[0], rows_metadata))
+            return results[0] if single else results
+
+        scores = matrix @ vectors.T
+        rows, row_scores = self._top_k(scores, k)
+        results = [self._results(query_rows, query_scores, rows_metadata)
+                   for query_rows, query_scores in zip(rows, row_scores)]
+        return results[0] if single else results
+
+    @staticmethod
+    def _top_k(scores, k):
+        """Returns (rows, scores) of the k best columns per row, best first."""
+        k = min(k, scores.shape[1])
+        if k == 0:
+            empty = np.empty((scores.shape[0], 0), dtype=np.int64)
+            return empty, empty.astype(scores.dtype)
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+    @staticmethod
+    def _results(rows, scores, rows_metadata):
+        ids, documents, metadata = rows_metadata
+        return [SearchResult(ids[row], float(score), documents[row], metadata[row])
+                for row, score in zip(rows, scores)]
+
+    def save(self, path):
+        """
+        Saves the store to a directory: `vectors.npy` (raw float32 matrix), `store.json`
+        and, for a trained IVF index, its centroids and list assignments. Every file is written
+        to a temporary file and renamed into place, so saving over the directory a store was
+        memory-mapped from is safe. store.json is written last.
+
+        Args:
+            path (str): Target directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            vectors = self.vectors
+            state = json.dumps({
+                "dim": self.dim,
+                "metric": self.metric,
+                "next_id": self._next_id,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadata": self.metadata,
+                "index": self.index.config() if self.index is not None else None,
+                "index_trained_size": self.index.trained_size if self.index is not None else 0,
+            }, ensure_ascii=False)
+            if self.index is not None and self.index.trained:
+                self.index.save(path)
+        _atomic_save(os.path.join(path, "vectors.npy"), lambda file: np.save(file, vectors))
+        _atomic_save(os.path.join(path, "store.json"), lambda file: file.write(state.encode("utf-8")))
+
+    @classmethod
+    def load(cls, path, embedder=None, mmap=True):
+        """
+        Loads a store saved with save().
+
+        Args:
+            path (str): Directory written by save().
+            embedder (callable): Embedding function for new documents and queries.
+            mmap (bool): Memory-map the vectors instead of reading them into RAM.
+                The mapping is copied into memory on the first add or delete.
+
+        Returns:
+            VectorStore: The loaded store.
+        """
+        with open(os.path.join(path, "store.json"), "r", encoding="utf-8") as file:
+            state = json.load(file)
+
+        store = cls(embedder=embedder, dim=state["dim"], metric=state["metric"], initial_capacity=0)
+        store._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        store._size = store._vectors.shape[0]
+        store._next_id = state["next_id"]
+        store.ids = state["ids"]
+        store.documents = state["documents"]
+        store.metadata = state["metadata"]
+        store._rows = {doc_id: row for row, doc_id in enumerate(store.ids)}
+        if state.get("index"):
+            store.index = IVFIndex.load(path, state["index"], state.get("index_trained_size", 0))
+        return store
@@ -0,0 +1,195 @@
+import os
+import asyncio
+import threading
+import weakref
+import httpx
+import openai
+
+
+class LLMClientPool:
+    def __init__(self, api_key=None, base_url=None, max_in_flight=64, max_keepalive=32,
+                 keepalive_expiry=30.0, timeout=60.0):
+        """
+        A process-wide pool of OpenAI clients shared by every model and agent.
+
+        One sync client (for threads) and one async client per event loop are created
+        lazily. Both sit on pooled keep-alive HTTP connections, and the number of
+        completion requests in flight through each of them is capped.
+
+        Args:
+            api_key (str): OpenAI API key. Defaults to the OPENAI_API_KEY environment variable.
+            base_url (str): Optional API base URL (e.g. a proxy or a local test server).
+            max_in_flight (int): Maximum concurrent completion requests per client.
+            max_keepalive (int): Maximum idle connections kept open for reuse.
+            keepalive_expiry (float): Seconds an idle connection is kept before closing.
+            timeout (float): Per-request timeout in seconds.
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_in_flight,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+
+        self._lock = threading.Lock()
+        self._client = None
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+
+    @property
+    def client(self):
+        """The shared sync `openai.OpenAI` client."""
+        with self._lock:
+            if self._client is None:
+                self._client = openai.OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    http_client=httpx.Client(limits=self.limits, timeout=self.timeout),
+                )
+            return self._client
+
+    def _async_state(self):
+        """Returns the (client, semaphore) pair bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._async_clients.get(loop)
+            if state is None:
+                client = openai.AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout),
+                )
+                state = (client, asyncio.Semaphore(self.max_in_flight))
+                self._async_clients[loop] = state
+            return state
+
+    @property
+    def async_client(self):
+        """The shared `openai.AsyncOpenAI` client for the running event loop."""
+        return self._async_state()[0]
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.total_requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def create(self, **kwargs):
+        """
+        Sends a chat completion request through the shared sync client.
+
+        Blocks while `max_in_flight` requests are already running.
+        """
+        client = self.client
+        with self._slots:
+            self._enter()
+            try:
+                return client.chat.completions.create(**kwargs)
+            finally:
+                self._exit()
+
+    async def acreate(self, **kwargs):
+        """
+        Sends a chat completion request through the shared async client.
+
+        Waits (without blocking the event loop) while `max_in_flight` requests are running.
+        """
+        client, slots = self._async_state()
+        async with slots:
+            self._enter()
+            try:
+                return await client.chat.completions.create(**kwargs)
+            finally:
+                self._exit()
+
+    def stream(self, **kwargs):
+        """
+        Streams a chat completion through the shared sync client, yielding text deltas.
+
+        The in-flight slot is held until the stream is exhausted or closed.
+        """
+        client = self.client
+        with self._slots:
+            self._enter()
+            try:
+                for chunk in client.chat.completions.create(stream=True, **kwargs):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                self._exit()
+
+    async def astream(self, **kwargs):
+        """
+        Streams a chat completion through the shared async client, yielding text deltas.
+        """
+        client, slots = self._async_state()
+        async with slots:
+            self._enter()
+            try:
+                async for chunk in await client.chat.completions.create(stream=True, **kwargs):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                self._exit()
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters."""
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "total_requests": self.total_requests,
+                "max_in_flight": self.max_in_flight,
+            }
+
+    def close(self):
+        """Closes the sync client's connections."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self):
+        """Closes the async client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._async_clients.pop(loop, None)
+        if state is not None:
+            await state[0].close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_client_pool(**kwargs):
+    """
+    Returns the process-wide LLMClientPool, creating it on first use.
+
+    Keyword arguments are only applied when the pool is created. The in-flight cap
+    can also be set with the TROVE_LLM_MAX_IN_FLIGHT environment variable.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            kwargs.setdefault("max_in_flight", int(os.getenv("TROVE_LLM_MAX_IN_FLIGHT", "64")))
+            _default_pool = LLMClientPool(**kwargs)
+        return _default_pool
+
+
+def set_client_pool(pool):
+    """Replaces the process-wide LLMClientPool (e.g. to point every agent at another endpoint)."""
+    global _default_pool
+    with _default_pool_lock:
+        _default_pool = pool
@@ -1,16 +1,22 @@
 import os
-import openai
 from dotenv import load_dotenv
+from models_trove.llms.client_pool import get_client_pool
 
 # ✅ Load environment variables from .env
 load_dotenv()
 
 class AIModel:
-    def __init__(self, model_type="openai"):
+    def __init__(self, model_type="openai", model_name="gpt-4o", pool=None, cache=None):
         """
         Initializes an AI model instance.
+
+        Every AIModel shares the process-wide LLMClientPool unless a pool is passed in,
+        so many agents reuse the same connections and in-flight cap. An optional
+        ResponseCache serves byte-identical requests without calling the API.
         """
         self.model_type = model_type
+        self.model_name = model_name
+        self.cache = cache
         self.api_key = os.getenv("OPENAI_API_KEY")
 
         # ✅ Force API key check
@@ -20,7 +26,98 @@ class AIModel:
         print(f"🔍 DEBUG: Using OpenAI API Key: {self.api_key[:5]}**********")  # ✅ Print first 5 characters for verification
 
         if model_type == "openai":
-            self.client = openai.OpenAI(api_key=self.api_key)  # ✅ Fix client initialization
+            self.pool = pool or get_client_pool(api_key=self.api_key)
+            self.client = self.pool.client  # ✅ Shared, connection-pooled client
+
+    def _request(self, messages, temperature, max_tokens):
+        """Builds the chat completion request parameters."""
+        return {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+    def chat(self, messages, temperature=0.1, max_tokens=500):
+        """
+        Sends a list of chat messages and returns the stripped completion text.
+        Errors are raised to the caller.
+        """
+        request = self._request(messages, temperature, max_tokens)
+        key, output = self._cached(request)
+        if output is not None:
+            return output
+
+        response = self.pool.create(**request)
+        output = response.choices[0].message.content.strip()
+        self._store(key, output)
+        return output
+
+    async def achat(self, messages, temperature=0.1, max_tokens=500):
+        """
+        Async version of chat(), sharing the pool's async client and in-flight cap.
+        """
+        request = self._request(messages, temperature, max_tokens)
+        key, output = self._cached(request)
+        if output is not None:
+            return output
+
+        response = await self.pool.acreate(**request)
+        output = response.choices[0].message.content.strip()
+        self._store(key, output)
+        return output
+
+    def stream_chat(self, messages, temperature=0.1, max_tokens=500):
+        """
+        Streaming version of chat(): yields text deltas as the model produces them.
+        Leading whitespace is dropped so the joined stream matches chat()'s stripped output.
+        """
+        request = self._request(messages, temperature, max_tokens)
+        key, output = self._cached(request)
+        if output is not None:
+            yield output
+            return
+
+        parts = []
+        for delta in self.pool.stream(**request):
+            if not parts:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            parts.append(delta)
+            yield delta
+        self._store(key, "".join(parts).strip())
+
+    async def astream_chat(self, messages, temperature=0.1, max_tokens=500):
+        """
+        Async version of stream_chat().
+        """
+        request = self._request(messages, temperature, max_tokens)
+        key, output = self._cached(request)
+        if output is not None:
+            yield output
+            return
+
+        parts = []
+        async for delta in self.pool.astream(**request):
+            if not parts:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            parts.append(delta)
+            yield delta
+        self._store(key, "".join(parts).strip())
+
+    def _cached(self, request):
+        """Returns (cache key, cached output) for a request; both None when caching is off."""
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(**request)
+        return key, self.cache.get(key)
+
+    def _store(self, key, output):
+        if self.cache is not None and output:
+            self.cache.set(key, output)
 
     def generate_response(self, user_message):
         """
@@ -29,17 +126,25 @@ class AIModel:
         print(f"\n🔍 DEBUG: Sending Prompt to LLM: {user_message}")
 
         try:
-            response = self.client.chat.completions.create(  
-                model="gpt-4o",  
-                messages=[{"role": "user", "content": user_message}],
-                temperature=0.1,
-                max_tokens=500
-            )
-
-            output = response.choices[0].message.content.strip()
+            output = self.chat([{"role": "user", "content": user_message}])
             print(f"\n✅ DEBUG: LLM Output Received: {output}")  # ✅ Debug print
             return output
 
         except Exception as e:
             print(f"\n❌ ERROR: Failed to get LLM response: {e}")
             return None
+
+    async def agenerate(self, user_message):
+        """
+        Async version of generate_response().
+        """
+        print(f"\n🔍 DEBUG: Sending Prompt to LLM: {user_message}")
+
+        try:
+            output = await self.achat([{"role": "user", "content": user_message}])
+            print(f"\n✅ DEBUG: LLM Output Received: {output}")
+            return output
+
+        except Exception as e:
+            print(f"\n❌ ERROR: Failed to get LLM response: {e}")
+            return None
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def cache_key(model, messages, temperature, max_tokens):
+    """
+    Content-addressed cache key for a chat completion request.
+
+    Args:
+        model (str): Model name.
+        messages (list): Chat messages sent to the model.
+        temperature (float): Sampling temperature.
+        max_tokens (int): Completion token limit.
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding of the request.
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=None):
+        """
+        In-memory LRU tier.
+
+        Args:
+            max_entries (int): Maximum number of cached responses.
+            max_bytes (int): Maximum total size of cached responses (UTF-8 bytes).
+            ttl (float): Seconds an entry stays valid, or None to never expire.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+class SQLiteCache:
+    def __init__(self, path, max_bytes=None, ttl=None):
+        """
+        Persistent disk tier stored in a single SQLite file.
+
+        Args:
+            path (str): Database file path.
+            max_bytes (int): Maximum total size of stored responses, or None for unbounded.
+                Least recently used rows are evicted first.
+            ttl (float): Seconds an entry stays valid, or None to never expire.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Returns (value, expires_at) for a live entry, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+
+    def set(self, key, value, expires_at=None):
+        now = time.time()
+        if expires_at is None and self.ttl is not None:
+            expires_at = now + self.ttl
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now),
+            )
+            if self.max_bytes is not None:
+                self._evict()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=None,
+                 disk_path=None, disk_max_bytes=None):
+        """
+        Two-tier LLM response cache keyed on (model, messages, temperature, max_tokens).
+
+        Lookups hit the in-memory LRU first, then the optional SQLite tier; disk hits
+        are promoted back into memory. Pass an instance to `AIModel(cache=...)` to
+        serve byte-identical prompts without calling the API.
+
+        Args:
+            max_entries (int): Maximum entries in the memory tier.
+            max_bytes (int): Maximum bytes in the memory tier.
+            ttl (float): Seconds a response stays valid in either tier, or None.
+            disk_path (str): SQLite file for the persistent tier, or None for memory only.
+            disk_max_bytes (int): Maximum bytes kept on disk, or None for unbounded.
+        """
+        self.memory = MemoryCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.disk = SQLiteCache(disk_path, max_bytes=disk_max_bytes, ttl=ttl) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    key = staticmethod(cache_key)
+
+    def get(self, key):
+        """Returns the cached response for a key, or None on a miss."""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None:
+                value, expires_at = row
+                self.memory.set(key, value, expires_at=expires_at)
+                with self._lock:
+                    self.disk_hits += 1
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Stores a response in every tier."""
+        if value is None:
+            return
+        expires_at = time.time() + self.memory.ttl if self.memory.ttl is not None else None
+        self.memory.set(key, value, expires_at=expires_at)
+        if self.disk is not None:
+            self.disk.set(key, value, expires_at=expires_at)
+
+    def stats(self):
+        """Returns hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory.total_bytes,
+                "disk_entries": len(self.disk) if self.disk is not None else 0,
+            }
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
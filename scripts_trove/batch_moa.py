@@ -0,0 +1,134 @@
+"""
+Runs the MOA business analysis over a portfolio of tickers and writes one PDF report per company.
+
+Financial data for all tickers is fetched concurrently (and cached), the agents are defined
+once with company-neutral prompts, and companies run concurrently through TroveMOABatch.
+Each finished company is checkpointed, so an interrupted run picks up where it stopped.
+
+Usage:
+    python scripts_trove/batch_moa.py TSLA AAPL MSFT --concurrency 8
+    python scripts_trove/batch_moa.py --tickers-file portfolio.txt --fresh
+    FINANCIAL_DATA_FIXTURES=data_trove/fixtures python scripts_trove/batch_moa.py TSLA
+"""
+import os
+import sys
+import logging
+import argparse
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_moa_batch import TroveMOABatch
+from utils.chart_renderer import ChartSpec, Series
+from utils.financial_data import create_client, key_metrics
+from utils.report_builder import ReportBuilder, ReportSection, ReportSpec
+
+load_dotenv(".env")
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+METRIC_LABELS = {"revenue": "Revenue", "net_profit": "Net Profit",
+                 "debt_equity_ratio": "Debt-to-Equity Ratio", "cash_flow": "Cash Flow"}
+
+
+def build_agents(llm):
+    """Company-neutral agent definitions; the company and its metrics arrive in each task."""
+    financial_agent = TroveAgent(
+        agent_name="FinancialStatementAnalyzer",
+        system_prompt="""
+        Provide an in-depth financial analysis of the company and metrics given in the task:
+        revenue and profitability drivers, debt sustainability, financial stability and investment potential.
+        """,
+        llm=llm,
+    )
+    risk_agent = TroveAgent(
+        agent_name="RiskAssessmentSpecialist",
+        system_prompt="""
+        Assess the market, financial, regulatory and supply chain risks of the company given in the task,
+        and suggest mitigation strategies.
+        """,
+        llm=llm,
+    )
+    strategy_agent = TroveAgent(
+        agent_name="BusinessStrategyEvaluator",
+        system_prompt="""
+        Evaluate the business strategy of the company given in the task: competitive positioning,
+        growth areas, R&D and strategic recommendations.
+        """,
+        llm=llm,
+    )
+    aggregator_agent = TroveAgent(
+        agent_name="ReportAggregator",
+        system_prompt="""
+        Combine the analyses into a structured business analysis report: company overview, financial
+        performance, risk analysis, strategy evaluation and future outlook with recommendations.
+        """,
+        llm=llm,
+    )
+    return [financial_agent, risk_agent, strategy_agent], aggregator_agent
+
+
+def report_spec(record, output_dir):
+    metrics = record["data"]
+    values = [metrics.get(key, 0) for key in METRIC_LABELS]
+    chart = ChartSpec(
+        kind="bar",
+        series=[Series(values, list(METRIC_LABELS.values()), color=["blue", "green", "red", "orange"])],
+        title=f"Financial Metrics for {record['name']}",
+        xlabel="Metrics",
+        ylabel="Value (in USD)",
+        grid="y",
+    )
+    return ReportSpec(
+        title=f"{record['name']} Business Analysis Report",
+        output_path=os.path.join(output_dir, f"{record['key'].lower()}_moa_report.pdf"),
+        sections=[
+            ReportSection(text=record["report"]),
+            ReportSection("Key Financial Metrics", metrics={METRIC_LABELS[key]: metrics[key]
+                                                            for key in METRIC_LABELS if key in metrics}),
+            ReportSection("Financial Trends Chart", chart=chart),
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--tickers-file", help="File with one ticker per line")
+    parser.add_argument("--concurrency", type=int, default=4, help="Companies analysed at once")
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--llm", default="gpt-4o")
+    parser.add_argument("--name", default="Trove-MOA-Portfolio")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--fresh", action="store_true", help="Ignore existing checkpoints")
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file, "r", encoding="utf-8") as file:
+            tickers += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    if not tickers:
+        parser.error("no tickers given")
+
+    client = create_client()
+    statements, errors = client.get_many(tickers, "income-statement")
+    companies = [{"name": ticker, "ticker": ticker, "data": key_metrics(statements[ticker][0])}
+                 for ticker in statements if isinstance(statements[ticker], list) and statements[ticker]]
+    for ticker, error in errors.items():
+        logging.error(f"Skipping {ticker}: {error}")
+
+    agents, final_agent = build_agents(args.llm)
+    batch = TroveMOABatch(name=args.name, agents=agents, final_agent=final_agent, layers=args.layers,
+                          max_concurrent=args.concurrency)
+    results = batch.run(companies, resume=not args.fresh)
+
+    finished = [record for record in results.values() if "error" not in record]
+    report = ReportBuilder(chart_cache_dir=os.path.join(args.output_dir, "charts"))
+    built = report.build_many([report_spec(record, args.output_dir) for record in finished])
+    logging.info(f"Batch stats: {batch.stats()}; reports: {built.reports_per_minute:.1f}/min, "
+                 f"{len(built.errors)} failed")
+    print(f"📄 {len(finished)}/{len(results)} companies analysed; reports in {args.output_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Time to screen many tickers with FinancialDataClient, against a fixture backend with
+simulated network latency (no API key or network needed).
+
+Compares one request at a time (the old per-script requests.get pattern) with get_many
+under a rate limit, then a second get_many served from the on-disk cache.
+
+Usage:
+    python scripts_trove/benchmark_financial_data.py --tickers 500 --latency 0.1 --workers 32
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.financial_data import FinancialDataClient, FixtureBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated round trip in seconds")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=300, help="Requests per second allowed")
+    parser.add_argument("--sequential-sample", type=int, default=20,
+                        help="Tickers fetched one at a time; the total is extrapolated")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="trove-financial-bench-")
+    try:
+        backend = FixtureBackend(os.path.join(workdir, "fixtures"), latency=args.latency)
+        tickers = [f"T{index:04d}" for index in range(args.tickers)]
+        for index, ticker in enumerate(tickers):
+            backend.save("income-statement", ticker, [{"symbol": ticker, "revenue": 1000 + index, "netIncome": index}])
+
+        sample = tickers[:args.sequential_sample]
+        uncached = FinancialDataClient(backend=backend, cache_dir=None, rate_limit=None)
+        started = time.perf_counter()
+        for ticker in sample:
+            uncached.get(ticker)
+        sequential = (time.perf_counter() - started) / len(sample) * len(tickers)
+
+        client = FinancialDataClient(backend=backend, cache_dir=os.path.join(workdir, "cache"),
+                                     rate_limit=args.rate, max_workers=args.workers)
+        started = time.perf_counter()
+        results, errors = client.get_many(tickers)
+        concurrent = time.perf_counter() - started
+        assert len(results) == len(tickers) and not errors, errors
+
+        started = time.perf_counter()
+        client.get_many(tickers)
+        cached = time.perf_counter() - started
+
+        print(f"{args.tickers} tickers, {args.latency * 1000:.0f} ms latency, {args.workers} workers, "
+              f"{args.rate:g} req/s limit")
+        print(f"{'mode':<28}{'seconds':>10}")
+        print(f"{'sequential (extrapolated)':<28}{sequential:>10.2f}")
+        print(f"{'get_many':<28}{concurrent:>10.2f}")
+        print(f"{'get_many (cached)':<28}{cached:>10.2f}")
+        print(f"cache: {client.stats()}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
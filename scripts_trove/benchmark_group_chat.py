@@ -0,0 +1,94 @@
+"""
+Prompt tokens, prompt build time and memory of a long TroveGroupChat with many agents,
+using a stub model that answers instantly (no API key needed).
+
+Compares the tokens actually sent (newest messages within the per-turn cap) with what
+resending the full transcript every turn would have cost, and checks that building a
+turn's prompt stays as fast late in the chat as early on.
+
+Usage:
+    python scripts_trove/benchmark_group_chat.py --agents 12 --rounds 300 --max-prompt-tokens 2000
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents_trove.trove_agent import TroveAgent
+from agents_trove.trove_group_chat import TroveGroupChat
+
+WORDS = ("revenue margin debt supply battery demand pricing capacity outlook risk growth "
+         "regulation factory software energy storage charging network competition").split()
+
+
+class StubModel:
+    """Answers with a few dozen words and names another participant now and then."""
+
+    def __init__(self, names, seed):
+        self.names = names
+        self.random = random.Random(seed)
+
+    def chat(self, messages):
+        words = self.random.choices(WORDS, k=self.random.randint(20, 60))
+        if self.random.random() < 0.3:
+            words.append(f"What do you think, {self.random.choice(self.names)}?")
+        return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--speakers", type=int, default=3, help="Agents speaking concurrently per round")
+    parser.add_argument("--max-prompt-tokens", type=int, default=2000)
+    parser.add_argument("--selection", default="mention", choices=TroveGroupChat.SELECTIONS)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    names = [f"Analyst{index}" for index in range(args.agents)]
+    agents = [TroveAgent(agent_name=name, system_prompt=f"You are {name}, one of several market analysts.",
+                         llm=StubModel(names, seed)) for seed, name in enumerate(names)]
+    chat = TroveGroupChat(name="Bench-Chat", agents=agents, max_prompt_tokens=args.max_prompt_tokens,
+                          max_concurrent_speakers=args.speakers, speaker_selection=args.selection)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    outcome = chat.run("Debate the outlook for electric vehicle makers next year.", max_rounds=args.rounds)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Resending the whole public transcript each turn: the sum of the transcript size at every turn
+    transcript = chat.transcript
+    naive, position = 0, 0
+    for message in outcome.messages:
+        if message.speaker in chat.participants and message.recipient is None:
+            naive += transcript.public_tokens(0, position)
+        position += message.recipient is None
+
+    def build_time(end, repeats=200):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            chat.build_prompt(names[0], end)
+        return (time.perf_counter() - started) / repeats * 1000
+
+    turns = sum(stats["turns"] for stats in chat.stats()["agents"].values())
+    print(f"{args.agents} agents, {outcome.rounds} rounds, {turns} turns, {len(transcript)} messages "
+          f"({transcript.total_tokens()} tokens) in {elapsed:.2f}s")
+    print(f"prompt tokens sent:          {outcome.prompt_tokens:>12,} (max {outcome.max_prompt_tokens} per turn, "
+          f"cap {args.max_prompt_tokens})")
+    print(f"full transcript every turn:  {naive:>12,} ({naive / max(outcome.prompt_tokens, 1):.1f}x)")
+    print(f"prompt build: {build_time(20):.3f} ms at message 20, {build_time(len(transcript)):.3f} ms "
+          f"at message {len(transcript)}")
+    print(f"peak traced memory: {peak / 1e6:.1f} MB; short-term memory entries per agent: "
+          f"{max(len(agent.short_term_memory) for agent in agents)}")
+    chat.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Offline throughput benchmark for the shared LLM client pool.
+
+Starts a local fake OpenAI-compatible HTTP server, then runs a few hundred
+`Agent.arun` calls against it through one LLMClientPool and reports
+requests/second, peak in-flight requests and how many TCP connections the
+server actually saw (keep-alive reuse keeps this close to the in-flight cap).
+
+Usage:
+    python scripts_trove/benchmark_llm_pool.py --agents 300 --max-in-flight 32 --latency 0.05
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-local-benchmark")
+
+from models_trove.agents.agent import Agent
+from models_trove.llms.client_pool import LLMClientPool
+from models_trove.llms.gpt_model import AIModel
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """A local HTTP server answering /chat/completions with a canned response after a fixed delay."""
+
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(("127.0.0.1", 0), FakeChatHandler)
+        self.latency = latency
+        self.connections = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}/v1"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+            self.server.requests += 1
+
+        time.sleep(self.server.latency)
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        payload = json.dumps({
+            "id": "chatcmpl-local",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"  echo: {prompt[:40]}  "},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def run_agents(agents):
+    return await asyncio.gather(*(agent.arun(f"query {i}") for i, agent in enumerate(agents)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=300, help="Number of concurrent agents")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="Pool in-flight request cap")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per request (s)")
+    args = parser.parse_args()
+
+    server = FakeChatServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    pool = LLMClientPool(base_url=server.base_url, max_in_flight=args.max_in_flight)
+    llm = AIModel(pool=pool)
+    agents = [Agent(f"Agent-{i}", "You are a benchmark agent.", llm) for i in range(args.agents)]
+
+    # Silence the agents' debug prints so they don't dominate the timing
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(run_agents(agents))
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    server.shutdown()
+    stats = pool.stats()
+    ideal = args.agents / args.max_in_flight * args.latency
+
+    print(f"Agents:              {args.agents}")
+    print(f"Successful replies:  {sum(1 for r in results if r)}")
+    print(f"Elapsed:             {elapsed:.2f}s (ideal ~{ideal:.2f}s)")
+    print(f"Throughput:          {args.agents / elapsed:.1f} req/s")
+    print(f"Peak in-flight:      {stats['peak_in_flight']} (cap {stats['max_in_flight']})")
+    print(f"TCP connections:     {len(server.connections)}")
+
+
+if __name__ == "__main__":
+    main()
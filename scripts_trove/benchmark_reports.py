@@ -0,0 +1,76 @@
+"""
+Throughput of PDF report generation, one report at a time vs. a process pool.
+
+Builds a batch of synthetic company reports (analysis text with Unicode punctuation,
+a metrics table and a bar chart each) with ReportBuilder, first sequentially in this
+process and then with build_many, and reports reports per minute for both.
+
+Usage:
+    python scripts_trove/benchmark_reports.py --reports 40 --workers 4
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.chart_renderer import ChartSpec, Series
+from utils.report_builder import ReportBuilder, ReportSection, ReportSpec
+
+
+def company_report(index, output_dir):
+    revenue, net_profit = 1000 + index * 37, 100 + index * 11
+    text = "\n".join(f"{section}. Company {index}’s results — revenue up {index % 9 + 1}% … margins stable."
+                     for section in range(1, 41))
+    chart = ChartSpec(
+        kind="bar",
+        series=[Series([revenue, net_profit, index % 3], ["Revenue", "Net Profit", "Debt/Equity"],
+                       color=["blue", "green", "red"])],
+        title=f"Financial Metrics for Company {index}",
+    )
+    return ReportSpec(
+        title=f"Company {index} Financial Analysis Report",
+        output_path=os.path.join(output_dir, f"company_{index}.pdf"),
+        sections=[
+            ReportSection(text=text),
+            ReportSection("Key Financial Metrics", metrics={"Revenue": revenue, "Net Profit": net_profit}),
+            ReportSection("Financial Trends Chart", chart=chart),
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (defaults to CPU count)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="trove-report-bench-")
+    try:
+        rows = []
+        for name, processes in (("sequential", False), ("process pool", True)):
+            output_dir = os.path.join(workdir, name.replace(" ", "_"))
+            specs = [company_report(index, output_dir) for index in range(args.reports)]
+            # A fresh chart cache per run, so both include rendering the charts
+            builder = ReportBuilder(chart_cache_dir=os.path.join(output_dir, "charts"), max_workers=args.workers)
+            started = time.perf_counter()
+            result = builder.build_many(specs, processes=processes)
+            elapsed = time.perf_counter() - started
+            assert not result.errors, result.errors
+            rows.append((name, elapsed, result.reports_per_minute))
+
+        print(f"{args.reports} reports, {args.workers or os.cpu_count()} workers")
+        print(f"{'mode':<16}{'seconds':>10}{'reports/min':>14}")
+        for name, elapsed, rate in rows:
+            print(f"{name:<16}{elapsed:>10.2f}{rate:>14.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Save/load time and file size of TroveAgent state in JSON, YAML, TOML and the binary format.
+
+Fills an agent's long-term memory with synthetic daily energy records (the shape
+EnergyAssistant.load_energy_data produces) plus some short-term history, then times
+each serializer. For the binary format it reports both the lazy open (config and
+short-term memory only) and a full decode of the energy records.
+
+Usage:
+    python scripts_trove/benchmark_state_formats.py --records 50000
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import datetime
+import yaml
+import toml
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents_trove.trove_agent import TroveAgent
+
+
+def energy_records(count):
+    start = datetime.date(2020, 1, 1)
+    return [{"date": (start + datetime.timedelta(days=day)).isoformat(),
+             "consumption": 450 + (day * 37) % 200,
+             "production": 600 + (day * 53) % 150}
+            for day in range(count)]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--history", type=int, default=500, help="Short-term memory entries")
+    parser.add_argument("--skip-yaml", action="store_true", help="YAML is by far the slowest at large sizes")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="trove-state-bench-")
+    try:
+        agent = TroveAgent(agent_name="BenchAgent", saved_state_path=os.path.join(workdir, "state.json"))
+        agent.long_term_memory["energy_data"] = energy_records(args.records)
+        agent.short_term_memory.extend(f"Analyze energy usage for day {day}" for day in range(args.history))
+
+        paths = {name: os.path.join(workdir, f"state.{name}") for name in ("json", "yaml", "toml", "trove")}
+        rows = []
+
+        def dump_text(path, text):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+
+        def read_text(path):
+            with open(path, "r", encoding="utf-8") as file:
+                return file.read()
+
+        _, save = timed(lambda: dump_text(paths["json"], json.dumps(agent.to_dict())))
+        _, load = timed(lambda: json.loads(read_text(paths["json"])))
+        rows.append(("json", save, load, os.path.getsize(paths["json"])))
+
+        if not args.skip_yaml:
+            _, save = timed(lambda: dump_text(paths["yaml"], yaml.dump(agent.to_dict())))
+            _, load = timed(lambda: yaml.safe_load(read_text(paths["yaml"])))
+            rows.append(("yaml", save, load, os.path.getsize(paths["yaml"])))
+
+        _, save = timed(lambda: dump_text(paths["toml"], agent.to_toml()))
+        _, load = timed(lambda: toml.loads(read_text(paths["toml"])))
+        rows.append(("toml", save, load, os.path.getsize(paths["toml"])))
+
+        _, save = timed(lambda: agent.save_binary(paths["trove"]))
+        restored = TroveAgent(agent_name="BenchAgent")
+        _, lazy_load = timed(lambda: restored.load_binary(paths["trove"]))
+        records, decode = timed(lambda: restored.long_term_memory["energy_data"])
+        assert records == agent.long_term_memory["energy_data"]
+        rows.append(("binary (lazy)", save, lazy_load, os.path.getsize(paths["trove"])))
+        rows.append(("binary (full)", save, lazy_load + decode, os.path.getsize(paths["trove"])))
+
+        print(f"{args.records} energy records, {args.history} short-term entries")
+        print(f"{'format':<16}{'save s':>10}{'load s':>10}{'size KB':>12}")
+        for name, save, load, size in rows:
+            print(f"{name:<16}{save:>10.3f}{load:>10.3f}{size / 1024:>12.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Recall@k and QPS benchmark: IVF approximate search vs. exact brute-force search.
+
+Builds a VectorStore over synthetic clustered embeddings (so the benchmark runs
+offline), then measures exact search throughput and, for several n_probe values,
+IVF recall@k against the exact results and IVF throughput.
+
+Usage:
+    python scripts_trove/benchmark_vector_index.py --rows 200000 --dim 128 --lists 512
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models_trove.embeddings.vector_store import IVFIndex, VectorStore
+
+
+def clustered_data(rows, dim, clusters, rng):
+    """Gaussian blobs around random centres, roughly how document embeddings group by topic."""
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    return centres[labels] + 0.35 * rng.normal(size=(rows, dim)).astype(np.float32)
+
+
+def timed_search(store, queries, k, batch, **kwargs):
+    started = time.perf_counter()
+    results = []
+    for start in range(0, len(queries), batch):
+        results.extend(store.search(queries[start:start + batch], k=k, **kwargs))
+    return results, len(queries) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=512)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--batch", type=int, default=1, help="Queries per search call")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clustered_data(args.rows, args.dim, clusters=args.lists, rng=rng)
+    queries = data[rng.choice(args.rows, args.queries, replace=False)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+    documents = [""] * args.rows
+
+    store = VectorStore(dim=args.dim, index=IVFIndex(n_lists=args.lists))
+    started = time.perf_counter()
+    store.add(documents, embeddings=data)
+    print(f"Indexed {args.rows} x {args.dim} vectors into {args.lists} lists in {time.perf_counter() - started:.2f}s")
+
+    exact, exact_qps = timed_search(store, queries, args.k, args.batch, exact=True)
+    truth = [{hit.id for hit in hits} for hits in exact]
+    print(f"{'mode':<14}{'recall@' + str(args.k):>12}{'QPS':>12}")
+    print(f"{'exact':<14}{1.0:>12.3f}{exact_qps:>12.1f}")
+
+    for n_probe in args.probes:
+        approximate, qps = timed_search(store, queries, args.k, args.batch, n_probe=n_probe)
+        recall = np.mean([len(expected & {hit.id for hit in hits}) / args.k
+                          for expected, hits in zip(truth, approximate)])
+        print(f"{'ivf/' + str(n_probe):<14}{recall:>12.3f}{qps:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,20 @@
 import openai
-import json
 import os
 import sys
-import matplotlib.pyplot as plt
-from fpdf import FPDF
 from dotenv import load_dotenv
 
 # Add module paths
-base_dir = os.path.dirname(os.path.dirname(__file__))
-sys.path.append(os.path.join(base_dir, 'agents_trove'))
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(base_dir)
 sys.path.append(os.path.join(base_dir, 'tools_trove'))
 data_path = os.path.join(base_dir, 'data_trove', 'energy_data.json')
 
-from trove_agent import TroveAgent  # Import the TroveAgent class from agents_trove folder
-from efficiency_tool import calculate_efficiency  # Import efficiency tool from tools_trove folder
+from agents_trove.trove_agent import TroveAgent  # Import the TroveAgent class from agents_trove folder
+from efficiency_tool import calculate_efficiency, summarize_efficiency  # Import efficiency tools from tools_trove folder
+from energy_data_loader import load_energy_data  # Streaming, cached energy data loader from tools_trove folder
+from energy_rollups import EnergyRollups  # Incremental daily/weekly/monthly summaries from tools_trove folder
+from utils.chart_renderer import ChartRenderer, ChartSpec, Series  # Headless, cached chart rendering
+from utils.report_builder import ReportBuilder, ReportSection, ReportSpec  # Shared PDF report builder
 
 # Load environment variables from an .env file
 load_dotenv(os.path.join(base_dir, "env", ".env"))
@@ -41,38 +42,72 @@ class EnergyAssistant(TroveAgent):
                          autosave=True,
                          verbose=True)
 
+        self.chart_renderer = ChartRenderer(cache_dir=os.path.join(base_dir, "reports", "charts"))
+        self.report_builder = ReportBuilder(chart_cache_dir=self.chart_renderer.cache_dir)
+        self._new_readings = []  # readings recorded since the columns were last extended
+
         # Load historical energy data from a JSON file
         self.load_energy_data(data_path)
 
-        # Add a tool for calculating energy efficiency
-        self.add_tool("calculate_efficiency", calculate_efficiency)
+        # Add a tool for calculating energy efficiency (pure, so repeated calls are memoized)
+        self.add_tool("calculate_efficiency", calculate_efficiency, pure=True, timeout=10)
+        # Vectorized efficiency over the whole loaded dataset (rolling and per-period aggregates)
+        self.add_tool("efficiency_summary", self.efficiency_summary, timeout=60)
 
     def load_energy_data(self, file_path):
-        """Loads past energy data into the agent's long-term memory."""
+        """
+        Loads past energy data (JSON, JSON lines or CSV) into the agent's long-term memory.
+        Records are parsed incrementally into columns and cached as memory-mapped arrays,
+        so restarts on large histories skip parsing.
+        """
         if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                self.long_term_memory["energy_data"] = data
-                self.input_data_json = json.dumps(data, indent=4, ensure_ascii=False)  # Store JSON formatted data
-                self.input_data_table = data[:10]  # Store first 10 records for tabular format
-                print(f"Loaded {len(data)} energy records into memory.")
+            data = load_energy_data(file_path)
+            self.long_term_memory["energy_data"] = data
+            self.energy_rollups = EnergyRollups.from_data(data)  # Whole-history summaries for prompts
+            self.input_data_table = data[:10]  # Store first 10 records for tabular format
+            print(f"Loaded {len(data)} energy records into memory.")
         else:
             print(f"❌ ERROR: Energy data file not found at {file_path}! Please ensure 'energy_data.json' exists.")
             exit(1)
 
+    def record_reading(self, date, consumption, production):
+        """
+        Adds a new reading to the rollups in O(1) and returns an anomaly record if it was flagged.
+        The reading is also queued for the columnar data, which is extended in one batch the next
+        time the full history is read, so the tools and charts agree with the rollup-based prompts.
+        """
+        self._new_readings.append((date, consumption, production))
+        return self.energy_rollups.append(date, consumption, production)
+
+    def energy_data(self):
+        """Returns the columnar energy history, including readings recorded since it was loaded."""
+        data = self.long_term_memory.get("energy_data")
+        if data is not None and self._new_readings:
+            dates, consumption, production = zip(*self._new_readings)
+            data = self.long_term_memory["energy_data"] = data.extend(dates, consumption, production)
+            self._new_readings = []
+        return data
+
+    def efficiency_summary(self, window=7, period="month"):
+        """Summarizes efficiency across all loaded energy records in one vectorized pass."""
+        data = self.energy_data()
+        if data is None:
+            return "No historical energy data found."
+        return summarize_efficiency(data, window=window, period=period)
+
     def analyze_energy_trends(self):
         """Retrieves past energy data and requests insights from the LLM."""
         if "energy_data" not in self.long_term_memory:
             print("⚠️ No historical energy data found.")
             return "No historical energy data found."
 
-        # Retrieve last 25 records
-        recent_data = self.long_term_memory["energy_data"][-25:]
+        # Summarize the whole history (rollups and anomalies) instead of dumping raw records
+        summary = self.energy_rollups.format_prompt()
 
         # Format data as a prompt for LLM
         prompt = f"""
-        Here is the recent energy consumption data:
-        {recent_data}
+        Here is a summary of the energy consumption data:
+        {summary}
         Based on these patterns, suggest ways to improve energy efficiency.
         """
 
@@ -89,69 +124,44 @@ class EnergyAssistant(TroveAgent):
         return response.choices[0].message.content
 
     def execute_tool(self, tool_name, params):
-        """Executes the specified tool and returns the result."""
+        """Executes the specified tool through the agent's tool runtime and returns the result."""
         if tool_name in self.tools:
-            return self.tools[tool_name](**params)
+            return super().execute_tool(tool_name, params)
         return f"⚠️ Tool '{tool_name}' not found."
 
     def generate_visuals(self):
         """Generates detailed graphs and charts for the energy data."""
-        if "energy_data" not in self.long_term_memory:
+        data = self.energy_data()
+        if data is None:
             print("⚠️ No energy data available for visualization.")
             return None
 
-        data = self.long_term_memory["energy_data"]
-        dates = [entry["date"] for entry in data]
-        consumption = [entry["consumption"] for entry in data]
-        production = [entry["production"] for entry in data]
-
-        plt.figure(figsize=(12, 6))
-        plt.plot(dates, consumption, label='Energy Consumption (kWh)', marker='o', linestyle='-')
-        plt.plot(dates, production, label='Energy Production (kWh)', marker='s', linestyle='--')
-        plt.xlabel("Date")
-        plt.ylabel("Energy (kWh)")
-        plt.title("Energy Consumption vs. Production Trend")
-        plt.legend()
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig("energy_trend.png")
-        print("📊 Graph saved as 'energy_trend.png'")
+        spec = ChartSpec(
+            kind="line",
+            series=[Series(data.consumption, data.dates, label="Energy Consumption (kWh)", marker="o"),
+                    Series(data.production, data.dates, label="Energy Production (kWh)", marker="s", linestyle="--")],
+            title="Energy Consumption vs. Production Trend",
+            xlabel="Date",
+            ylabel="Energy (kWh)",
+            figsize=(12, 6),
+            rotate_xticks=45,
+        )
+        chart_path = self.chart_renderer.render(spec)  # cached: unchanged data is not re-rendered
+        print(f"📊 Graph saved as '{chart_path}'")
+        return chart_path
 
     def generate_pdf_report(self, report_text, efficiency_result, filename="energy_report.pdf"):
-        """Generates a highly detailed and elegant PDF report with a tabular representation of input data."""
-        self.generate_visuals()
-
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 18)
-        pdf.cell(200, 10, "Energy Consumption Report", ln=True, align="C")
-        pdf.ln(10)
-        
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(200, 10, "Energy Analysis & Insights", ln=True, align="C")
-        pdf.ln(5)
-        
-        pdf.set_font("Arial", "", 12)
-        pdf.multi_cell(0, 10, report_text)
-        pdf.ln(10)
-        
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(200, 10, "Efficiency Analysis", ln=True, align="C")
-        pdf.ln(5)
-        
-        pdf.set_font("Arial", "", 12)
-        pdf.multi_cell(0, 10, efficiency_result)
-        pdf.ln(10)
-        
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(200, 10, "Visual Analysis", ln=True, align="C")
-        pdf.ln(5)
-        
-        pdf.image("energy_trend.png", x=10, y=None, w=180)
-        
-        pdf.output(filename, dest='F')
+        """Generates a PDF report with the energy insights, efficiency analysis and trend chart."""
+        spec = ReportSpec(
+            title="Energy Consumption Report",
+            output_path=filename,
+            sections=[
+                ReportSection("Energy Analysis & Insights", text=report_text),
+                ReportSection("Efficiency Analysis", text=efficiency_result),
+                ReportSection("Visual Analysis", image=self.generate_visuals()),
+            ],
+        )
+        self.report_builder.build(spec)
         print(f"📄 Report saved as {filename}")
 
 if __name__ == "__main__":
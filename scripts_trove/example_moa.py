@@ -3,15 +3,16 @@ import sys
 import json
 import requests
 import logging
-import matplotlib.pyplot as plt
 from dotenv import load_dotenv
-from fpdf import FPDF
 
 # Ensure script runs from the root directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from agents_trove.trove_agent import TroveAgent
 from agents_trove.trove_agent_moa import TroveMOA
+from utils.chart_renderer import ChartSpec, Series
+from utils.report_builder import ReportBuilder, ReportSection, ReportSpec
+from utils.financial_data import create_client, key_metrics
 
 # Load API keys from environment variables
 load_dotenv(".env")
@@ -33,36 +34,30 @@ if not OPENAI_API_KEY:
 else:
     logging.info("✅ OpenAI API Key loaded successfully.")
 
-if not FMP_API_KEY:
+if not FMP_API_KEY and not os.getenv("FINANCIAL_DATA_FIXTURES"):
     logging.error("ERROR: Financial Modeling Prep (FMP) API key not found! Ensure it's set in .env file.")
     raise ValueError("ERROR: FMP API key not found!")
 else:
     logging.info("✅ Financial Modeling Prep API Key loaded successfully.")
 
-# Fetch Tesla financial data
+# Fetch Tesla financial data (cached on disk; set FINANCIAL_DATA_FIXTURES to run offline)
 company_name = "Tesla"
-api_url = f"https://financialmodelingprep.com/api/v3/income-statement/TSLA?apikey={FMP_API_KEY}"
+ticker = "TSLA"
 
 try:
     logging.info(f"🔍 Fetching financial data for {company_name}...")
-    response = requests.get(api_url, timeout=10)
-    response.raise_for_status()
-    financial_data = response.json()
+    latest_financials = create_client().latest_financials(ticker)
     logging.info("✅ Successfully retrieved financial data.")
-except requests.exceptions.RequestException as e:
+except (requests.exceptions.RequestException, OSError) as e:
     logging.error(f"❌ ERROR: Failed to fetch financial data - {str(e)}")
     raise ValueError(f"ERROR: Failed to fetch financial data - {str(e)}")
 
-if isinstance(financial_data, list) and len(financial_data) > 0:
-    latest_financials = financial_data[0]
-else:
-    raise ValueError("ERROR: No valid financial data found!")
-
 # Extract key financial metrics
-revenue = latest_financials.get("revenue", 0)
-net_profit = latest_financials.get("netIncome", 0)
-debt_equity_ratio = latest_financials.get("totalDebt", 0) / max(latest_financials.get("totalEquity", 1), 1)
-cash_flow = latest_financials.get("operatingCashFlow", 0)
+metrics = key_metrics(latest_financials)
+revenue = metrics["revenue"]
+net_profit = metrics["net_profit"]
+debt_equity_ratio = metrics["debt_equity_ratio"]
+cash_flow = metrics["cash_flow"]
 
 # Define Agents with proper output
 financial_agent = TroveAgent(
@@ -148,42 +143,31 @@ risk_output = risk_agent.run("Analyze Tesla's risk factors and mitigation strate
 strategy_output = strategy_agent.run("Evaluate Tesla's business strategy and future opportunities.")
 final_report = moa.run(f"Generate a comprehensive business analysis report for {company_name}.")
 
-# Data Visualization
+# Data Visualization and PDF Report
 categories = ["Revenue", "Net Profit", "Debt/Equity", "Cash Flow"]
 values = [revenue, net_profit, debt_equity_ratio, cash_flow]
+chart = ChartSpec(
+    kind="bar",
+    series=[Series(values, categories, color=["blue", "green", "red", "orange"])],
+    title=f"Financial Metrics for {company_name}",
+    xlabel="Metrics",
+    ylabel="Value (in USD Millions)",
+    grid=None,
+)
 
-plt.figure(figsize=(8, 5))
-plt.bar(categories, values, color=["blue", "green", "red", "orange"])
-plt.title(f"Financial Metrics for {company_name}")
-plt.xlabel("Metrics")
-plt.ylabel("Value (in USD Millions)")
-plt.savefig("reports/tesla_financial_chart.png")
-logging.info("📊 Financial data visualization saved.")
-
-# Generate and Save Report as PDF
 pdf_filename = f"reports/{company_name.replace(' ', '_').lower()}_moa_report.pdf"
-pdf = FPDF()
-pdf.add_page()
-pdf.set_font("Arial", "B", 16)
-pdf.cell(200, 10, f"{company_name} Business Analysis Report", ln=True, align="C")
-
-pdf.set_font("Arial", "B", 12)
-pdf.cell(0, 10, "Financial Analysis", ln=True)
-pdf.set_font("Arial", "", 12)
-pdf.multi_cell(0, 10, financial_output.encode("latin-1", "replace").decode("latin-1"))
-
-pdf.set_font("Arial", "B", 12)
-pdf.cell(0, 10, "Risk Assessment", ln=True)
-pdf.set_font("Arial", "", 12)
-pdf.multi_cell(0, 10, risk_output.encode("latin-1", "replace").decode("latin-1"))
-
-pdf.set_font("Arial", "B", 12)
-pdf.cell(0, 10, "Business Strategy Evaluation", ln=True)
-pdf.set_font("Arial", "", 12)
-pdf.multi_cell(0, 10, strategy_output.encode("latin-1", "replace").decode("latin-1"))
-
-pdf.image("reports/tesla_financial_chart.png", x=10, y=pdf.get_y() + 10, w=170)
-pdf.output(pdf_filename)
+report = ReportSpec(
+    title=f"{company_name} Business Analysis Report",
+    output_path=pdf_filename,
+    center_headings=False,
+    image_width=170,
+    sections=[
+        ReportSection("Financial Analysis", text=financial_output),
+        ReportSection("Risk Assessment", text=risk_output),
+        ReportSection("Business Strategy Evaluation", text=strategy_output, chart=chart),
+    ],
+)
+ReportBuilder(chart_cache_dir=os.path.join("reports", "charts")).build(report)
 
 logging.info(f"✅ Final report saved: {pdf_filename}")
 print(f"📄 Final Report saved as PDF: {pdf_filename}")
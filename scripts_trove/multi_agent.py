@@ -1,11 +1,14 @@
 import os
+import sys
 import json
 import logging
 import requests
 from dotenv import load_dotenv
-from fpdf import FPDF
-from fpdf.enums import XPos, YPos
-import matplotlib.pyplot as plt
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.chart_renderer import ChartRenderer, ChartSpec, Series  # Headless, cached chart rendering
+from utils.report_builder import ReportBuilder, ReportSection, ReportSpec  # Shared PDF report builder
+from utils.financial_data import create_client, key_metrics  # Cached, pooled financial data fetcher
 
 # Load API keys from .env file
 load_dotenv()
@@ -22,42 +25,37 @@ if not OPENAI_API_KEY:
     logging.error("ERROR: OpenAI API Key not found! Ensure it is set in env/.env")
     exit(1)
 
-if not FMP_API_KEY:
+if not FMP_API_KEY and not os.getenv("FINANCIAL_DATA_FIXTURES"):
     logging.error("ERROR: Financial Modeling Prep API Key not found! Ensure it is set in env/.env")
     exit(1)
 
 logging.info("OpenAI API Key loaded successfully.")
-logging.info("Financial Modeling Prep API Key loaded successfully.")
 
 # Ensure reports directory exists
 os.makedirs("reports", exist_ok=True)
+chart_renderer = ChartRenderer(cache_dir=os.path.join("reports", "charts"))
+report_builder = ReportBuilder(chart_cache_dir=chart_renderer.cache_dir)
 
-# Fetch financial data from FMP API
+# Fetch financial data (cached on disk; set FINANCIAL_DATA_FIXTURES to run offline)
 company_name = "Tesla"
-api_url = f"https://financialmodelingprep.com/api/v3/income-statement/TSLA?apikey={FMP_API_KEY}"
+ticker = "TSLA"
 
 logging.info(f"Fetching financial data for {company_name}...")
 
 try:
-    response = requests.get(api_url, timeout=10)
-    response.raise_for_status()
-    financial_data = response.json()
+    financial_client = create_client()
+    latest_financials = financial_client.latest_financials(ticker)
     logging.info("Successfully retrieved financial data.")
-except requests.exceptions.RequestException as e:
+except (requests.exceptions.RequestException, OSError, ValueError) as e:
     logging.error(f"ERROR: Failed to fetch financial data - {str(e)}")
     exit(1)
 
 # Extract key financial metrics
-if isinstance(financial_data, list) and len(financial_data) > 0:
-    latest_financials = financial_data[0]
-else:
-    logging.error("ERROR: No valid financial data found!")
-    exit(1)
-
-revenue = latest_financials.get("revenue", 0)
-net_profit = latest_financials.get("netIncome", 0)
-debt_equity_ratio = latest_financials.get("totalDebt", 0) / max(latest_financials.get("totalEquity", 1), 1)
-cash_flow = latest_financials.get("operatingCashFlow", 0)
+metrics = key_metrics(latest_financials)
+revenue = metrics["revenue"]
+net_profit = metrics["net_profit"]
+debt_equity_ratio = metrics["debt_equity_ratio"]
+cash_flow = metrics["cash_flow"]
 
 
 # --------------- MOA Implementation --------------- #
@@ -137,45 +135,36 @@ def generate_financial_chart():
     categories = ["Revenue", "Net Profit", "Debt/Equity", "Cash Flow"]
     values = [revenue, net_profit, debt_equity_ratio, cash_flow]
 
-    plt.figure(figsize=(8, 5))
-    plt.bar(categories, values, color=["blue", "green", "red", "orange"])
-    plt.xlabel("Metrics")
-    plt.ylabel("Value (in USD Millions)")
-    plt.title(f"Financial Metrics for {company_name}")
-    plt.grid(axis="y", linestyle="--")
-    plt.savefig("reports/tesla_financial_chart.png")
-    logging.info("Financial trend chart saved as 'reports/tesla_financial_chart.png'")
+    spec = ChartSpec(
+        kind="bar",
+        series=[Series(values, categories, color=["blue", "green", "red", "orange"])],
+        title=f"Financial Metrics for {company_name}",
+        xlabel="Metrics",
+        ylabel="Value (in USD Millions)",
+        grid="y",
+    )
+    chart_path = chart_renderer.render(spec)
+    logging.info(f"Financial trend chart saved as '{chart_path}'")
+    return chart_path
 
 
 def generate_pdf_report(report_text, filename="reports/tesla_financial_report.pdf"):
     """Generates a detailed PDF report."""
-    generate_financial_chart()
-    
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-
-    pdf.set_font("Helvetica", "", 14)
-
-    pdf.cell(200, 10, f"{company_name} Financial Analysis Report", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-    pdf.ln(10)
-
-    pdf.multi_cell(0, 10, report_text)
-    pdf.ln(10)
-
-    pdf.cell(200, 10, "Key Financial Metrics", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-    pdf.ln(5)
-
-    pdf.multi_cell(0, 10, f"Revenue: ${revenue:,}\nNet Profit: ${net_profit:,}\nDebt-to-Equity Ratio: {debt_equity_ratio:.2f}\nCash Flow: ${cash_flow:,}")
-    pdf.ln(10)
-
-    pdf.cell(200, 10, "Financial Trends Chart", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-    pdf.ln(5)
-
-    pdf.image("reports/tesla_financial_chart.png", x=10, y=None, w=180)
-
-    pdf.output(filename, dest='F')
-    logging.info(f"Financial report saved as {filename}")
+    spec = ReportSpec(
+        title=f"{company_name} Financial Analysis Report",
+        output_path=filename,
+        sections=[
+            ReportSection(text=report_text),
+            ReportSection("Key Financial Metrics", metrics={
+                "Revenue": f"${revenue:,}",
+                "Net Profit": f"${net_profit:,}",
+                "Debt-to-Equity Ratio": f"{debt_equity_ratio:.2f}",
+                "Cash Flow": f"${cash_flow:,}",
+            }),
+            ReportSection("Financial Trends Chart", image=generate_financial_chart()),
+        ],
+    )
+    report_builder.build(spec)
 
 
 # Execute Report Generation
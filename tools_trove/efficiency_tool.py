@@ -1,13 +1,171 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+# Periods supported by period_efficiency
+_PERIODS = ("day", "week", "month", "year")
+
+
 def calculate_efficiency(consumption: float, production: float) -> str:
     """
     Calculates energy efficiency as a percentage.
-    
+
     :param consumption: The amount of energy consumed.
     :param production: The total energy available or generated.
     :return: A formatted string with the efficiency percentage.
     """
     if production == 0:
         return "Error: Production value cannot be zero."
-    
+
     efficiency = (consumption / production) * 100
     return f"Energy efficiency is {efficiency:.2f}%."
+
+
+def to_columns(data: Union[List[Dict[str, Any]], Dict[str, Any], Any]) -> Tuple[np.ndarray, np.ndarray,
+                                                                              Optional[np.ndarray]]:
+    """
+    Converts energy data to (consumption, production, dates) arrays.
+
+    :param data: A list of records like {"date": ..., "consumption": ..., "production": ...}
+                 (the energy_data.json layout), a dict of columns with the same keys, or
+                 EnergyColumns from energy_data_loader.
+    :return: float64 consumption and production arrays and a datetime64[D] date array (None without dates).
+    """
+    if hasattr(data, "columns"):
+        data = data.columns()
+    if isinstance(data, dict):
+        consumption, production, dates = data["consumption"], data["production"], data.get("date")
+    else:
+        consumption = [record["consumption"] for record in data]
+        production = [record["production"] for record in data]
+        dates = [record["date"] for record in data] if data and "date" in data[0] else None
+    return (np.asarray(consumption, dtype=np.float64),
+            np.asarray(production, dtype=np.float64),
+            None if dates is None else np.asarray(dates, dtype="datetime64[D]"))
+
+
+def _ratio(consumption: np.ndarray, production: np.ndarray) -> np.ma.MaskedArray:
+    """consumption / production * 100, masked where production is zero or either value is not finite."""
+    invalid = (production == 0) | ~np.isfinite(production) | ~np.isfinite(consumption)
+    safe = np.where(invalid, 1.0, production)
+    return np.ma.masked_array(consumption / safe * 100, mask=invalid)
+
+
+def calculate_efficiency_batch(consumption: ArrayLike, production: ArrayLike) -> np.ma.MaskedArray:
+    """
+    Calculates efficiency percentages for whole arrays of readings at once.
+
+    :param consumption: Energy consumed per reading.
+    :param production: Energy produced per reading.
+    :return: Masked float64 array of efficiencies; rows with zero (or missing) production are masked
+             instead of raising, so they drop out of means and other aggregates.
+    """
+    consumption = np.asarray(consumption, dtype=np.float64)
+    production = np.asarray(production, dtype=np.float64)
+    if consumption.shape != production.shape:
+        raise ValueError(f"consumption and production shapes differ: {consumption.shape} vs {production.shape}")
+    return _ratio(consumption, production)
+
+
+def rolling_efficiency(consumption: ArrayLike, production: ArrayLike, window: int) -> np.ma.MaskedArray:
+    """
+    Efficiency over a trailing window of readings: total consumption over total production,
+    computed in O(n) with cumulative sums. The first window - 1 positions are masked.
+
+    :param consumption: Energy consumed per reading.
+    :param production: Energy produced per reading.
+    :param window: Number of readings per window.
+    :return: Masked float64 array aligned with the inputs.
+    """
+    if window < 1:
+        raise ValueError("window must be >= 1")
+    consumption = np.nan_to_num(np.asarray(consumption, dtype=np.float64))
+    production = np.nan_to_num(np.asarray(production, dtype=np.float64))
+    totals = []
+    for values in (consumption, production):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        windowed = np.full(values.shape, np.nan)
+        windowed[window - 1:] = cumulative[window:] - cumulative[:-window]
+        totals.append(windowed)
+    result = _ratio(*totals)
+    result[:window - 1] = np.ma.masked
+    return result
+
+
+def period_keys(dates: ArrayLike, period: str) -> np.ndarray:
+    """Maps dates to the start of their day, week (Monday), month or year as datetime64 keys."""
+    days = np.asarray(dates).astype("datetime64[D]")
+    if period == "day":
+        return days
+    if period == "week":  # weeks start on Monday; 1970-01-01 was a Thursday
+        offsets = days.astype(np.int64)
+        return (offsets - (offsets + 3) % 7).astype("datetime64[D]")
+    if period == "month":
+        return days.astype("datetime64[M]")
+    if period == "year":
+        return days.astype("datetime64[Y]")
+    raise ValueError(f"Unknown period '{period}'. Expected one of {_PERIODS}.")
+
+
+def period_efficiency(dates: ArrayLike, consumption: ArrayLike, production: ArrayLike,
+                      period: str = "month") -> Dict[str, np.ndarray]:
+    """
+    Aggregates readings per day, week (starting Monday), month or year.
+
+    :param dates: Reading dates (ISO strings or datetime64).
+    :param consumption: Energy consumed per reading.
+    :param production: Energy produced per reading.
+    :param period: "day", "week", "month" or "year".
+    :return: Dict with "period" (datetime64 keys, sorted), "readings", "consumption" and "production"
+             totals, and masked "efficiency" (total consumption over total production) per period.
+    """
+    keys = period_keys(dates, period)
+    consumption = np.nan_to_num(np.asarray(consumption, dtype=np.float64))
+    production = np.nan_to_num(np.asarray(production, dtype=np.float64))
+    periods, inverse = np.unique(keys, return_inverse=True)
+    consumed = np.bincount(inverse, weights=consumption, minlength=len(periods))
+    produced = np.bincount(inverse, weights=production, minlength=len(periods))
+    return {
+        "period": periods,
+        "readings": np.bincount(inverse, minlength=len(periods)),
+        "consumption": consumed,
+        "production": produced,
+        "efficiency": _ratio(consumed, produced),
+    }
+
+
+def summarize_efficiency(data: Union[List[Dict[str, Any]], Dict[str, Any]],
+                         window: Optional[int] = 7,
+                         period: Optional[str] = "month",
+                         max_periods: int = 12) -> str:
+    """
+    Efficiency summary of a whole dataset, formatted for an LLM prompt or report.
+    Registered as a tool so an agent can cover millions of readings in one call.
+
+    :param data: Energy records or columns (see to_columns).
+    :param window: Trailing window, in readings, for the latest rolling efficiency (None to skip).
+    :param period: Aggregation period for the per-period table (None to skip).
+    :param max_periods: Most recent periods listed in the table.
+    :return: A short multi-line summary.
+    """
+    consumption, production, dates = to_columns(data)
+    efficiency = calculate_efficiency_batch(consumption, production)
+    valid = efficiency.count()
+    lines = [f"Readings: {len(efficiency)} ({len(efficiency) - valid} without production skipped)"]
+    if valid:
+        rows = ~np.ma.getmaskarray(efficiency)
+        overall = consumption[rows].sum() / production[rows].sum() * 100
+        lines.append(f"Overall efficiency: {overall:.2f}% | mean {efficiency.mean():.2f}% | "
+                     f"min {efficiency.min():.2f}% | max {efficiency.max():.2f}%")
+    if window and len(efficiency) >= window:
+        latest = rolling_efficiency(consumption, production, window)[-1]
+        if latest is not np.ma.masked:
+            lines.append(f"Latest {window}-reading efficiency: {latest:.2f}%")
+    if period and dates is not None:
+        table = period_efficiency(dates, consumption, production, period)
+        lines.append(f"Per {period}:")
+        for key, readings, value in list(zip(table["period"], table["readings"], table["efficiency"]))[-max_periods:]:
+            shown = "n/a" if value is np.ma.masked else f"{value:.2f}%"
+            lines.append(f"  {key}: {shown} over {readings} readings")
+    return "\n".join(lines)
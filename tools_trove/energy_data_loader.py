@@ -0,0 +1,255 @@
+import os
+import re
+import csv
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Union
+import numpy as np
+
+FORMATS = ("json", "jsonl", "csv")
+_EXTENSIONS = {".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+_SEPARATORS = re.compile(r"[\s,]*")
+_CACHE_VERSION = 1
+
+
+class EnergyColumns:
+    """
+    Energy readings stored column-wise: dates as datetime64, consumption and production as float64.
+    Uses a fraction of the memory of a list of dicts and can be backed by memory-mapped files.
+    Indexing and slicing return plain records, so code written against the JSON list
+    (e.g. data[-25:] or [entry["date"] for entry in data]) keeps working.
+    """
+
+    __slots__ = ("dates", "consumption", "production")
+
+    def __init__(self, dates: np.ndarray, consumption: np.ndarray, production: np.ndarray):
+        if not len(dates) == len(consumption) == len(production):
+            raise ValueError("EnergyColumns needs columns of equal length.")
+        self.dates = dates
+        self.consumption = consumption
+        self.production = production
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _record(self, index: int) -> Dict[str, Any]:
+        return {"date": str(self.dates[index]),
+                "consumption": self.consumption[index].item(),
+                "production": self.production[index].item()}
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self._record(position) for position in range(*index.indices(len(self)))]
+        return self._record(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self._record(index) for index in range(len(self)))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Returns the columns keyed like the record fields (the layout efficiency_tool.to_columns accepts)."""
+        return {"date": self.dates, "consumption": self.consumption, "production": self.production}
+
+    def extend(self, dates: List[Any], consumption: List[Any], production: List[Any]) -> "EnergyColumns":
+        """
+        Returns new columns with readings appended. The current arrays may be memory-mapped
+        and read-only, so they are never grown in place; batch readings to amortize the copy.
+        """
+        return EnergyColumns(np.concatenate([self.dates, np.array(dates, dtype="datetime64").astype(self.dates.dtype)]),
+                             np.concatenate([self.consumption, _numbers(consumption)]),
+                             np.concatenate([self.production, _numbers(production)]))
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.consumption.nbytes + self.production.nbytes
+
+    def __repr__(self) -> str:
+        span = f"{self.dates[0]} .. {self.dates[-1]}" if len(self) else "empty"
+        return f"EnergyColumns({len(self)} readings, {span})"
+
+
+def iter_json_records(path: str, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the records of a top-level JSON array one at a time, reading the file in chunks,
+    so memory use is bounded by the chunk size rather than the file size.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = file.read(chunk_size)
+        position = _SEPARATORS.match(buffer).end()
+        if not buffer.startswith("[", position):
+            raise ValueError(f"{path} does not contain a JSON array")
+        position += 1
+
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                more = file.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{path} ended before the JSON array was closed")
+                buffer, position = more, 0
+                continue
+            if buffer[position] == "]":
+                return
+
+            # Fast path: decode every complete record in the buffer with one C-level json.loads
+            end = buffer.rfind("}")
+            if end > position:
+                try:
+                    records = json.loads(f"[{buffer[position:end + 1]}]")
+                except json.JSONDecodeError:
+                    pass  # the cut fell inside a record (nested object or "}" in a string)
+                else:
+                    yield from records
+                    buffer, position = buffer[end + 1:], 0
+                    continue
+
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                more = file.read(chunk_size)
+                if not more:
+                    raise
+                buffer, position = buffer[position:] + more, 0
+                continue
+            yield record
+
+
+def iter_jsonl_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the records of a JSON-lines file, skipping blank lines."""
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_csv_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the rows of a CSV file with a date,consumption,production header."""
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        yield from csv.DictReader(file)
+
+
+_READERS = {"json": iter_json_records, "jsonl": iter_jsonl_records, "csv": iter_csv_records}
+
+
+def _numbers(values: List[Any]) -> np.ndarray:
+    """Converts readings (numbers, numeric strings from CSV, None or "") to float64 with NaN for missing."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([np.nan if value is None or value == "" else float(value) for value in values],
+                        dtype=np.float64)
+
+
+def build_columns(records: Iterator[Dict[str, Any]],
+                  chunk_rows: int = 65536,
+                  date_unit: str = "D") -> EnergyColumns:
+    """
+    Converts a stream of records to EnergyColumns, a chunk of rows at a time.
+    Missing or empty readings become NaN.
+
+    :param records: Records with "date", "consumption" and "production" fields.
+    :param chunk_rows: Rows parsed per vectorized conversion step.
+    :param date_unit: datetime64 unit of the date column ("D" for daily data, "s" for meter timestamps).
+    """
+    dates, consumption, production = [], [], []
+    chunks = {"dates": [], "consumption": [], "production": []}
+
+    def flush():
+        chunks["dates"].append(np.array(dates, dtype="datetime64").astype(f"datetime64[{date_unit}]"))
+        chunks["consumption"].append(_numbers(consumption))
+        chunks["production"].append(_numbers(production))
+        dates.clear()
+        consumption.clear()
+        production.clear()
+
+    for record in records:
+        dates.append(record["date"])
+        consumption.append(record.get("consumption"))
+        production.append(record.get("production"))
+        if len(dates) >= chunk_rows:
+            flush()
+    if dates or not chunks["dates"]:
+        flush()
+    return EnergyColumns(*(np.concatenate(chunks[name]) for name in ("dates", "consumption", "production")))
+
+
+def _cache_path(path: str, cache_dir: str, date_unit: str) -> str:
+    """Cache directory for a source file, keyed by its path, size, mtime and the loader settings."""
+    stat = os.stat(path)
+    source = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    version = hashlib.sha1(f"{stat.st_size}|{stat.st_mtime_ns}|{date_unit}|{_CACHE_VERSION}".encode("utf-8"))
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{source}.{version.hexdigest()[:12]}")
+
+
+def _write_cache(target: str, data: EnergyColumns):
+    """Writes the columns as .npy files into a temporary directory and renames it into place."""
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+    try:
+        for name, column in (("dates", data.dates), ("consumption", data.consumption),
+                             ("production", data.production)):
+            np.save(os.path.join(staging, f"{name}.npy"), column)
+        os.replace(staging, target)
+    except OSError as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(target):  # another process may have won the race
+            logging.warning(f"Could not cache energy data at {target}: {e}")
+        return
+
+    # Drop caches of earlier versions of the same source file (same name and source digest)
+    prefix = os.path.basename(target).rsplit(".", 1)[0] + "."
+    for entry in os.listdir(parent):
+        stale = os.path.join(parent, entry)
+        if entry.startswith(prefix) and stale != target and os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def _read_cache(target: str) -> Optional[EnergyColumns]:
+    try:
+        return EnergyColumns(*(np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r")
+                               for name in ("dates", "consumption", "production")))
+    except (OSError, ValueError):
+        return None
+
+
+def load_energy_data(path: str,
+                     fmt: Optional[str] = None,
+                     cache: bool = True,
+                     cache_dir: Optional[str] = None,
+                     chunk_rows: int = 65536,
+                     date_unit: str = "D") -> EnergyColumns:
+    """
+    Loads energy readings from JSON (an array of records), JSON lines or CSV into EnergyColumns,
+    parsing incrementally. With caching on, the parsed columns are saved as .npy files next to the
+    data and later loads memory-map them instead of parsing, until the source file changes.
+
+    :param path: Data file.
+    :param fmt: "json", "jsonl" or "csv" (inferred from the extension if omitted).
+    :param cache: Read and write the memory-mapped column cache.
+    :param cache_dir: Cache location (defaults to a .cache directory beside the data file).
+    :param chunk_rows: Rows converted per vectorized step while parsing.
+    :param date_unit: datetime64 unit of the date column.
+    :return: The readings as EnergyColumns (read-only, memory-mapped when served from the cache).
+    """
+    fmt = fmt or _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown energy data format for {path}. Expected one of {FORMATS}.")
+
+    target = None
+    if cache:
+        target = _cache_path(path, cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), ".cache"),
+                             date_unit)
+        cached = _read_cache(target) if os.path.isdir(target) else None
+        if cached is not None:
+            logging.info(f"Loaded {len(cached)} energy readings from cache {target}")
+            return cached
+
+    data = build_columns(_READERS[fmt](path), chunk_rows=chunk_rows, date_unit=date_unit)
+    logging.info(f"Parsed {len(data)} energy readings from {path} ({data.nbytes} bytes as columns)")
+    if target is not None:
+        _write_cache(target, data)
+    return data
@@ -0,0 +1,264 @@
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from tools_trove.efficiency_tool import period_keys, to_columns
+
+PERIODS = ("day", "week", "month")
+_LABELS = {"day": "Daily", "week": "Weekly", "month": "Monthly", "year": "Yearly"}
+
+
+class RollupBucket:
+    """Running totals of the readings in one period."""
+
+    __slots__ = ("count", "consumption_sum", "consumption_min", "consumption_max",
+                 "production_sum", "production_min", "production_max")
+
+    def __init__(self):
+        self.count = 0
+        self.consumption_sum = self.production_sum = 0.0
+        self.consumption_min = self.production_min = math.inf
+        self.consumption_max = self.production_max = -math.inf
+
+    def add(self, consumption: float, production: float):
+        self.count += 1
+        self.consumption_sum += consumption
+        self.production_sum += production
+        self.consumption_min = min(self.consumption_min, consumption)
+        self.consumption_max = max(self.consumption_max, consumption)
+        self.production_min = min(self.production_min, production)
+        self.production_max = max(self.production_max, production)
+
+    def merge(self, count: int, consumption: Tuple[float, float, float], production: Tuple[float, float, float]):
+        """Folds in pre-aggregated (sum, min, max) totals for `count` readings."""
+        self.count += count
+        self.consumption_sum += consumption[0]
+        self.consumption_min = min(self.consumption_min, consumption[1])
+        self.consumption_max = max(self.consumption_max, consumption[2])
+        self.production_sum += production[0]
+        self.production_min = min(self.production_min, production[1])
+        self.production_max = max(self.production_max, production[2])
+
+    @property
+    def efficiency(self) -> Optional[float]:
+        """Total consumption over total production, in percent (None without production)."""
+        return self.consumption_sum / self.production_sum * 100 if self.production_sum else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "readings": self.count,
+            "consumption": {"sum": self.consumption_sum, "mean": self.consumption_sum / self.count,
+                            "min": self.consumption_min, "max": self.consumption_max},
+            "production": {"sum": self.production_sum, "mean": self.production_sum / self.count,
+                           "min": self.production_min, "max": self.production_max},
+            "efficiency": self.efficiency,
+        }
+
+
+class EnergyRollups:
+    """
+    EnergyRollups: incremental daily, weekly and monthly summaries of energy readings.
+    Each appended reading updates its period buckets and a trailing window used to flag
+    consumption anomalies in O(1), so the whole history can be summarized for a prompt
+    without re-reading it. Existing datasets are loaded with vectorized bulk aggregation.
+    """
+
+    def __init__(self,
+                 periods: Sequence[str] = PERIODS,
+                 anomaly_window: int = 30,
+                 anomaly_z: float = 3.0,
+                 min_history: int = 7,
+                 max_anomalies: int = 100):
+        """
+        :param periods: Rollup periods to keep ("day", "week", "month", "year").
+        :param anomaly_window: Trailing readings a new reading is compared against.
+        :param anomaly_z: Standard deviations from the trailing mean that count as an anomaly.
+        :param min_history: Readings needed in the window before anomalies are flagged.
+        :param max_anomalies: Most recent anomalies kept.
+        """
+        self.periods = tuple(periods)
+        self.anomaly_window = anomaly_window
+        self.anomaly_z = anomaly_z
+        self.min_history = min_history
+        self.buckets: Dict[str, Dict[np.datetime64, RollupBucket]] = {period: {} for period in self.periods}
+        self.anomalies: Deque[Dict[str, Any]] = deque(maxlen=max_anomalies)
+        self.total = RollupBucket()
+        self.first_date: Optional[np.datetime64] = None
+        self.last_date: Optional[np.datetime64] = None
+        self._window: Deque[float] = deque(maxlen=anomaly_window)
+        self._window_sum = 0.0
+        self._window_sumsq = 0.0
+
+    @classmethod
+    def from_data(cls, data: Any, **kwargs) -> "EnergyRollups":
+        """Builds rollups from records, a dict of columns or EnergyColumns."""
+        rollups = cls(**kwargs)
+        consumption, production, dates = to_columns(data)
+        if dates is None:
+            raise ValueError("Energy rollups need dated readings.")
+        rollups.extend_columns(dates, consumption, production)
+        return rollups
+
+    def _track(self, date: np.datetime64):
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+
+    def _check_anomaly(self, date: np.datetime64, consumption: float) -> Optional[Dict[str, Any]]:
+        """Compares a reading with the trailing window, then slides the window forward."""
+        anomaly = None
+        count = len(self._window)
+        if count >= self.min_history:
+            mean = self._window_sum / count
+            deviation = math.sqrt(max(self._window_sumsq / count - mean * mean, 0.0))
+            if deviation > 0 and abs(consumption - mean) > self.anomaly_z * deviation:
+                anomaly = {"date": str(date), "consumption": consumption, "expected": mean,
+                           "z": (consumption - mean) / deviation}
+                self.anomalies.append(anomaly)
+
+        if count == self.anomaly_window:
+            oldest = self._window[0]
+            self._window_sum -= oldest
+            self._window_sumsq -= oldest * oldest
+        self._window.append(consumption)
+        self._window_sum += consumption
+        self._window_sumsq += consumption * consumption
+        return anomaly
+
+    def append(self, date: Any, consumption: float, production: float) -> Optional[Dict[str, Any]]:
+        """
+        Adds one reading in O(1). Readings with a missing value are ignored.
+
+        :return: The anomaly record if the reading was flagged, else None.
+        """
+        consumption, production = float(consumption), float(production)
+        if not (math.isfinite(consumption) and math.isfinite(production)):
+            return None
+        day = np.datetime64(date, "D")
+        for period in self.periods:
+            key = period_keys(day, period)[()]
+            bucket = self.buckets[period].get(key)
+            if bucket is None:
+                bucket = self.buckets[period][key] = RollupBucket()
+            bucket.add(consumption, production)
+        self.total.add(consumption, production)
+        self._track(day)
+        return self._check_anomaly(day, consumption)
+
+    def extend(self, records: Iterable[Dict[str, Any]]):
+        """Adds records like {"date": ..., "consumption": ..., "production": ...} one at a time."""
+        for record in records:
+            self.append(record["date"], record["consumption"], record["production"])
+
+    def extend_columns(self, dates: np.ndarray, consumption: np.ndarray, production: np.ndarray):
+        """
+        Adds many readings at once with vectorized aggregation. Equivalent to appending them in order.
+        """
+        dates = np.asarray(dates).astype("datetime64[D]")
+        consumption = np.asarray(consumption, dtype=np.float64)
+        production = np.asarray(production, dtype=np.float64)
+        valid = np.isfinite(consumption) & np.isfinite(production)
+        dates, consumption, production = dates[valid], consumption[valid], production[valid]
+        if not len(dates):
+            return
+
+        for period in self.periods:
+            keys, inverse = np.unique(period_keys(dates, period), return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(keys))
+            aggregates = []
+            for values in (consumption, production):
+                minimum = np.full(len(keys), np.inf)
+                maximum = np.full(len(keys), -np.inf)
+                np.minimum.at(minimum, inverse, values)
+                np.maximum.at(maximum, inverse, values)
+                aggregates.append((np.bincount(inverse, weights=values, minlength=len(keys)), minimum, maximum))
+            buckets = self.buckets[period]
+            (c_sum, c_min, c_max), (p_sum, p_min, p_max) = aggregates
+            for index, key in enumerate(keys):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = RollupBucket()
+                bucket.merge(int(counts[index]), (c_sum[index], c_min[index], c_max[index]),
+                             (p_sum[index], p_min[index], p_max[index]))
+
+        self.total.merge(len(dates), (consumption.sum(), consumption.min(), consumption.max()),
+                         (production.sum(), production.min(), production.max()))
+        self._track(dates.min())
+        self._track(dates.max())
+        self._bulk_anomalies(dates, consumption)
+
+    def _bulk_anomalies(self, dates: np.ndarray, consumption: np.ndarray):
+        """Vectorized trailing-window z-scores, continuing from the current window."""
+        history = np.fromiter(self._window, dtype=np.float64, count=len(self._window))
+        values = np.concatenate((history, consumption))
+        window = self.anomaly_window
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        cumulative_sq = np.concatenate(([0.0], np.cumsum(values * values)))
+        positions = np.arange(len(history), len(values))
+        starts = np.maximum(positions - window, 0)
+        counts = positions - starts
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (cumulative[positions] - cumulative[starts]) / counts
+            variances = (cumulative_sq[positions] - cumulative_sq[starts]) / counts - means * means
+            deviations = np.sqrt(np.maximum(variances, 0.0))
+            z = (consumption - means) / deviations
+        flagged = np.flatnonzero((counts >= self.min_history) & (deviations > 0) & (np.abs(z) > self.anomaly_z))
+        for index in flagged[-self.anomalies.maxlen:] if self.anomalies.maxlen else flagged:
+            self.anomalies.append({"date": str(dates[index]), "consumption": float(consumption[index]),
+                                   "expected": float(means[index]), "z": float(z[index])})
+
+        tail = values[-window:]
+        self._window = deque(tail.tolist(), maxlen=window)
+        self._window_sum = float(tail.sum())
+        self._window_sumsq = float((tail * tail).sum())
+
+    def summary(self, period: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns the buckets of a period, oldest first, optionally only the most recent `last`."""
+        keys = sorted(self.buckets[period])
+        if last is not None:
+            keys = keys[-last:] if last > 0 else []
+        return [dict(self.buckets[period][key].to_dict(), period=str(key)) for key in keys]
+
+    def format_prompt(self,
+                      last: Optional[Dict[str, int]] = None,
+                      max_anomalies: int = 10) -> str:
+        """
+        Formats the rollups as a compact text block for an LLM prompt, covering the whole
+        history in a size that doesn't grow with the number of readings.
+
+        :param last: Most recent buckets shown per period (default: 12 months, 4 weeks, 7 days).
+        :param max_anomalies: Most recent anomalies listed.
+        """
+        if not self.total.count:
+            return "No energy readings available."
+        last = last or {"year": 10, "month": 12, "week": 4, "day": 7}
+        total = self.total
+        lines = [f"Energy history: {total.count} readings from {self.first_date} to {self.last_date}. "
+                 f"Consumption {total.consumption_sum:.0f} kWh total, {total.consumption_sum / total.count:.1f} mean "
+                 f"({total.consumption_min:g}-{total.consumption_max:g}); production {total.production_sum:.0f} kWh; "
+                 f"efficiency {_percent(total.efficiency)}."]
+
+        for period in sorted(self.periods, key=lambda name: ("year", "month", "week", "day").index(name)):
+            rows = self.summary(period, last.get(period, 0))
+            if not rows:
+                continue
+            lines.append(f"{_LABELS[period]} (period: readings, consumption sum/mean/min/max, "
+                         f"production sum, efficiency):")
+            for row in rows:
+                consumption = row["consumption"]
+                lines.append(f"{row['period']}: {row['readings']}, {consumption['sum']:.0f}/{consumption['mean']:.1f}/"
+                             f"{consumption['min']:g}/{consumption['max']:g}, {row['production']['sum']:.0f}, "
+                             f"{_percent(row['efficiency'])}")
+
+        anomalies = list(self.anomalies)[-max_anomalies:] if max_anomalies > 0 else []
+        if anomalies:
+            lines.append(f"Consumption anomalies (|z| > {self.anomaly_z:g} vs. trailing {self.anomaly_window} readings):")
+            lines.extend(f"{anomaly['date']}: {anomaly['consumption']:g} vs. {anomaly['expected']:.1f} expected "
+                         f"(z={anomaly['z']:+.1f})" for anomaly in anomalies)
+        return "\n".join(lines)
+
+
+def _percent(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:.1f}%"
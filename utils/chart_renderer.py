@@ -0,0 +1,232 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Bump when drawing changes so cached PNGs from older code are not reused
+RENDERER_VERSION = 1
+
+
+@dataclass
+class Series:
+    """One plotted series. x may be numbers, dates (datetime64 or ISO strings) or categories."""
+    y: Sequence[float]
+    x: Optional[Sequence[Any]] = None
+    label: Optional[str] = None
+    color: Optional[Union[str, List[str]]] = None  # a list gives per-bar colors
+    marker: Optional[str] = None
+    linestyle: str = "-"
+
+
+@dataclass
+class ChartSpec:
+    """
+    Everything needed to draw a chart. Identical specs produce identical PNGs,
+    so a spec's hash is its cache key.
+    """
+    kind: str  # "line" or "bar"
+    series: List[Series]
+    title: str = ""
+    xlabel: str = ""
+    ylabel: str = ""
+    figsize: Tuple[float, float] = (8, 5)
+    dpi: int = 100
+    grid: Optional[str] = "both"  # "x", "y", "both" or None
+    legend: bool = True
+    rotate_xticks: int = 0
+    max_points: int = 2000  # line series longer than this are downsampled with LTTB
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of `threshold` points
+    that preserve the visual shape of the series (peaks and troughs are kept).
+
+    :param x: Numeric x values, increasing.
+    :param y: y values.
+    :param threshold: Number of points to keep (>= 3).
+    """
+    length = len(y)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else length
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+        areas = np.abs((x[previous] - average_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _numeric_x(x: np.ndarray) -> np.ndarray:
+    """x values as float64 for LTTB's area computation."""
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[s]").astype(np.float64)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(np.float64)
+    return np.arange(len(x), dtype=np.float64)
+
+
+def _prepare(series: Series, kind: str, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Converts a series to arrays, parsing ISO date strings and downsampling long line series."""
+    y = np.asarray(series.y, dtype=np.float64)
+    x = np.arange(len(y)) if series.x is None else np.asarray(series.x)
+    if x.dtype.kind in "US" and kind == "line":
+        try:
+            x = x.astype("datetime64")
+        except ValueError:
+            pass  # categorical labels
+    if kind == "line" and len(y) > max_points:
+        keep = lttb(_numeric_x(x), np.nan_to_num(y), max_points)
+        x, y = x[keep], y[keep]
+    return x, y
+
+
+def spec_hash(spec: ChartSpec) -> str:
+    """Content hash of a spec: its options plus the bytes of every series."""
+    digest = hashlib.blake2b(digest_size=20)
+    options = {key: value for key, value in asdict(spec).items() if key != "series"}
+    digest.update(json.dumps([options, RENDERER_VERSION, matplotlib.__version__], default=str).encode("utf-8"))
+    for series in spec.series:
+        style = [series.label, series.color, series.marker, series.linestyle]
+        digest.update(json.dumps(style).encode("utf-8"))
+        for values in (series.y, series.x):
+            array = np.asarray(values) if values is not None else np.empty(0)
+            digest.update(f"{array.dtype}{array.shape}".encode("utf-8"))
+            if array.dtype == object:  # object arrays' bytes are pointers
+                digest.update(json.dumps(array.tolist(), default=str).encode("utf-8"))
+            else:
+                digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def draw(spec: ChartSpec) -> Figure:
+    """Draws a spec on a new Agg figure. The figure isn't registered with pyplot, so it is freed when dropped."""
+    figure = Figure(figsize=spec.figsize, dpi=spec.dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    if spec.kind == "bar":
+        for series in spec.series:
+            x = [str(label) for label in series.x] if series.x is not None else list(range(len(series.y)))
+            axes.bar(x, series.y, color=series.color, label=series.label)
+    elif spec.kind == "line":
+        for series in spec.series:
+            x, y = _prepare(series, spec.kind, spec.max_points)
+            axes.plot(x, y, label=series.label, color=series.color,
+                      marker=series.marker if len(y) <= 200 else None, linestyle=series.linestyle)
+    else:
+        raise ValueError(f"Unknown chart kind '{spec.kind}'. Expected 'line' or 'bar'.")
+
+    axes.set_title(spec.title)
+    axes.set_xlabel(spec.xlabel)
+    axes.set_ylabel(spec.ylabel)
+    if spec.grid:
+        axes.grid(True, axis=spec.grid, linestyle="--")
+    if spec.legend and any(series.label for series in spec.series) and spec.kind == "line":
+        axes.legend()
+    if spec.rotate_xticks:
+        axes.tick_params(axis="x", labelrotation=spec.rotate_xticks)
+    figure.tight_layout()
+    return figure
+
+
+def render_to_file(spec: ChartSpec, path: str) -> str:
+    """
+    Renders a spec to a PNG atomically (temporary file + rename), so concurrent renderers
+    never expose a half-written chart. Module-level so process pools can pickle it.
+    """
+    figure = draw(spec)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".png")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            figure.savefig(file, format="png")
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        figure.clear()
+    return path
+
+
+class ChartRenderer:
+    """
+    ChartRenderer: headless, cached chart rendering for reports.
+    Charts are drawn with the Agg canvas (no GUI backend, no pyplot figure registry to leak),
+    long line series are downsampled with LTTB, and each PNG is cached under a hash of
+    its spec and data, so re-running a batch of reports never re-renders an identical chart.
+    Batches can be rendered in a process pool.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join("reports", "charts"), max_workers: Optional[int] = None):
+        """
+        :param cache_dir: Directory holding the cached PNGs.
+        :param max_workers: Process pool size for render_many (defaults to CPU count).
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, spec: ChartSpec) -> str:
+        return os.path.join(self.cache_dir, f"{spec_hash(spec)}.png")
+
+    def render(self, spec: ChartSpec) -> str:
+        """Returns the PNG path for a spec, rendering it only if it isn't cached."""
+        path = self.path_for(spec)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        logging.info(f"Rendering chart '{spec.title}' to {path}")
+        return render_to_file(spec, path)
+
+    def render_many(self, specs: List[ChartSpec], processes: bool = True) -> List[str]:
+        """
+        Renders several charts, each distinct uncached spec once, in parallel processes.
+
+        :param specs: Charts to render.
+        :param processes: Use a process pool (False renders inline, e.g. inside a worker already).
+        :return: PNG paths in spec order.
+        """
+        paths = [self.path_for(spec) for spec in specs]
+        pending: Dict[str, ChartSpec] = {}
+        for spec, path in zip(specs, paths):
+            if os.path.exists(path) or path in pending:
+                self.hits += 1
+            else:
+                pending[path] = spec
+        self.misses += len(pending)
+
+        if len(pending) > 1 and processes:
+            workers = min(self.max_workers or os.cpu_count() or 1, len(pending))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(render_to_file, pending.values(), pending.keys()))
+        else:
+            for path, spec in pending.items():
+                render_to_file(spec, path)
+        if pending:
+            logging.info(f"Rendered {len(pending)} charts ({len(specs) - len(pending)} served from cache)")
+        return paths
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` calls per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FMPBackend:
+    """Financial Modeling Prep REST API over one pooled requests.Session with retries and backoff."""
+
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: str = FMP_BASE_URL,
+                 timeout: float = 10,
+                 retries: int = 3,
+                 pool_size: int = 32):
+        """
+        :param api_key: FMP API key (defaults to the FMP_API_KEY environment variable).
+        :param base_url: API root.
+        :param timeout: Per-request timeout in seconds.
+        :param retries: Retries on connection errors, 429 and 5xx responses (exponential backoff,
+                        honoring Retry-After).
+        :param pool_size: Keep-alive connections kept open; match the client's max_workers.
+        """
+        self.api_key = api_key or os.getenv("FMP_API_KEY")
+        if not self.api_key:
+            raise ValueError("Financial Modeling Prep API key not found! Set FMP_API_KEY or pass api_key.")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, endpoint: str, ticker: str, params: Dict[str, Any]) -> Any:
+        response = self.session.get(f"{self.base_url}/{endpoint}/{ticker}",
+                                    params=dict(params, apikey=self.api_key), timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict) and "Error Message" in data:
+            raise ValueError(f"FMP error for {endpoint}/{ticker}: {data['Error Message']}")
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+class FixtureBackend:
+    """
+    Serves responses from local JSON files laid out as <directory>/<endpoint>/<TICKER>.json,
+    so scripts and screens run offline with recorded or hand-written data.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0):
+        """
+        :param directory: Fixture root.
+        :param latency: Simulated round-trip time in seconds (for benchmarking concurrency).
+        """
+        self.directory = directory
+        self.latency = latency
+
+    def path_for(self, endpoint: str, ticker: str) -> str:
+        return os.path.join(self.directory, _UNSAFE.sub("_", endpoint), f"{_UNSAFE.sub('_', ticker.upper())}.json")
+
+    def fetch(self, endpoint: str, ticker: str, params: Dict[str, Any]) -> Any:
+        if self.latency:
+            time.sleep(self.latency)
+        with open(self.path_for(endpoint, ticker), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save(self, endpoint: str, ticker: str, data: Any):
+        """Records a response as a fixture."""
+        path = self.path_for(endpoint, ticker)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+
+    def close(self):
+        pass
+
+
+class FinancialDataClient:
+    """
+    FinancialDataClient: cached, concurrent access to company financial data.
+    Responses are cached on disk per ticker, endpoint and parameters with a TTL, requests go
+    through a pluggable backend (the FMP API over a pooled session, or local fixtures for
+    offline runs), and get_many fetches many tickers in parallel under a shared rate limit.
+    """
+
+    def __init__(self,
+                 backend: Optional[Any] = None,
+                 cache_dir: Optional[str] = os.path.join("data_trove", ".cache", "financial"),
+                 ttl: float = 24 * 3600,
+                 rate_limit: Optional[float] = 10,
+                 max_workers: int = 16):
+        """
+        :param backend: Object with fetch(endpoint, ticker, params) and close() (defaults to FMPBackend).
+        :param cache_dir: On-disk cache directory (None disables caching).
+        :param ttl: Seconds a cached response stays fresh.
+        :param rate_limit: Backend calls per second across all threads (None for unlimited).
+        :param max_workers: Concurrent requests in get_many.
+        """
+        self.backend = backend or FMPBackend(pool_size=max_workers)
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def _cache_path(self, endpoint: str, ticker: str, params: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:10]
+        return os.path.join(self.cache_dir, _UNSAFE.sub("_", endpoint), f"{_UNSAFE.sub('_', ticker)}.{digest}.json")
+
+    def _read_cache(self, path: str) -> Tuple[bool, Any]:
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return False, None
+            with open(path, "r", encoding="utf-8") as file:
+                return True, json.load(file)
+        except (OSError, ValueError):
+            return False, None
+
+    def _write_cache(self, path: str, data: Any):
+        """Writes through a temporary file and a rename, so concurrent readers never see partial JSON."""
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not cache financial data at {path}: {e}")
+
+    def get(self, ticker: str, endpoint: str = "income-statement", refresh: bool = False, **params) -> Any:
+        """
+        Returns the response for one ticker, from the cache while it is fresh.
+
+        :param ticker: Stock symbol, e.g. "TSLA".
+        :param endpoint: API endpoint, e.g. "income-statement", "balance-sheet-statement", "profile".
+        :param refresh: Bypass the cache (the new response is still cached).
+        :param params: Extra query parameters (e.g. period="quarter", limit=5); part of the cache key.
+        """
+        ticker = ticker.upper()
+        path = self._cache_path(endpoint, ticker, params) if self.cache_dir else None
+        if path and not refresh:
+            found, data = self._read_cache(path)
+            if found:
+                with self._stats_lock:
+                    self.hits += 1
+                return data
+
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        data = self.backend.fetch(endpoint, ticker, params)
+        with self._stats_lock:
+            self.misses += 1
+        if path:
+            self._write_cache(path, data)
+        return data
+
+    def get_many(self,
+                 tickers: Iterable[str],
+                 endpoint: str = "income-statement",
+                 refresh: bool = False,
+                 **params) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Fetches many tickers concurrently. Cached tickers return immediately; the rest share
+        the rate limit and the backend's connection pool. One failing ticker doesn't stop the rest.
+
+        :return: (responses by ticker, error messages by ticker).
+        """
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(tickers)))) as pool:
+            futures = {ticker: pool.submit(self.get, ticker, endpoint, refresh, **params) for ticker in tickers}
+            for ticker, future in futures.items():
+                try:
+                    results[ticker] = future.result()
+                except Exception as e:
+                    logging.warning(f"Failed to fetch {endpoint} for {ticker}: {e}")
+                    errors[ticker] = str(e)
+        logging.info(f"Fetched {endpoint} for {len(results)}/{len(tickers)} tickers "
+                     f"in {time.perf_counter() - started:.2f}s")
+        return results, errors
+
+    def latest_financials(self, ticker: str, **params) -> Dict[str, Any]:
+        """The most recent income statement of a ticker."""
+        statements = self.get(ticker, "income-statement", **params)
+        if not isinstance(statements, list) or not statements:
+            raise ValueError(f"No valid financial data found for {ticker}!")
+        return statements[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.backend.close()
+
+
+def create_client(**kwargs) -> FinancialDataClient:
+    """
+    Client for the scripts: serves local fixtures when FINANCIAL_DATA_FIXTURES names a fixture
+    directory (offline runs and tests), otherwise the FMP API.
+    """
+    fixtures = os.getenv("FINANCIAL_DATA_FIXTURES")
+    if fixtures and "backend" not in kwargs:
+        logging.info(f"Serving financial data from fixtures in {fixtures}")
+        kwargs.update(backend=FixtureBackend(fixtures), cache_dir=None, rate_limit=None)
+    return FinancialDataClient(**kwargs)
+
+
+def key_metrics(financials: Dict[str, Any]) -> Dict[str, float]:
+    """The headline metrics the analysis scripts report, from one income statement record."""
+    return {
+        "revenue": financials.get("revenue", 0),
+        "net_profit": financials.get("netIncome", 0),
+        "debt_equity_ratio": financials.get("totalDebt", 0) / max(financials.get("totalEquity", 1), 1),
+        "cash_flow": financials.get("operatingCashFlow", 0),
+    }
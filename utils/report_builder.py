@@ -0,0 +1,264 @@
+import os
+import re
+import time
+import shutil
+import logging
+import tempfile
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from utils.chart_renderer import ChartRenderer, ChartSpec, render_to_file
+
+# fontTools logs every table it prunes while fpdf subsets the embedded font
+logging.getLogger("fontTools").setLevel(logging.WARNING)
+
+# Unicode font shipped with matplotlib (already a dependency); core Helvetica is the fallback
+_FONT_DIR = os.path.join(matplotlib.get_data_path(), "fonts", "ttf")
+_FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf"}
+
+# Characters without a glyph in either font: emoji (outside the BMP) and variation selectors
+_UNPRINTABLE = re.compile("[\U00010000-\U0010FFFF\ufe0e\ufe0f\u200d]")
+
+# Nearest Latin-1 text for punctuation LLM output is full of, used with the core font
+_LATIN1 = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"', "\u2013": "-", "\u2014": "-",
+    "\u2022": "-", "\u2026": "...", "\u2192": "->", "\u2264": "<=", "\u2265": ">=", "\u00a0": " ",
+})
+
+
+@dataclass
+class ReportSection:
+    """One section of a report: a heading followed by text, a metrics table and/or a chart."""
+    heading: str = ""  # empty for text directly under the title
+    text: str = ""
+    metrics: Optional[Dict[str, Any]] = None
+    chart: Optional[ChartSpec] = None  # rendered while the report is built
+    image: Optional[str] = None  # an existing image file
+
+
+@dataclass
+class ReportSpec:
+    """Everything needed to build one PDF report."""
+    title: str
+    output_path: str
+    sections: List[ReportSection] = field(default_factory=list)
+    center_headings: bool = True
+    image_width: float = 180
+
+
+@dataclass
+class BatchResult:
+    """Outcome of ReportBuilder.build_many."""
+    paths: List[Optional[str]]  # output path per spec, None where the build failed
+    errors: Dict[str, str]  # output path -> error message
+    elapsed: float
+
+    @property
+    def reports_per_minute(self) -> float:
+        built = sum(path is not None for path in self.paths)
+        return built / self.elapsed * 60 if self.elapsed > 0 else 0.0
+
+
+@lru_cache(maxsize=None)
+def resolve_font() -> Tuple[str, bool]:
+    """
+    Picks the report font once per process: DejaVu Sans (full Unicode) if its files are
+    available, else the core Helvetica font (Latin-1 only).
+
+    :return: (font family, whether the font is Unicode).
+    """
+    if all(os.path.exists(os.path.join(_FONT_DIR, name)) for name in _FONT_FILES.values()):
+        return "DejaVu", True
+    logging.warning(f"DejaVu fonts not found in {_FONT_DIR}; reports fall back to Latin-1 text")
+    return "Helvetica", False
+
+
+def clean_text(text: Any, unicode: bool) -> str:
+    """Makes text printable with the report font: drops emoji and, for the core font, maps to Latin-1."""
+    text = _UNPRINTABLE.sub("", str(text))
+    if unicode:
+        return text
+    return text.translate(_LATIN1).encode("latin-1", "replace").decode("latin-1")
+
+
+def _new_document() -> Tuple[FPDF, str, bool]:
+    family, unicode = resolve_font()
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    if unicode:
+        for style, name in _FONT_FILES.items():
+            pdf.add_font(family, style, os.path.join(_FONT_DIR, name))
+    pdf.add_page()
+    return pdf, family, unicode
+
+
+def _write_metrics(pdf: FPDF, family: str, unicode: bool, metrics: Dict[str, Any]):
+    """Writes metrics as a two-column table."""
+    label_width = (pdf.w - pdf.l_margin - pdf.r_margin) * 0.45
+    for label, value in metrics.items():
+        if isinstance(value, float):
+            value = f"{value:,.2f}"
+        elif isinstance(value, int) and not isinstance(value, bool):
+            value = f"{value:,}"
+        pdf.set_font(family, "B", 11)
+        pdf.cell(label_width, 8, clean_text(label, unicode), border=1)
+        pdf.set_font(family, "", 11)
+        pdf.cell(0, 8, clean_text(value, unicode), border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+def build_report(spec: ReportSpec, chart_dir: Optional[str] = None) -> str:
+    """
+    Builds one PDF report. Charts are rendered into `chart_dir` (a shared cache keyed by
+    chart content) or, without one, into a private temporary directory removed afterwards.
+    The PDF is written to a unique temporary file and renamed into place, so concurrent
+    builds never collide or leave half-written reports. Module-level so process pools can pickle it.
+
+    :param spec: The report to build.
+    :param chart_dir: Chart cache directory (None for throwaway charts).
+    :return: The output path.
+    """
+    scratch = None if chart_dir else tempfile.mkdtemp(prefix="trove-report-")
+    try:
+        pdf, family, unicode = _new_document()
+        align = "C" if spec.center_headings else "L"
+        pdf.set_font(family, "B", 18)
+        pdf.multi_cell(0, 10, clean_text(spec.title, unicode), align="C", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.ln(5)
+
+        for section in spec.sections:
+            if section.heading:
+                pdf.set_font(family, "B", 14)
+                pdf.multi_cell(0, 10, clean_text(section.heading, unicode), align=align,
+                               new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                pdf.ln(3)
+            if section.text:
+                pdf.set_font(family, "", 11)
+                pdf.multi_cell(0, 7, clean_text(section.text, unicode), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                pdf.ln(5)
+            if section.metrics:
+                _write_metrics(pdf, family, unicode, section.metrics)
+                pdf.ln(5)
+            image = section.image
+            if section.chart is not None:
+                if chart_dir:
+                    image = ChartRenderer(cache_dir=chart_dir).render(section.chart)
+                else:
+                    image = render_to_file(section.chart, os.path.join(scratch, f"chart-{id(section)}.png"))
+            if image:
+                pdf.image(image, x=10, w=spec.image_width)
+                pdf.ln(5)
+
+        directory = os.path.dirname(os.path.abspath(spec.output_path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".pdf.tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(pdf.output())
+            os.replace(temp_path, spec.output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return spec.output_path
+
+
+class ReportBuilder:
+    """
+    ReportBuilder: shared PDF report generation for the Trove scripts.
+    Reports are described as data (ReportSpec: sections with text, metrics tables and charts),
+    so one batch of specs can be built across a process pool. Fonts and text encoding are
+    handled in one place, charts come from the content-addressed chart cache (each distinct
+    chart rendered once per batch), and every build writes unique temporary files.
+    """
+
+    def __init__(self, chart_cache_dir: Optional[str] = os.path.join("reports", "charts"),
+                 max_workers: Optional[int] = None):
+        """
+        :param chart_cache_dir: Chart cache shared across reports (None renders charts to temporary files).
+        :param max_workers: Process pool size for build_many (defaults to CPU count).
+        """
+        self.chart_cache_dir = chart_cache_dir
+        self.max_workers = max_workers
+        self.built = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    def build(self, spec: ReportSpec) -> str:
+        """Builds one report in this process and returns its path."""
+        started = time.perf_counter()
+        path = build_report(spec, self.chart_cache_dir)
+        self.built += 1
+        self.elapsed += time.perf_counter() - started
+        logging.info(f"Report saved as {path}")
+        return path
+
+    def build_many(self, specs: List[ReportSpec], processes: bool = True) -> BatchResult:
+        """
+        Builds a batch of reports in parallel processes. A failing report is logged and
+        recorded in the result without stopping the rest of the batch.
+
+        :param specs: Reports to build.
+        :param processes: Use a process pool (False builds them one after another in this process).
+        :return: Paths, per-report errors and elapsed time (see BatchResult.reports_per_minute).
+        """
+        outputs = [os.path.abspath(spec.output_path) for spec in specs]
+        if len(set(outputs)) != len(outputs):
+            raise ValueError("Each report in a batch needs its own output_path.")
+
+        started = time.perf_counter()
+        if self.chart_cache_dir:
+            # Render every distinct chart once up front, so workers only read the cache. This is
+            # best effort: a chart that fails here is rendered again by its own report, which then
+            # fails alone and is recorded in the batch errors.
+            charts = [section.chart for spec in specs for section in spec.sections if section.chart is not None]
+            try:
+                ChartRenderer(self.chart_cache_dir, self.max_workers).render_many(charts, processes=processes)
+            except Exception as e:
+                logging.warning(f"Pre-rendering charts failed ({e}); reports will render their own charts")
+
+        paths: List[Optional[str]] = []
+        errors: Dict[str, str] = {}
+        workers = min(self.max_workers or os.cpu_count() or 1, len(specs))
+        if processes and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(build_report, spec, self.chart_cache_dir) for spec in specs]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append((future.result(), None))
+                    except Exception as e:
+                        outcomes.append((None, e))
+        else:
+            outcomes = []
+            for spec in specs:
+                try:
+                    outcomes.append((build_report(spec, self.chart_cache_dir), None))
+                except Exception as e:
+                    outcomes.append((None, e))
+
+        for spec, (path, error) in zip(specs, outcomes):
+            if error is not None:
+                logging.error(f"Report {spec.output_path} failed: {error}")
+                errors[spec.output_path] = str(error)
+            paths.append(path)
+
+        result = BatchResult(paths, errors, time.perf_counter() - started)
+        self.built += len(specs) - len(errors)
+        self.failed += len(errors)
+        self.elapsed += result.elapsed
+        logging.info(f"Built {len(specs) - len(errors)}/{len(specs)} reports in {result.elapsed:.2f}s "
+                     f"({result.reports_per_minute:.1f} reports/min)")
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Reports built and failed so far, with overall throughput."""
+        return {"built": self.built, "failed": self.failed, "elapsed": self.elapsed,
+                "reports_per_minute": self.built / self.elapsed * 60 if self.elapsed > 0 else 0.0}